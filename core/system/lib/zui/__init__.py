@@ -0,0 +1,22 @@
+"""Shared helpers for the ZUI system modules."""
+
+import os
+
+HOME: str = os.getenv("HOME")
+ZUI_PATH: str = f"{HOME}/.zui"
+# Per-session state (sockets, notification ids, traces...)
+RUNTIME_PATH: str = f"{os.getenv('XDG_RUNTIME_DIR', '/tmp')}/zui"
+# Derived data worth keeping across sessions (compiled menus, scaled images...)
+CACHE_PATH: str = f"{os.getenv('XDG_CACHE_HOME', f'{HOME}/.cache')}/zui"
+
+
+def runtime_file(name: str) -> str:
+    """Path of a file in the ZUI runtime directory, creating the directory if needed"""
+    os.makedirs(RUNTIME_PATH, mode=0o700, exist_ok=True)
+    return f"{RUNTIME_PATH}/{name}"
+
+
+def cache_file(name: str) -> str:
+    """Path of a file in the ZUI cache directory, creating the directory if needed"""
+    os.makedirs(CACHE_PATH, exist_ok=True)
+    return f"{CACHE_PATH}/{name}"
@@ -0,0 +1,77 @@
+r"""Minimal bspwm client speaking to the window manager's socket directly.
+
+bspc is a thin wrapper around this socket: arguments are sent NUL-separated and
+the reply is read until the connection closes, a reply starting with \a (BEL)
+being an error. Talking to it in-process saves a fork/exec per command.
+"""
+
+import os
+import re
+import socket
+
+FAILURE_PREFIX: str = "\a"
+SOCKET_ENV: str = "BSPWM_SOCKET"
+
+
+class BspwmError(Exception):
+    pass
+
+
+def socket_path() -> str:
+    """Same path bspc uses: $BSPWM_SOCKET or one derived from $DISPLAY"""
+    path: str = os.getenv(SOCKET_ENV)
+    if path:
+        return path
+    # [host]:display[.screen]
+    match = re.match(r"^(.*):(\d+)(?:\.(\d+))?$", os.getenv("DISPLAY", ":0"))
+    host, display, screen = match.groups() if match else ("", "0", "0")
+    return f"/tmp/bspwm{host}_{display}_{screen or 0}-socket"
+
+
+def _connect() -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path())
+    except OSError as exc:
+        sock.close()
+        raise BspwmError(f"Can't connect to bspwm: {exc}") from exc
+    return sock
+
+
+def _request(sock: socket.socket, args: tuple) -> None:
+    sock.sendall(b"".join(f"{arg}".encode() + b"\0" for arg in args))
+
+
+def send(*args) -> str:
+    """Run a bspc command, e.g. send("node", "-z", "right", 20, 0)"""
+    with _connect() as sock:
+        _request(sock, args)
+        chunks: list = []
+        while True:
+            chunk: bytes = sock.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    reply: str = b"".join(chunks).decode("utf-8", "replace")
+    if reply.startswith(FAILURE_PREFIX):
+        raise BspwmError(reply[1:].strip())
+    return reply
+
+
+def query(*args) -> list:
+    """bspc query: one id or name per line, empty when nothing matches"""
+    try:
+        return send("query", *args).split()
+    except BspwmError:
+        return []
+
+
+def subscribe(*events):
+    """Yield bspc subscribe report lines (e.g. "desktop_add 0x... 0x... 1") as they come"""
+    with _connect() as sock:
+        _request(sock, ("subscribe",) + events)
+        with sock.makefile("r", encoding="utf-8", errors="replace") as stream:
+            for line in stream:
+                if line.startswith(FAILURE_PREFIX):
+                    raise BspwmError(line[1:].strip())
+                yield line.rstrip("\n")
@@ -0,0 +1,175 @@
+"""Runs the external commands of a module (xrandr, bspc, polybar-msg...) and reports them.
+
+A plan is a command or a group of commands: Ordered runs its steps one
+after the other, Parallel all at once, and groups nest. Every command is
+awaited with a timeout, its output captured, and a result record kept, so
+failures are reported instead of lost and no child is left as a zombie.
+The plan runs on its own asyncio event loop, which also works from the
+worker threads zuid runs its plugins in.
+"""
+
+import asyncio
+import time
+
+DEFAULT_CONCURRENCY: int = 8
+DEFAULT_TIMEOUT_S: float = 10.0
+# Lines of stderr kept in a failure report
+REPORT_LINES: int = 3
+
+
+class Command:
+    """One command line, with its own timeout (the executor's default otherwise) and environment"""
+
+    def __init__(self, args: list, timeout: float = None, label: str = None, env: dict = None) -> None:
+        self.args: list = [str(arg) for arg in args]
+        self.timeout: float = timeout
+        self.env: dict = env
+        self.label: str = label or " ".join(self.args)
+
+
+class Ordered:
+    """Steps run one after the other; with stop_on_error the rest is skipped after a failure"""
+
+    def __init__(self, *steps, stop_on_error: bool = False) -> None:
+        self.steps: tuple = steps
+        self.stop_on_error: bool = stop_on_error
+
+
+class Parallel:
+    """Steps run at the same time, within the executor's concurrency limit"""
+
+    def __init__(self, *steps) -> None:
+        self.steps: tuple = steps
+
+
+def _as_step(step):
+    # Plain argument lists are commands
+    return Command(step) if isinstance(step, (list, tuple)) else step
+
+
+class Executor:
+    """Runs plans and keeps one record per command:
+    label, args, status (ok, exit N, timeout, skipped, error: ...), returncode,
+    stdout, stderr, and start_ms/end_ms since the executor was created.
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_CONCURRENCY, timeout: float = DEFAULT_TIMEOUT_S) -> None:
+        self.max_concurrency: int = max_concurrency
+        self.timeout: float = timeout
+        self.results: list = []
+        self.started: float = time.monotonic()
+
+    def _elapsed_ms(self) -> float:
+        return round((time.monotonic() - self.started) * 1000, 1)
+
+    def run(self, *steps) -> list:
+        """Run the steps in order and return their records (a failed command doesn't raise)"""
+        return asyncio.run(self._run_plan(Ordered(*steps)))
+
+    async def _run_plan(self, plan: Ordered) -> list:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        records: list = []
+        await self._step(plan, semaphore, records)
+        self.results += records
+        return records
+
+    async def _step(self, step, semaphore: asyncio.Semaphore, records: list) -> bool:
+        """Run a step, appending its records in plan order; False when something failed"""
+        step = _as_step(step)
+        if isinstance(step, Command):
+            record: dict = await self._command(step, semaphore)
+            records.append(record)
+            return record["status"] == "ok"
+        if isinstance(step, Parallel):
+            branches: list = [[] for _step in step.steps]
+            outcomes: list = await asyncio.gather(
+                *(self._step(child, semaphore, branch) for child, branch in zip(step.steps, branches, strict=True))
+            )
+            for branch in branches:
+                records += branch
+            return all(outcomes)
+
+        ok: bool = True
+        for child in step.steps:
+            if not ok and step.stop_on_error:
+                self._skip(child, records)
+                continue
+            ok = await self._step(child, semaphore, records) and ok
+        return ok
+
+    def _skip(self, step, records: list) -> None:
+        step = _as_step(step)
+        if isinstance(step, Command):
+            now: float = self._elapsed_ms()
+            records.append(self._record(step, "skipped", start_ms=now, end_ms=now))
+            return
+        for child in step.steps:
+            self._skip(child, records)
+
+    def _record(self, command: Command, status: str, **fields) -> dict:
+        record: dict = {
+            "label": command.label,
+            "args": command.args,
+            "status": status,
+            "returncode": None,
+            "stdout": "",
+            "stderr": "",
+        }
+        record.update(fields)
+        return record
+
+    async def _command(self, command: Command, semaphore: asyncio.Semaphore) -> dict:
+        timeout: float = command.timeout if command.timeout is not None else self.timeout
+        async with semaphore:
+            start_ms: float = self._elapsed_ms()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *command.args,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env=command.env,
+                )
+            except OSError as exc:
+                return self._record(
+                    command, f"error: {exc.strerror}", start_ms=start_ms, end_ms=self._elapsed_ms()
+                )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+                status: str = "ok" if process.returncode == 0 else f"exit {process.returncode}"
+            except asyncio.TimeoutError:
+                process.kill()
+                stdout, stderr = await process.communicate()
+                status = "timeout"
+        return self._record(
+            command,
+            status,
+            returncode=process.returncode,
+            stdout=stdout.decode(errors="replace"),
+            stderr=stderr.decode(errors="replace"),
+            start_ms=start_ms,
+            end_ms=self._elapsed_ms(),
+        )
+
+    def failures(self) -> list:
+        return [record for record in self.results if record["status"] not in ("ok", "skipped")]
+
+    def report(self, verbose: bool = False) -> None:
+        """Print failed commands with their stderr (every command when verbose), then forget them"""
+        if not self.results:
+            return
+        for record in self.results:
+            failed: bool = record["status"] not in ("ok", "skipped")
+            if not (failed or verbose):
+                continue
+            elapsed: float = record["end_ms"] - record["start_ms"]
+            print(f"{record['label']}: {record['status']} ({elapsed:.1f} ms)")
+            if failed:
+                for line in record["stderr"].strip().splitlines()[-REPORT_LINES:]:
+                    print(f"  {line}")
+        total: float = max(record["end_ms"] for record in self.results) - min(
+            record["start_ms"] for record in self.results
+        )
+        failures: int = len(self.failures())
+        print(f"{len(self.results)} commands in {total:.1f} ms, {failures} failed")
+        self.results = []
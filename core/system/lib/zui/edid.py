@@ -0,0 +1,303 @@
+"""EDID decoding for monitor identification and capabilities.
+
+Monitors describe themselves with a 128-byte EDID base block: the
+manufacturer id and product code in the header, the physical size, and up to
+four 18-byte descriptors holding the preferred timing, the refresh range
+limits, the model name and the serial number. Most external monitors add a
+CTA-861 extension block whose data blocks advertise HDR and variable refresh.
+
+RandR exposes the raw bytes as the EDID output property, which xrandr --prop
+prints as hex; the kernel also exposes them in /sys/class/drm/*/edid.
+Decoded results are cached by EDID hash, so a monitor is only decoded the
+first time it's seen.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from zui import cache_file
+
+HEADER: bytes = bytes.fromhex("00ffffffffffff00")
+BLOCK_SIZE: int = 128
+DESCRIPTOR_OFFSETS: tuple = (54, 72, 90, 108)
+# Display descriptor tags
+TAG_SERIAL: int = 0xFF
+TAG_NAME: int = 0xFC
+TAG_RANGE_LIMITS: int = 0xFD
+# Extension block tag and CTA-861 data block tags
+EXTENSION_CTA: int = 0x02
+CTA_VENDOR_BLOCK: int = 3
+CTA_EXTENDED_BLOCK: int = 7
+CTA_HDR_STATIC_METADATA: int = 6
+# IEEE OUIs of the vendor specific data blocks announcing variable refresh
+OUI_HDMI_FORUM: int = 0xC45DD8
+OUI_AMD: int = 0x00001A
+# HDR static metadata EOTF bits (bit 0 is plain SDR)
+HDR_EOTFS: dict = {1: "hdr-gamma", 2: "pq", 3: "hlg"}
+# Smallest continuous range limits worth calling variable refresh
+MIN_VRR_SPAN_HZ: int = 10
+
+DRM_PATH: str = "/sys/class/drm"
+# sha256 of the EDID -> parse() result, bump the version when parse() changes
+CACHE_NAME: str = "edid.json"
+CACHE_VERSION: int = 1
+
+HEX_LINE = re.compile(r"^[0-9a-fA-F]+$")
+
+
+class EdidError(ValueError):
+    pass
+
+
+def manufacturer_id(data: bytes) -> str:
+    """Three letters packed in five bits each, "A" being 1 (bytes 8-9, big endian)"""
+    value: int = int.from_bytes(data[8:10], "big")
+    return "".join(chr(ord("A") - 1 + ((value >> shift) & 0x1F)) for shift in (10, 5, 0))
+
+
+def _descriptor_text(descriptor: bytes) -> str:
+    # Up to 13 characters, ended by a line feed and padded with spaces
+    return descriptor[5:18].split(b"\n", 1)[0].decode("cp437", "replace").strip()
+
+
+def detailed_timing(descriptor: bytes) -> dict:
+    """Mode of an 18-byte detailed timing descriptor and the image size it was measured on"""
+    pixel_clock: int = int.from_bytes(descriptor[0:2], "little") * 10000
+    width: int = descriptor[2] | (descriptor[4] & 0xF0) << 4
+    h_blank: int = descriptor[3] | (descriptor[4] & 0x0F) << 8
+    height: int = descriptor[5] | (descriptor[7] & 0xF0) << 4
+    v_blank: int = descriptor[6] | (descriptor[7] & 0x0F) << 8
+    interlaced: bool = bool(descriptor[17] & 0x80)
+    total: int = (width + h_blank) * (height + v_blank)
+    rate: float = pixel_clock / total * (2 if interlaced else 1) if total else 0.0
+    return {
+        "resolution": f"{width}x{height}",
+        "rate": round(rate, 2),
+        "pixel_clock_khz": pixel_clock // 1000,
+        "interlaced": interlaced,
+        "image_mm": [
+            descriptor[12] | (descriptor[14] & 0xF0) << 4,
+            descriptor[13] | (descriptor[14] & 0x0F) << 8,
+        ],
+    }
+
+
+def range_limits(descriptor: bytes, revision: int) -> dict:
+    """Refresh ranges of a display range limits descriptor"""
+    # EDID 1.4 adds 255 to a limit when its offset flag is set
+    flags: int = descriptor[4] if revision >= 4 else 0
+    v_min: int = descriptor[5] + (255 if flags & 0x03 == 0x03 else 0)
+    v_max: int = descriptor[6] + (255 if flags & 0x02 else 0)
+    h_min: int = descriptor[7] + (255 if flags & 0x0C == 0x0C else 0)
+    h_max: int = descriptor[8] + (255 if flags & 0x08 else 0)
+    return {
+        "vertical_hz": [v_min, v_max],
+        "horizontal_khz": [h_min, h_max],
+        "max_pixel_clock_mhz": descriptor[9] * 10,
+    }
+
+
+def _cta_data_blocks(block: bytes):
+    """(tag, payload) of each data block of a CTA-861 extension"""
+    end: int = min(block[2], BLOCK_SIZE - 1)
+    offset: int = 4
+    while offset < end:
+        tag, length = block[offset] >> 5, block[offset] & 0x1F
+        yield tag, block[offset + 1:offset + 1 + length]
+        offset += 1 + length
+
+
+def cta_capabilities(block: bytes) -> dict:
+    """HDR transfer functions and variable refresh range of a CTA-861 extension"""
+    capabilities: dict = {"hdr": [], "vrr_hz": None}
+    for tag, payload in _cta_data_blocks(block):
+        if tag == CTA_EXTENDED_BLOCK and len(payload) >= 2 and payload[0] == CTA_HDR_STATIC_METADATA:
+            capabilities["hdr"] = [name for bit, name in HDR_EOTFS.items() if payload[1] & (1 << bit)]
+        elif tag == CTA_VENDOR_BLOCK and len(payload) >= 3:
+            oui: int = int.from_bytes(payload[0:3], "little")
+            if oui == OUI_HDMI_FORUM and len(payload) >= 11:
+                # HDMI 2.1 VRRmin (6 bits) and VRRmax (10 bits)
+                v_min: int = payload[9] & 0x3F
+                v_max: int = (payload[9] & 0xC0) << 2 | payload[10]
+                if v_min and v_max > v_min:
+                    capabilities["vrr_hz"] = [v_min, v_max]
+            elif oui == OUI_AMD and len(payload) >= 7 and payload[4] & 0x01:
+                # FreeSync over HDMI: feature flags, then the refresh range
+                capabilities["vrr_hz"] = [payload[5], payload[6]]
+    return capabilities
+
+
+def parse(data: bytes) -> dict:
+    """Identification and capabilities of an EDID (base block and its extensions)"""
+    if len(data) < BLOCK_SIZE or data[:8] != HEADER:
+        raise EdidError("Not an EDID base block")
+    if sum(data[:BLOCK_SIZE]) % 256 != 0:
+        raise EdidError("EDID checksum mismatch")
+
+    revision: int = data[19]
+    info: dict = {
+        "vendor": manufacturer_id(data),
+        "product": int.from_bytes(data[10:12], "little"),
+        "serial": int.from_bytes(data[12:16], "little") or None,
+        "model": None,
+        "version": f"{data[18]}.{revision}",
+        "digital": bool(data[20] & 0x80),
+        # Bytes 21-22 are in centimeters, or an aspect ratio when one of them is 0
+        "size_mm": [data[21] * 10, data[22] * 10] if data[21] and data[22] else None,
+        "preferred": None,
+        "range_limits": None,
+        # EDID 1.4: any rate within the range limits works, not only the listed ones
+        "continuous_frequency": revision >= 4 and bool(data[24] & 0x01),
+        "extensions": data[126],
+        "hdr": [],
+        "vrr_hz": None,
+    }
+    for offset in DESCRIPTOR_OFFSETS:
+        descriptor: bytes = data[offset:offset + 18]
+        if descriptor[0:2] != b"\0\0":
+            # The first detailed timing is the preferred (native) mode
+            if info["preferred"] is None:
+                info["preferred"] = detailed_timing(descriptor)
+            continue
+        # Display descriptors start with a zero pixel clock
+        if descriptor[3] == TAG_NAME:
+            info["model"] = _descriptor_text(descriptor)
+        elif descriptor[3] == TAG_SERIAL:
+            info["serial"] = _descriptor_text(descriptor)
+        elif descriptor[3] == TAG_RANGE_LIMITS:
+            info["range_limits"] = range_limits(descriptor, revision)
+
+    # The timing's image size is in millimeters, more precise than bytes 21-22
+    if info["preferred"] and all(info["preferred"]["image_mm"]):
+        info["size_mm"] = info["preferred"]["image_mm"]
+
+    for index in range(1, min(info["extensions"], len(data) // BLOCK_SIZE - 1) + 1):
+        block: bytes = data[index * BLOCK_SIZE:(index + 1) * BLOCK_SIZE]
+        if block[0] == EXTENSION_CTA and sum(block) % 256 == 0:
+            capabilities: dict = cta_capabilities(block)
+            info["hdr"] = info["hdr"] or capabilities["hdr"]
+            info["vrr_hz"] = info["vrr_hz"] or capabilities["vrr_hz"]
+
+    # DisplayPort Adaptive-Sync only shows as continuous frequency over a wide range
+    limits: dict = info["range_limits"]
+    if info["vrr_hz"] is None and info["continuous_frequency"] and limits:
+        v_min, v_max = limits["vertical_hz"]
+        if v_max - v_min >= MIN_VRR_SPAN_HZ:
+            info["vrr_hz"] = [v_min, v_max]
+    return info
+
+
+def display_name(info: dict) -> str:
+    """Model name when the monitor has one, "<vendor> <product code>" otherwise"""
+    return info.get("model") or f"{info['vendor']} {info['product']:04X}"
+
+
+def diagonal_inches(info: dict) -> float:
+    """Diagonal of the visible area, None when the EDID has no size (projectors)"""
+    if not info.get("size_mm"):
+        return None
+    width, height = info["size_mm"]
+    return (width ** 2 + height ** 2) ** 0.5 / 25.4
+
+
+def dpi(info: dict, resolution: str) -> float:
+    """Horizontal pixel density of resolution on the physical width, None without a size"""
+    if not info.get("size_mm"):
+        return None
+    return int(resolution.split("x")[0]) * 25.4 / info["size_mm"][0]
+
+
+def randr_edids(query: str) -> dict:
+    """Output name -> EDID bytes, from xrandr --prop output.
+
+    Properties are tab-indented under their output; the EDID property is
+    followed by its bytes as lines of 32 hex digits.
+    """
+    edids: dict = {}
+    output: str = None
+    hex_lines: list = None
+    for line in query.split("\n"):
+        if line and not line[0].isspace():
+            output = line.split()[0]
+            hex_lines = None
+            continue
+        stripped: str = line.strip()
+        if hex_lines is not None:
+            if HEX_LINE.match(stripped):
+                hex_lines.append(stripped)
+                continue
+            # Disconnected outputs can keep an empty EDID property
+            if hex_lines:
+                edids[output] = bytes.fromhex("".join(hex_lines))
+            hex_lines = None
+        if output is not None and stripped == "EDID:":
+            hex_lines = []
+    if hex_lines:
+        edids[output] = bytes.fromhex("".join(hex_lines))
+    return edids
+
+
+def sysfs_edids(root: str = DRM_PATH) -> dict:
+    """Connector name -> EDID bytes of the connected DRM connectors ("card0-DP-1" -> "DP-1")"""
+    edids: dict = {}
+    try:
+        entries: list = os.listdir(root)
+    except OSError:
+        return edids
+    for entry in entries:
+        if not entry.startswith("card") or "-" not in entry:
+            continue
+        try:
+            with open(f"{root}/{entry}/status", "r") as stream:
+                if stream.read().strip() != "connected":
+                    continue
+            with open(f"{root}/{entry}/edid", "rb") as stream:
+                data: bytes = stream.read()
+        except OSError:
+            continue
+        if data:
+            edids[entry.split("-", 1)[1]] = data
+    return edids
+
+
+def _load_cache() -> dict:
+    try:
+        with open(cache_file(CACHE_NAME), "r") as stream:
+            cache: dict = json.load(stream)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("edids", {})
+
+
+def _save_cache(edids: dict) -> None:
+    path: str = cache_file(CACHE_NAME)
+    tmp_path: str = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as stream:
+        json.dump({"version": CACHE_VERSION, "edids": edids}, stream)
+    os.replace(tmp_path, path)
+
+
+def decode_all(edids: dict) -> dict:
+    """name -> parse() result for each valid EDID, parsing only the ones not cached yet"""
+    cache: dict = _load_cache()
+    decoded: dict = {}
+    changed: bool = False
+    for name, data in edids.items():
+        digest: str = hashlib.sha256(data).hexdigest()
+        if digest not in cache:
+            try:
+                cache[digest] = parse(data)
+            except EdidError:
+                continue
+            changed = True
+        decoded[name] = cache[digest]
+    if changed:
+        try:
+            _save_cache(cache)
+        except OSError:
+            pass
+    return decoded
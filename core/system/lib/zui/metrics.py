@@ -0,0 +1,224 @@
+"""Counters, duration histograms and a log of the last events, shared by the ZUI modules.
+
+Every traced event (see zui.tracing) counts a run and its duration, and every
+process the modules spawn is counted through a subprocess audit hook. A
+process keeps its numbers in memory and merges them into the session totals
+in $XDG_RUNTIME_DIR/zui/metrics.json every FLUSH_INTERVAL_S while it records
+anything and when it exits, under a file lock since one-shot modules and zuid
+flush concurrently. The totals are also written as a Prometheus text file,
+metrics.prom, next to it.
+"""
+
+import atexit
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from zui import runtime_file
+
+STATE_NAME: str = "metrics.json"
+PROM_NAME: str = "metrics.prom"
+LOCK_NAME: str = "metrics.lock"
+# Upper bounds of the duration buckets, in seconds
+BUCKETS_S: tuple = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+EVENT_LOG_SIZE: int = 100
+# How stale the session totals can get while a long-running process (zuid, the
+# listeners) keeps recording
+FLUSH_INTERVAL_S: float = 10.0
+
+# name -> help text and type, in the order they're exported
+METRICS: dict = {
+    "zui_events_total": ("Events handled by the modules", "counter"),
+    "zui_event_failures_total": ("Events that ended with an error", "counter"),
+    "zui_event_duration_seconds": ("Time to handle an event", "histogram"),
+    "zui_event_last_duration_seconds": ("Duration of the last event", "gauge"),
+    "zui_subprocesses_total": ("Processes spawned by the modules", "counter"),
+}
+
+
+def _key(name: str, labels: dict) -> str:
+    # JSON object keys: the metric name and its labels, sorted
+    return json.dumps([name, sorted(labels.items())])
+
+
+class Registry:
+    """Metrics of this process since its last flush"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.counters: dict = {}
+        # key -> bucket counts (one per bound and +Inf), sum, count
+        self.histograms: dict = {}
+        self.gauges: dict = {}
+        self.events: deque = deque(maxlen=EVENT_LOG_SIZE)
+        # Module the current thread works for, labels the processes it spawns.
+        # Threads that never set it belong to the module the process runs.
+        self.scope = threading.local()
+        self.default_module: str = os.path.basename(os.path.dirname(os.path.abspath(sys.argv[0] or "."))) or "zui"
+        self.flusher: threading.Thread = None
+        self.stopped = threading.Event()
+
+    def inc(self, name: str, labels: dict, value: float = 1) -> None:
+        key: str = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            if self.flusher is None:
+                self.start_flushing()
+
+    def start_flushing(self) -> None:
+        """Flush every FLUSH_INTERVAL_S from a daemon thread, called with the lock held"""
+        self.flusher = threading.Thread(target=self._flush_periodically, name="zui-metrics", daemon=True)
+        self.flusher.start()
+
+    def _flush_periodically(self) -> None:
+        while not self.stopped.wait(FLUSH_INTERVAL_S):
+            self.flush()
+
+    def stop(self) -> None:
+        """Stop the periodic flushes and write what's left"""
+        self.stopped.set()
+        self.flush()
+
+    def observe(self, name: str, labels: dict, seconds: float) -> None:
+        key: str = _key(name, labels)
+        with self.lock:
+            histogram: list = self.histograms.setdefault(key, [0] * (len(BUCKETS_S) + 1) + [0.0, 0])
+            index: int = next((i for i, bound in enumerate(BUCKETS_S) if seconds <= bound), len(BUCKETS_S))
+            histogram[index] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    def set(self, name: str, labels: dict, value: float) -> None:
+        with self.lock:
+            self.gauges[_key(name, labels)] = value
+
+    def record_event(self, module: str, event: str, seconds: float, ok: bool = True) -> None:
+        labels: dict = {"module": module, "event": event or ""}
+        self.inc("zui_events_total", labels)
+        if not ok:
+            self.inc("zui_event_failures_total", labels)
+        self.observe("zui_event_duration_seconds", labels, seconds)
+        self.set("zui_event_last_duration_seconds", labels, seconds)
+        with self.lock:
+            self.events.append(
+                {"time": time.time(), "module": module, "event": event, "ms": round(seconds * 1000, 1), "ok": ok}
+            )
+
+    def _take(self) -> tuple:
+        with self.lock:
+            taken: tuple = (self.counters, self.histograms, self.gauges, list(self.events))
+            self.counters, self.histograms, self.gauges = {}, {}, {}
+            self.events.clear()
+        return taken
+
+    def flush(self) -> None:
+        """Merge into the session totals and rewrite the Prometheus file"""
+        counters, histograms, gauges, events = self._take()
+        if not (counters or histograms or gauges or events):
+            return
+        try:
+            with open(runtime_file(LOCK_NAME), "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                state: dict = load_state()
+                for key, value in counters.items():
+                    state["counters"][key] = state["counters"].get(key, 0) + value
+                for key, histogram in histograms.items():
+                    total: list = state["histograms"].get(key)
+                    if not total or len(total) != len(histogram):
+                        # New, or written with other buckets
+                        total = [0] * len(histogram)
+                    state["histograms"][key] = [a + b for a, b in zip(total, histogram, strict=True)]
+                state["gauges"].update(gauges)
+                state["events"] = (state["events"] + events)[-EVENT_LOG_SIZE:]
+                _write(runtime_file(STATE_NAME), json.dumps(state))
+                _write(runtime_file(PROM_NAME), prometheus_text(state))
+        except OSError as exc:
+            print(f"Error writing metrics: {exc}", file=sys.stderr)
+
+
+def _write(path: str, text: str) -> None:
+    tmp_path: str = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as stream:
+        stream.write(text)
+    os.replace(tmp_path, path)
+
+
+def load_state() -> dict:
+    """Session totals: counters, histograms and gauges by key, and the event log"""
+    state: dict = {"counters": {}, "histograms": {}, "gauges": {}, "events": []}
+    try:
+        with open(runtime_file(STATE_NAME), "r") as stream:
+            state.update(json.load(stream))
+    except (OSError, ValueError):
+        pass
+    return state
+
+
+def parse_key(key: str) -> tuple:
+    name, labels = json.loads(key)
+    return name, dict(labels)
+
+
+def _labels_text(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs: list = []
+    for name, value in labels.items():
+        escaped: str = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def prometheus_text(state: dict) -> str:
+    """Session totals in the Prometheus text exposition format"""
+    series: dict = {name: [] for name in METRICS}
+    for kind in ("counters", "gauges"):
+        for key, value in sorted(state[kind].items()):
+            name, labels = parse_key(key)
+            series.setdefault(name, []).append(f"{name}{_labels_text(labels)} {value:g}")
+    for key, histogram in sorted(state["histograms"].items()):
+        name, labels = parse_key(key)
+        lines: list = series.setdefault(name, [])
+        cumulative: int = 0
+        for bound, count in zip(BUCKETS_S + ("+Inf",), histogram[:-2], strict=True):
+            cumulative += count
+            le: str = bound if isinstance(bound, str) else f"{bound:g}"
+            lines.append(f"{name}_bucket{_labels_text(dict(labels, le=le))} {cumulative}")
+        lines.append(f"{name}_sum{_labels_text(labels)} {histogram[-2]:g}")
+        lines.append(f"{name}_count{_labels_text(labels)} {histogram[-1]}")
+
+    text: list = []
+    for name, lines in series.items():
+        if not lines:
+            continue
+        help_text, kind = METRICS.get(name, ("", "untyped"))
+        text += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"] + lines
+    return "\n".join(text) + "\n"
+
+
+registry = Registry()
+# One-shot runs exit long before the first periodic flush
+atexit.register(registry.stop)
+
+
+def _audit(event: str, args: tuple) -> None:
+    # Every subprocess (subprocess.run, Popen, asyncio) goes through Popen
+    if event != "subprocess.Popen":
+        return
+    executable, command = args[0], args[1]
+    if isinstance(command, (list, tuple)) and command:
+        program = command[0]
+    else:
+        program = executable or command
+    if isinstance(program, bytes):
+        program = program.decode(errors="replace")
+    program = os.path.basename(str(program).split(" ", 1)[0]) or "unknown"
+    module: str = getattr(registry.scope, "module", None) or registry.default_module
+    registry.inc("zui_subprocesses_total", {"module": module, "program": program})
+
+
+sys.addaudithook(_audit)
@@ -0,0 +1,94 @@
+"""Notification client speaking org.freedesktop.Notifications over D-Bus.
+
+Replaces spawning notify-send for every event: the session bus connection is
+kept open for the life of the process and notifications sharing a tag reuse the
+same id, so the notification server updates the bubble in place instead of
+stacking a new one.
+"""
+
+import sys
+import gi
+gi.require_version("Gio", "2.0")
+from gi.repository import Gio, GLib
+
+from zui import runtime_file
+
+NOTIFICATIONS_NAME: str = "org.freedesktop.Notifications"
+NOTIFICATIONS_PATH: str = "/org/freedesktop/Notifications"
+NOTIFY_TIMEOUT_MS: int = 1000
+
+
+class Notifier:
+    def __init__(self, app_name: str = "zui", bus: Gio.DBusConnection = None) -> None:
+        self.app_name = app_name
+        self._bus = bus
+        self._ids: dict = {}
+
+    @property
+    def bus(self) -> Gio.DBusConnection:
+        # The session bus follows DBUS_SESSION_BUS_ADDRESS, so a private
+        # dbus-daemon with a fake notification server can be used instead
+        if self._bus is None:
+            self._bus = Gio.bus_get_sync(Gio.BusType.SESSION, None)
+        return self._bus
+
+    def _load_id(self, tag: str) -> int:
+        if tag not in self._ids:
+            # Short-lived callers (one process per key press) share ids on disk
+            try:
+                with open(runtime_file(f"notify-{tag}.id"), "r") as stream:
+                    self._ids[tag] = int(stream.read().strip() or 0)
+            except (OSError, ValueError):
+                self._ids[tag] = 0
+        return self._ids[tag]
+
+    def _store_id(self, tag: str, notification_id: int) -> None:
+        if self._ids.get(tag) == notification_id:
+            return
+        self._ids[tag] = notification_id
+        try:
+            with open(runtime_file(f"notify-{tag}.id"), "w") as stream:
+                stream.write(str(notification_id))
+        except OSError:
+            pass
+
+    def notify(
+        self,
+        summary: str,
+        body: str = "",
+        tag: str = None,
+        transient: bool = False,
+        timeout: int = -1,
+    ) -> int:
+        """Show a notification, replacing the previous one with the same tag"""
+        replaces_id: int = self._load_id(tag) if tag else 0
+        hints: dict = {}
+        if tag:
+            hints["x-canonical-private-synchronous"] = GLib.Variant("s", tag)
+        if transient:
+            hints["transient"] = GLib.Variant("b", True)
+
+        try:
+            reply = self.bus.call_sync(
+                NOTIFICATIONS_NAME,
+                NOTIFICATIONS_PATH,
+                NOTIFICATIONS_NAME,
+                "Notify",
+                GLib.Variant(
+                    "(susssasa{sv}i)",
+                    (self.app_name, replaces_id, "", summary, body, [], hints, timeout),
+                ),
+                GLib.VariantType("(u)"),
+                Gio.DBusCallFlags.NONE,
+                NOTIFY_TIMEOUT_MS,
+                None,
+            )
+        except GLib.Error as exc:
+            # stderr: stdout may be a polybar module
+            print(f"Error sending notification: {exc.message}", file=sys.stderr)
+            return 0
+
+        notification_id: int = reply.unpack()[0]
+        if tag:
+            self._store_id(tag, notification_id)
+        return notification_id
@@ -0,0 +1,51 @@
+"""AC/battery state from sysfs and power_supply uevents.
+
+The kernel broadcasts a uevent on the NETLINK_KOBJECT_UEVENT socket whenever a
+power supply changes (adapter plugged, battery charging state...), the same
+events UPower listens to, so no daemon is needed to follow them.
+"""
+
+import os
+import socket
+
+POWER_SUPPLY_PATH: str = "/sys/class/power_supply"
+NETLINK_KOBJECT_UEVENT: int = 15
+# Multicast group of the kernel's uevents (1), udev re-broadcasts on group 2
+KERNEL_GROUP: int = 1
+
+
+def _read(path: str) -> str:
+    try:
+        with open(path, "r") as stream:
+            return stream.read().strip()
+    except OSError:
+        return ""
+
+
+def on_battery(root: str = POWER_SUPPLY_PATH) -> bool:
+    """True when a battery is present and no AC adapter is online"""
+    try:
+        supplies: list = os.listdir(root)
+    except OSError:
+        return False
+    battery: bool = False
+    for supply in supplies:
+        kind: str = _read(f"{root}/{supply}/type")
+        if kind == "Mains" and _read(f"{root}/{supply}/online") == "1":
+            return False
+        battery = battery or kind == "Battery"
+    return battery
+
+
+def uevents(subsystem: str = "power_supply"):
+    """Yield {KEY: value} for each kernel uevent of a subsystem, blocking between them"""
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+    with sock:
+        # Port 0: the kernel assigns one, so several listeners can coexist
+        sock.bind((0, KERNEL_GROUP))
+        while True:
+            # "action@devpath\0KEY=value\0KEY=value..."
+            fields: list = sock.recv(8192).decode("utf-8", "replace").split("\0")
+            event: dict = dict(field.split("=", 1) for field in fields[1:] if "=" in field)
+            if event.get("SUBSYSTEM") == subsystem:
+                yield event
@@ -0,0 +1,89 @@
+"""Optional latency tracing for the ZUI modules.
+
+Tracing is off unless ZUI_TRACE is set in the environment: "1" appends events
+to $XDG_RUNTIME_DIR/zui/trace.jsonl, any other value is used as the JSONL path.
+Every finished event is also kept in an in-memory ring buffer for long-running
+processes. Whether tracing is on or not, each finished event is also counted in
+the metrics registry (see zui.metrics).
+
+Timestamps come from CLOCK_BOOTTIME, the clock /proc uses for process start
+times, so the first stage of a one-shot process is measured from the moment it
+was spawned (with clock tick resolution, usually 10 ms).
+"""
+
+import json
+import os
+import time
+from collections import deque
+
+from zui import runtime_file
+from zui.metrics import registry
+
+TRACE_ENV: str = "ZUI_TRACE"
+RING_SIZE: int = 1024
+
+ring: deque = deque(maxlen=RING_SIZE)
+
+
+def _now_ns() -> int:
+    return time.clock_gettime_ns(time.CLOCK_BOOTTIME)
+
+
+def _process_start_ns() -> int:
+    """Process start time on CLOCK_BOOTTIME, read from /proc/self/stat"""
+    try:
+        with open("/proc/self/stat", "r") as stream:
+            # Skip "pid (comm)": comm may contain spaces. starttime is field 22.
+            fields = stream.read().rsplit(")", 1)[1].split()
+        return int(fields[19]) * 1_000_000_000 // os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return _now_ns()
+
+
+def trace_path() -> str:
+    value: str = os.getenv(TRACE_ENV, "")
+    if value in ("", "0"):
+        return None
+    if value == "1":
+        return runtime_file("trace.jsonl")
+    return value
+
+
+class Tracer:
+    """Records named stages of one event (a key press, a monitor setup...)"""
+
+    def __init__(self, module: str, event: str = None, from_process_start: bool = True) -> None:
+        self.module = module
+        self.event = event
+        self.path: str = trace_path()
+        self.enabled: bool = self.path is not None
+        self.started_ns: int = _process_start_ns() if from_process_start else _now_ns()
+        self.stages: list = [("start", self.started_ns)] if self.enabled else []
+        # Processes spawned from this thread are counted for this module
+        registry.scope.module = module
+
+    def mark(self, stage: str) -> None:
+        if self.enabled:
+            self.stages.append((stage, _now_ns()))
+
+    def finish(self, ok: bool = True) -> dict:
+        """Count the event in the metrics, store it in the ring buffer and the JSONL file"""
+        # Written out by the registry's periodic and exit flushes
+        registry.record_event(self.module, self.event, (_now_ns() - self.started_ns) / 1e9, ok)
+        if not self.enabled or len(self.stages) < 2:
+            return None
+        start: int = self.stages[0][1]
+        record: dict = {
+            "module": self.module,
+            "event": self.event,
+            "time": time.time(),
+            # Milliseconds since the first stage
+            "stages": {stage: (ts - start) / 1e6 for stage, ts in self.stages},
+        }
+        ring.append(record)
+        try:
+            with open(self.path, "a") as stream:
+                stream.write(json.dumps(record) + "\n")
+        except OSError as exc:
+            print(f"Error writing trace: {exc}")
+        return record
@@ -1,50 +1,357 @@
 #!/user/bin/python3
 
-import subprocess
 import os
+import sys
+
+CONFIG_PATH: str = f"{os.getenv('HOME')}/.zui/core/system/config.yml"
+ICONS_CONFIG_PATH: str = f"{os.getenv('HOME')}/.config/polybar/icons.yml"
+ZUI_LIB_PATH: str = f"{os.getenv('HOME')}/.zui/core/system/lib"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui.tracing import Tracer
+
+tracer = Tracer('audio')
+
+import time
 import argparse
+import threading
 import yaml
 import pulsectl
+try:
+    # Private to pulsectl, only used to pipeline stream moves (see _can_pipeline)
+    from pulsectl import _pulsectl as libpulse
+except ImportError:
+    libpulse = None
+from contextlib import contextmanager
+from zui.notify import Notifier
 
-CONFIG_PATH: str = f"{os.getenv('HOME')}/.zui/core/system/config.yml"
-ICONS_CONFIG_PATH: str = f"{os.getenv('HOME')}/.config/polybar/icons.yml"
+tracer.mark('imports')
+notifier = Notifier('Audio')
+# Reconnect delay of the headset watcher when the sound server goes away
+HEADSET_RETRY_S: float = 5.0
+# Release whose internals move_sink_inputs() pipelines through
+PIPELINE_PULSECTL: str = "24.12.0"
+pipeline_reported: bool = False
+# Set by start_service() when the module is hosted by zuid
+persistent_pulse: pulsectl.Pulse = None
+service_mode: bool = False
+headset_watcher = None
+
+
+def start_service() -> None:
+    """zuid hook: keep one Pulse connection open for every request, and watch for headsets"""
+    global service_mode, headset_watcher
+    service_mode = True
+    headset_watcher = HeadsetWatcher()
+    threading.Thread(target=headset_watcher.run, daemon=True, name='headset-watcher').start()
+
+
+@contextmanager
+def pulse_connection():
+    global persistent_pulse
+    if not service_mode:
+        with pulsectl.Pulse('volume-increaser') as pulse:
+            yield pulse
+        return
+    if persistent_pulse is None or not persistent_pulse.connected:
+        persistent_pulse = pulsectl.Pulse('zuid-audio')
+    yield persistent_pulse
+
+
+def sink_icon(config: dict, audio_icons: dict, sink_name: str) -> str:
+    try:
+        return audio_icons[config['audio'][sink_name]['type']]
+    except KeyError:
+        return audio_icons['speakers']
 
 
 def get_current_sink_icon(config: dict) -> str:
-    with pulsectl.Pulse('volume-increaser') as pulse:
+    with pulse_connection() as pulse:
         defaults: dict = load_config(ICONS_CONFIG_PATH)
-        audio_icons: dict = defaults['audio']
-        try:
-            icon: str = audio_icons[config['audio'][pulse.server_info().default_sink_name]['type']]
-        except KeyError:
-            icon: str = audio_icons['speakers']
+        icon: str = sink_icon(config, defaults['audio'], pulse.server_info().default_sink_name)
         print(icon)
         return icon
 
 
+def _stop_event_loop(event) -> None:
+    raise pulsectl.PulseLoopStop
+
+
+def watch_sink_icon(config: dict) -> None:
+    """Polybar tail mode: print the sink icon whenever the default sink changes"""
+    audio_icons: dict = load_config(ICONS_CONFIG_PATH)['audio']
+    last_icon: str = None
+    with pulsectl.Pulse('sink-icon-watcher') as pulse:
+        # Default sink changes are reported as server change events
+        pulse.event_mask_set('server')
+        pulse.event_callback_set(_stop_event_loop)
+        while True:
+            icon: str = sink_icon(config, audio_icons, pulse.server_info().default_sink_name)
+            if icon != last_icon:
+                print(icon, flush=True)
+                last_icon = icon
+            pulse.event_listen()
+
+
+def sink_alias(config: dict, sink_name: str) -> str:
+    try:
+        return config['audio'][sink_name]['alias']
+    except KeyError:
+        return sink_name
+
+
 def get_current_sink_name(config: dict) -> str:
-    with pulsectl.Pulse('volume-increaser') as pulse:
-        try:
-            name: str = config['audio'][pulse.server_info().default_sink_name]['alias']
-        except KeyError:
-            name: str = pulse.server_info().default_sink_name
+    with pulse_connection() as pulse:
+        name: str = sink_alias(config, pulse.server_info().default_sink_name)
         print(name)
         return name
 
 
+def rotation(config: dict, sinks: list) -> list:
+    """Names of the sinks next-sink cycles through, in the server's order"""
+    try:
+        blacklist: list = config['audio']['blacklist'].split(',')
+    except KeyError:
+        blacklist = []
+    return [sink.name for sink in sinks if sink.name not in blacklist]
+
+
+def app_rules(config: dict) -> dict:
+    """audio.app_rules from config.yml: application name or binary (lowercase) -> "stay" or a sink name"""
+    rules: dict = ((config or {}).get('audio') or {}).get('app_rules') or {}
+    return {str(app).lower(): str(rule) for app, rule in rules.items()}
+
+
+def stream_rule(rules: dict, sink_input) -> str:
+    for key in ('application.name', 'application.process.binary'):
+        rule: str = rules.get(sink_input.proplist.get(key, '').lower())
+        if rule is not None:
+            return rule
+    return None
+
+
+def _can_pipeline(pulse) -> bool:
+    """Whether the pulsectl internals move_sink_inputs() relies on are all there.
+
+    Written against pulsectl 24.12.0: Pulse._ctx and Pulse._pulse_iterate(),
+    and from _pulsectl the PA_CONTEXT_SUCCESS_CB_T callback type, the
+    context_move_sink_input_by_index binding and LibPulse.CallError.
+    """
+    pa = getattr(libpulse, 'pa', None)
+    return (
+        getattr(pulse, '_ctx', None) is not None
+        and callable(getattr(pulse, '_pulse_iterate', None))
+        and hasattr(libpulse, 'PA_CONTEXT_SUCCESS_CB_T')
+        and hasattr(pa, 'context_move_sink_input_by_index')
+        and hasattr(pa, 'CallError')
+    )
+
+
+def move_sink_inputs(pulse, moves: list) -> dict:
+    """Move (sink input index, sink index) pairs in one round trip: sink input index -> moved.
+
+    pulsectl waits for each operation before sending the next one, so every
+    move is sent on the connection first and the replies collected together.
+    When a pulsectl release changes the internals this needs, the moves go
+    through its public API instead, one round trip each.
+    """
+    global pipeline_reported
+    results: dict = {}
+    if not _can_pipeline(pulse):
+        if not pipeline_reported:
+            pipeline_reported = True
+            print(f"pulsectl internals differ from {PIPELINE_PULSECTL}, moving streams one at a time")
+        for input_index, sink_index in moves:
+            try:
+                pulse.sink_input_move(input_index, sink_index)
+                results[input_index] = True
+            except pulsectl.PulseOperationFailed:
+                results[input_index] = False
+        return results
+    # ctypes callbacks must outlive their operation
+    callbacks: list = []
+    for input_index, sink_index in moves:
+        callback = libpulse.PA_CONTEXT_SUCCESS_CB_T(
+            lambda ctx, success, userdata, index=input_index: results.__setitem__(index, bool(success))
+        )
+        callbacks.append(callback)
+        try:
+            libpulse.pa.context_move_sink_input_by_index(pulse._ctx, input_index, sink_index, callback, None)
+        except libpulse.pa.CallError:
+            results[input_index] = False
+    while pulse.connected and len(results) < len(moves):
+        pulse._pulse_iterate()
+    return results
+
+
+def follow_default(pulse, config: dict, sink_name: str, sinks: list = None) -> None:
+    """Move the playing streams to the new default sink, except the ones app_rules keep elsewhere"""
+    started: float = time.monotonic()
+    sink_indexes: dict = {sink.name: sink.index for sink in sinks or pulse.sink_list()}
+    rules: dict = app_rules(config)
+    moves: list = []
+    pinned: list = []
+    for sink_input in pulse.sink_input_list():
+        rule: str = stream_rule(rules, sink_input)
+        # Rules naming a sink that isn't there leave the stream to the default
+        if rule == 'stay' or rule in sink_indexes:
+            pinned.append(sink_input.proplist.get('application.name', str(sink_input.index)))
+        if rule == 'stay':
+            continue
+        target: int = sink_indexes.get(rule, sink_indexes.get(sink_name))
+        if target is not None and sink_input.sink != target:
+            moves.append((sink_input.index, target))
+    if not moves and not pinned:
+        return
+    results: dict = move_sink_inputs(pulse, moves) if moves else {}
+    summary: str = f"Moved {sum(results.values())} of {len(moves)} streams to {sink_alias(config, sink_name)}"
+    if pinned:
+        summary += f", {len(pinned)} pinned ({', '.join(sorted(set(pinned)))})"
+    print(f"{summary} in {(time.monotonic() - started) * 1000:.1f} ms")
+
+
 def next_sink(config: dict) -> None:
-    with pulsectl.Pulse('volume-increaser') as pulse:
+    with pulse_connection() as pulse:
+        tracer.mark('connect')
         current_sink: str = pulse.server_info().default_sink_name
+        sinks: list = pulse.sink_list()
+        names: list = rotation(config, sinks)
+        if not names:
+            return
+        # The sink after the current one, set in a single call
+        new_sink: str = names[(names.index(current_sink) + 1) % len(names)] if current_sink in names else names[0]
+        if new_sink != current_sink:
+            pulse.sink_default_set(new_sink)
+        tracer.mark('set')
+        follow_default(pulse, config, new_sink, sinks)
+        tracer.mark('move')
+        send_notification(config, sink_name=new_sink)
+
+
+def headset_profiles(config: dict) -> dict:
+    """audio.bluetooth_headsets from config.yml: card name -> preferred profile"""
+    return ((config or {}).get('audio') or {}).get('bluetooth_headsets') or {}
+
+
+def pick_profile(card, wanted: str) -> str:
+    """wanted if the card lists it, else the card's best available profile named like it.
+
+    "a2dp" picks among a2dp-sink, a2dp-sink-aac, a2dp-sink-sbc... by priority.
+    """
+    profiles: list = [profile for profile in card.profile_list if getattr(profile, 'available', 1)]
+    for profile in profiles:
+        if profile.name == wanted:
+            return profile.name
+    matching: list = [profile for profile in profiles if profile.name.startswith(wanted)]
+    if not matching:
+        return None
+    return max(matching, key=lambda profile: profile.priority).name
+
+
+class HeadsetWatcher:
+    """Brings configured Bluetooth headsets up in their profile and makes them the default sink.
+
+    A headset's card often comes up in the profile it last used (HSP/HFP
+    after a call) and its sink only exists once the profile is active. The
+    profile is switched as soon as the card appears and the profile's sink
+    becomes the default as soon as it's created, so connecting the headset
+    is all it takes. Connect to audio-ready is traced as headset-ready.
+    """
+
+    def __init__(self, connect=pulsectl.Pulse) -> None:
+        self.connect = connect
+        self.events: list = []
+        # card index -> profile, tracer and start time of headsets waiting for their sink
+        self.pending: dict = {}
+
+    def _on_event(self, event) -> None:
+        self.events.append(event)
+        raise pulsectl.PulseLoopStop
+
+    def card_added(self, pulse, index: int, config: dict) -> None:
         try:
-            blacklist: list = config['audio']['blacklist'].split(',')
-        except KeyError:
-            blacklist = []
-        blacklist.append(current_sink)
+            card = pulse.card_info(index)
+        except pulsectl.PulseIndexError:
+            return
+        wanted: str = headset_profiles(config).get(card.name)
+        if wanted is None:
+            return
+        headset_tracer = Tracer('audio', 'headset-ready', from_process_start=False)
+        started: float = time.monotonic()
+        profile: str = pick_profile(card, wanted)
+        if profile is None:
+            print(f"{card.name} has no available {wanted} profile")
+            return
+        if card.profile_active.name != profile:
+            pulse.card_profile_set(card, profile)
+        headset_tracer.mark('profile')
+        self.pending[index] = (profile, headset_tracer, started)
+        # The sink is already there when the card came up in its profile
         for sink in pulse.sink_list():
-            if sink.name not in blacklist:
-                pulse.sink_default_set(sink.name)
-        send_notification(config)
-        
+            if sink.card == index:
+                self.sink_added(pulse, sink.index, config)
+
+    def sink_added(self, pulse, index: int, config: dict) -> None:
+        try:
+            sink = pulse.sink_info(index)
+        except pulsectl.PulseIndexError:
+            return
+        if sink.card not in self.pending:
+            return
+        profile, headset_tracer, started = self.pending[sink.card]
+        try:
+            active: str = pulse.card_info(sink.card).profile_active.name
+        except pulsectl.PulseIndexError:
+            # The card went away, its remove event is on the way
+            return
+        # Sinks of the profile the card is leaving can still show up
+        if active != profile:
+            return
+        del self.pending[sink.card]
+        headset_tracer.mark('sink')
+        pulse.sink_default_set(sink.name)
+        headset_tracer.mark('default')
+        follow_default(pulse, config, sink.name)
+        headset_tracer.mark('move')
+        headset_tracer.finish()
+        print(f"{sink_alias(config, sink.name)} ready in {(time.monotonic() - started) * 1000:.0f} ms ({profile})")
+        send_notification(config, sink_name=sink.name)
+
+    def handle_event(self, pulse, event, config: dict) -> None:
+        if event.facility == 'card' and event.t == 'new':
+            self.card_added(pulse, event.index, config)
+        elif event.facility == 'card' and event.t == 'remove':
+            self.pending.pop(event.index, None)
+        elif event.facility == 'sink' and event.t == 'new':
+            self.sink_added(pulse, event.index, config)
+
+    def watch(self, pulse) -> None:
+        pulse.event_mask_set('card', 'sink')
+        pulse.event_callback_set(self._on_event)
+        config: dict = load_config(CONFIG_PATH)
+        # Headsets connected before the watcher started
+        for card in pulse.card_list():
+            self.card_added(pulse, card.index, config)
+        while True:
+            pulse.event_listen()
+            events, self.events = self.events, []
+            if any(event.facility == 'card' and event.t == 'new' for event in events):
+                config = load_config(CONFIG_PATH)
+            for event in events:
+                self.handle_event(pulse, event, config)
+
+    def run(self) -> None:
+        """Watch for the whole session, reconnecting when the sound server restarts"""
+        while True:
+            try:
+                with self.connect('zui-headset-watcher') as pulse:
+                    self.watch(pulse)
+            except (pulsectl.PulseError, pulsectl.PulseDisconnected) as exc:
+                print(f"Headset watcher lost the sound server: {exc}")
+            self.pending.clear()
+            self.events = []
+            time.sleep(HEADSET_RETRY_S)
+
 
 def load_config(config: str) -> dict:
     with open(config, 'r') as stream:
@@ -55,14 +362,21 @@ def load_config(config: str) -> dict:
             print("Error loading system configuration")
 
 
-def send_notification(config: dict = {}, msg: str = "") -> None:
+def send_notification(config: dict = {}, msg: str = "", sink_name: str = None) -> None:
     if msg == "":
-        subprocess.Popen(['polybar-msg', 'action', '#audio-icon.hook.0'])
-        subprocess.Popen(['notify-send', 'Audio', f"Changed to {get_current_sink_name(config)} {get_current_sink_icon(config)}"])
+        if sink_name is None:
+            with pulse_connection() as pulse:
+                sink_name = pulse.server_info().default_sink_name
+        audio_icons: dict = load_config(ICONS_CONFIG_PATH)['audio']
+        notifier.notify(
+            'Audio',
+            f"Changed to {sink_alias(config, sink_name)} {sink_icon(config, audio_icons, sink_name)}",
+            tag='audio-sink',
+        )
     else:
-        subprocess.Popen(['notify-send', 'Audio', f"Volume {msg}", 
-                         '-h', 'string:x-canonical-private-synchronous:anything',
-                         '-h', 'int:transient:1'])
+        # Volume bubbles share one notification id so they update in place
+        notifier.notify('Audio', f"Volume {msg}", tag='audio-volume', transient=True)
+    tracer.mark('notify')
 
 
 def volume(config: dict, action: str) -> None:
@@ -70,9 +384,11 @@ def volume(config: dict, action: str) -> None:
     MIN_VOLUME: float = 0.0  # 0%
     MAX_VOLUME: float = 1.0  # 100%
     
-    with pulsectl.Pulse('volume-increaser') as pulse:
+    with pulse_connection() as pulse:
+        tracer.mark('connect')
+        default_sink_name: str = pulse.server_info().default_sink_name
         for s in pulse.sink_list():
-            if pulse.server_info().default_sink_name == s.name:
+            if default_sink_name == s.name:
                 sink = s
             else:
                 continue
@@ -83,41 +399,65 @@ def volume(config: dict, action: str) -> None:
                 pulse.mute(sink, False)
             new_volume = min(current_volume + VOLUME_STEP, MAX_VOLUME)
             pulse.volume_set_all_chans(sink, new_volume)
+            tracer.mark('set')
             send_notification(msg=f"up {int(new_volume * 100)}%")
         elif action == 'down':
             if sink.mute:
                 pulse.mute(sink, False)
             new_volume = max(current_volume - VOLUME_STEP, MIN_VOLUME)
             pulse.volume_set_all_chans(sink, new_volume)
+            tracer.mark('set')
             send_notification(msg=f"down {int(new_volume * 100)}%")
         elif action == 'mute':
             if sink.mute:
-                send_notification(msg="unmuted")
                 pulse.mute(sink, False)
+                tracer.mark('set')
+                send_notification(msg="unmuted")
             else:
-                send_notification(msg="muted")
                 pulse.mute(sink)
+                tracer.mark('set')
+                send_notification(msg="muted")
             
 
 
-if __name__ == '__main__':
-    config: dict = load_config(CONFIG_PATH)
-
-    parser = argparse.ArgumentParser()
-    parser.add_argument('option', type=str)
-    args = parser.parse_args()
-
-    if args.option == 'send-notification':
+def handle(option: str, config: dict) -> None:
+    if option == 'send-notification':
         send_notification(config=config)
-    elif args.option == 'get-current-sink-icon':
+    elif option == 'get-current-sink-icon':
         get_current_sink_icon(config)
-    elif args.option == 'get-current-sink-name':
+    elif option == 'watch-sink-icon':
+        try:
+            watch_sink_icon(config)
+        except KeyboardInterrupt:
+            pass
+    elif option == 'watch-headsets':
+        if service_mode:
+            print('Already watching for headsets in zuid')
+            return
+        try:
+            HeadsetWatcher().run()
+        except KeyboardInterrupt:
+            pass
+    elif option == 'get-current-sink-name':
         get_current_sink_name(config)
-    elif args.option == 'next-sink':
+    elif option == 'next-sink':
         next_sink(config)
-    elif args.option == 'up':
+    elif option == 'up':
         volume(config, 'up')
-    elif args.option == 'down':
+    elif option == 'down':
         volume(config, 'down')
-    elif args.option == 'mute':
+    elif option == 'mute':
         volume(config, 'mute')
+
+
+if __name__ == '__main__':
+    config: dict = load_config(CONFIG_PATH)
+    tracer.mark('config')
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('option', type=str)
+    args = parser.parse_args()
+    tracer.event = args.option
+
+    handle(args.option, config)
+    tracer.finish()
@@ -1,3 +1,13 @@
 #!/usr/bin/env bash
 
-echo $(python3 $(dirname $0)/core.py $1)
\ No newline at end of file
+ZUID_CLIENT="$(dirname $0)/../../zuid/client.py"
+
+# One-shot commands go through zuid when it's running (exit code 75 means it isn't).
+# Watchers are long-running and always get their own process.
+if [[ $1 != watch-* ]]; then
+    python3 -S "${ZUID_CLIENT}" audio $1
+    status=$?
+    [[ ${status} -ne 75 ]] && exit ${status}
+fi
+
+exec python3 $(dirname $0)/core.py $1
@@ -0,0 +1,190 @@
+#!/usr/bin/python3
+
+import os
+import subprocess
+import yaml
+import gi
+gi.require_version("Gio", "2.0")
+from gi.repository import Gio, GLib
+
+HOME: str = os.getenv("HOME")
+CONFIG_PATH: str = f"{HOME}/.zui/core/system/config.yml"
+
+# Players supporting the MPRIS spec are supported (spotify, vlc, chromium, mpv...)
+DEFAULT_PLAYER: str = "spotify"
+# Attributes: title, artist, album
+DEFAULT_FORMAT: str = "{title} - {artist}"
+WINDOW_LENGTH: int = 33
+SCROLL_PADDING: str = " - "
+SCROLL_DELAY_MS: int = 100
+
+MPRIS_PATH: str = "/org/mpris/MediaPlayer2"
+MPRIS_PLAYER_IFACE: str = "org.mpris.MediaPlayer2.Player"
+PROPERTIES_IFACE: str = "org.freedesktop.DBus.Properties"
+
+# polybar hooks of the spotify-play-pause module
+PLAY_HOOK: str = "#spotify-play-pause.hook.0"
+PAUSE_HOOK: str = "#spotify-play-pause.hook.1"
+
+
+def load_config() -> dict:
+    try:
+        with open(CONFIG_PATH, "r") as stream:
+            return yaml.safe_load(stream) or {}
+    except (OSError, yaml.YAMLError) as exc:
+        print(exc)
+        return {}
+
+
+class Attributes(dict):
+    """Format attributes, the ones the player doesn't know about are empty"""
+
+    def __missing__(self, key: str) -> str:
+        return ""
+
+
+def format_metadata(metadata: dict, fmt: str) -> str:
+    """Render MPRIS metadata with the configured format.
+
+    Unknown placeholders are left empty and a format that can't be used at all
+    (positional fields, unbalanced braces...) falls back to the default one:
+    the label is printed on every update, it can't take the listener down.
+    """
+    artist = metadata.get("xesam:artist", "")
+    if isinstance(artist, list):
+        artist = ", ".join(artist)
+    attributes = Attributes(
+        title=metadata.get("xesam:title", ""),
+        artist=artist,
+        album=metadata.get("xesam:album", ""),
+    )
+    try:
+        return fmt.format_map(attributes)
+    except (ValueError, AttributeError, IndexError, KeyError, TypeError):
+        return DEFAULT_FORMAT.format_map(attributes)
+
+
+class SpotifyListener:
+    """Follows an MPRIS player over the session bus and prints the label for polybar.
+
+    The label is only printed when it actually changes, and the scroll timer only
+    runs while a song that doesn't fit the window is playing.
+    """
+
+    def __init__(self, bus: Gio.DBusConnection, player: str, fmt: str) -> None:
+        self.bus = bus
+        self.bus_name = f"org.mpris.MediaPlayer2.{player}"
+        self.fmt = fmt
+        self.owner: str = None
+        self.status: str = None
+        self.text: str = ""
+        self.offset: int = 0
+        self.timer: int = None
+        self.last_line: str = None
+
+    def start(self) -> None:
+        self.bus.signal_subscribe(
+            None,
+            PROPERTIES_IFACE,
+            "PropertiesChanged",
+            MPRIS_PATH,
+            MPRIS_PLAYER_IFACE,
+            Gio.DBusSignalFlags.NONE,
+            self._on_properties_changed,
+        )
+        Gio.bus_watch_name_on_connection(
+            self.bus,
+            self.bus_name,
+            Gio.BusNameWatcherFlags.NONE,
+            self._on_name_appeared,
+            self._on_name_vanished,
+        )
+        self.redraw()
+
+    def _on_name_appeared(self, bus: Gio.DBusConnection, name: str, owner: str) -> None:
+        self.owner = owner
+        try:
+            reply = bus.call_sync(
+                self.bus_name,
+                MPRIS_PATH,
+                PROPERTIES_IFACE,
+                "GetAll",
+                GLib.Variant("(s)", (MPRIS_PLAYER_IFACE,)),
+                GLib.VariantType("(a{sv})"),
+                Gio.DBusCallFlags.NONE,
+                1000,
+                None,
+            )
+        except GLib.Error as exc:
+            print(f"Error reading player properties: {exc.message}", flush=True)
+            return
+        self.update(reply.unpack()[0])
+
+    def _on_name_vanished(self, bus: Gio.DBusConnection, name: str) -> None:
+        self.owner = None
+        self.update({"PlaybackStatus": None, "Metadata": {}})
+
+    def _on_properties_changed(self, bus, sender, path, iface, signal, params) -> None:
+        if sender != self.owner:
+            return
+        interface, changed, _invalidated = params.unpack()
+        if interface == MPRIS_PLAYER_IFACE:
+            self.update(changed)
+
+    def update(self, properties: dict) -> None:
+        if "PlaybackStatus" in properties and properties["PlaybackStatus"] != self.status:
+            self.status = properties["PlaybackStatus"]
+            if self.status in ("Playing", "Paused"):
+                hook = PAUSE_HOOK if self.status == "Playing" else PLAY_HOOK
+                subprocess.Popen(
+                    ["polybar-msg", "action", hook],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+        if "Metadata" in properties:
+            text = format_metadata(properties["Metadata"], self.fmt)
+            if text != self.text:
+                self.text = text
+                self.offset = 0
+
+        scrolling = self.status == "Playing" and len(self.text) > WINDOW_LENGTH
+        if scrolling and self.timer is None:
+            self.timer = GLib.timeout_add(SCROLL_DELAY_MS, self._on_tick)
+        elif not scrolling and self.timer is not None:
+            GLib.source_remove(self.timer)
+            self.timer = None
+        self.redraw()
+
+    def _on_tick(self) -> bool:
+        self.offset = (self.offset + 1) % (len(self.text) + len(SCROLL_PADDING))
+        self.redraw()
+        return True
+
+    def render(self) -> str:
+        if self.status not in ("Playing", "Paused") or not self.text:
+            return " " * WINDOW_LENGTH
+        if len(self.text) <= WINDOW_LENGTH:
+            return self.text.ljust(WINDOW_LENGTH)
+        loop = self.text + SCROLL_PADDING
+        return (loop[self.offset:] + loop[: self.offset])[:WINDOW_LENGTH]
+
+    def redraw(self) -> None:
+        line = self.render()
+        if line != self.last_line:
+            self.last_line = line
+            print(line, flush=True)
+
+
+if __name__ == "__main__":
+    spotify_config: dict = load_config().get("spotify") or {}
+
+    listener = SpotifyListener(
+        Gio.bus_get_sync(Gio.BusType.SESSION, None),
+        spotify_config.get("player", DEFAULT_PLAYER),
+        spotify_config.get("format", DEFAULT_FORMAT),
+    )
+    listener.start()
+    try:
+        GLib.MainLoop().run()
+    except KeyboardInterrupt:
+        pass
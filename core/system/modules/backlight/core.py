@@ -0,0 +1,242 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import math
+import time
+import threading
+
+HOME: str = os.getenv("HOME")
+CONFIG_PATH: str = f"{HOME}/.zui/core/system/config.yml"
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui import runtime_file
+from zui.tracing import Tracer
+
+tracer = Tracer("backlight")
+
+import yaml
+
+tracer.mark("imports")
+
+BACKLIGHT_PATH: str = "/sys/class/backlight"
+# Kernel backlight types, from most to least preferred
+TYPE_PRIORITY: dict = {"firmware": 0, "platform": 1, "raw": 2}
+
+# Levels are perceptual (0.0 - 1.0), mapped to raw values with a logarithmic curve
+LEVEL_STEP: float = 0.05
+# Never go below 5% of the raw range, the panel would look off
+MIN_BRIGHTNESS: float = 0.05
+CURVE_BASE: float = 100.0
+FRAME_RATE: int = 60
+STEP_DURATION_MS: int = 120
+
+# Highest level allowed (perceptual, 0.0 - 1.0), written by the power module on battery
+CAP_STATE: str = "backlight-cap"
+# Raw brightness before the cap lowered it, restored when the cap is lifted
+RESTORE_STATE: str = "backlight-restore"
+
+# Set by start_service() when the module is hosted by zuid
+service_mode: bool = False
+devices: dict = {}
+
+
+def start_service() -> None:
+    """zuid hook: keep the device open and animate in the background"""
+    global service_mode
+    service_mode = True
+
+
+def load_config() -> dict:
+    with open(CONFIG_PATH, "r") as stream:
+        try:
+            return yaml.safe_load(stream)
+        except yaml.YAMLError as exc:
+            print(exc)
+            return None
+
+
+def _read(path: str, default: str = "") -> str:
+    try:
+        with open(path, "r") as stream:
+            return stream.read().strip()
+    except OSError:
+        return default
+
+
+def find_device(root: str = BACKLIGHT_PATH, preferred: str = None) -> str:
+    """Pick the backlight device driving the panel.
+
+    Devices attached to a connected DRM connector (e.g. card0-eDP-1) win, then
+    the kernel's type priority (firmware > platform > raw) breaks ties.
+    """
+    try:
+        names: list = sorted(os.listdir(root))
+    except OSError:
+        return None
+    if preferred in names:
+        return f"{root}/{preferred}"
+
+    candidates: list = []
+    for name in names:
+        path: str = f"{root}/{name}"
+        if int(_read(f"{path}/max_brightness", "0") or 0) <= 0:
+            continue
+        connected: bool = _read(f"{path}/device/status") == "connected"
+        priority: int = TYPE_PRIORITY.get(_read(f"{path}/type", "raw"), len(TYPE_PRIORITY))
+        candidates.append((not connected, priority, name))
+    if not candidates:
+        return None
+    return f"{root}/{min(candidates)[2]}"
+
+
+def read_cap() -> float:
+    try:
+        with open(runtime_file(CAP_STATE), "r") as stream:
+            return min(1.0, float(stream.read().strip()))
+    except (OSError, ValueError):
+        return 1.0
+
+
+def to_level(raw: int, max_brightness: int) -> float:
+    return math.log1p((CURVE_BASE - 1) * raw / max_brightness) / math.log(CURVE_BASE)
+
+
+def to_raw(level: float, max_brightness: int) -> int:
+    return round(max_brightness * (CURVE_BASE**level - 1) / (CURVE_BASE - 1))
+
+
+class Backlight:
+    """Animated brightness changes on one sysfs device.
+
+    The brightness file stays open, repeated steps only move the target of the
+    running animation, and a raw value is written at most once per frame.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.max_brightness: int = int(_read(f"{path}/max_brightness"))
+        self.fd: int = os.open(f"{path}/brightness", os.O_RDWR)
+        self.min_level: float = to_level(max(1, self.max_brightness * MIN_BRIGHTNESS), self.max_brightness)
+        self.cond = threading.Condition()
+        self.level: float = None
+        self.target: float = None
+        self.animation: threading.Thread = None
+
+    def read_raw(self) -> int:
+        return int(os.pread(self.fd, 32, 0).strip())
+
+    def write_raw(self, raw: int) -> None:
+        data: bytes = str(raw).encode()
+        os.pwrite(self.fd, data, 0)
+        try:
+            # sysfs takes the write as a whole, a regular file keeps the old tail
+            os.ftruncate(self.fd, len(data))
+        except OSError:
+            pass
+
+    def percent(self) -> int:
+        return round(100 * self.read_raw() / self.max_brightness)
+
+    def step(self, direction: int) -> float:
+        with self.cond:
+            if self.animation is None:
+                # Nothing in flight: start from the real value, it may have
+                # been changed by someone else
+                self.level = to_level(self.read_raw(), self.max_brightness)
+                self.target = self.level
+            return self._animate_to(self.target + direction * LEVEL_STEP)
+
+    def set_level(self, level: float) -> float:
+        with self.cond:
+            if self.animation is None:
+                self.level = to_level(self.read_raw(), self.max_brightness)
+            return self._animate_to(level)
+
+    def _animate_to(self, level: float) -> float:
+        """Move the animation target (lock held), within the minimum and the cap"""
+        cap: float = max(self.min_level, read_cap())
+        self.target = min(cap, max(self.min_level, level))
+        if self.animation is None:
+            self.animation = threading.Thread(target=self._animate, daemon=True)
+            self.animation.start()
+        return self.target
+
+    def _animate(self) -> None:
+        frame: float = 1 / FRAME_RATE
+        frames_per_step: float = STEP_DURATION_MS / 1000 * FRAME_RATE
+        last_raw: int = None
+        while True:
+            with self.cond:
+                remaining: float = self.target - self.level
+                if abs(remaining) < 1e-6:
+                    self.animation = None
+                    self.cond.notify_all()
+                    return
+                # Coalesced key repeats make the remaining distance longer, so
+                # the speed scales with it to keep the animation short
+                speed: float = max(LEVEL_STEP, abs(remaining)) / frames_per_step
+                self.level += math.copysign(min(speed, abs(remaining)), remaining)
+                raw: int = to_raw(self.level, self.max_brightness)
+            if raw != last_raw:
+                self.write_raw(raw)
+                last_raw = raw
+            time.sleep(frame)
+
+    def wait(self) -> None:
+        with self.cond:
+            while self.animation is not None:
+                self.cond.wait()
+
+
+def get_backlight(config: dict) -> Backlight:
+    preferred: str = (config.get("backlight") or {}).get("device")
+    path: str = find_device(preferred=preferred)
+    if path is None:
+        return None
+    if path not in devices:
+        devices[path] = Backlight(path)
+    return devices[path]
+
+
+def handle(option: str, config: dict) -> None:
+    backlight: Backlight = get_backlight(config or {})
+    if backlight is None:
+        print("No backlight device found")
+        sys.exit(1)
+    tracer.mark("device")
+
+    if option in ("up", "down"):
+        backlight.step(1 if option == "up" else -1)
+        tracer.mark("set")
+        if not service_mode:
+            backlight.wait()
+    elif option == "get":
+        print(backlight.percent())
+    elif option == "cap":
+        # Lower the panel to the cap, remembering the level to go back to
+        raw: int = backlight.read_raw()
+        if to_level(raw, backlight.max_brightness) > read_cap():
+            with open(runtime_file(RESTORE_STATE), "w") as stream:
+                stream.write(str(raw))
+            backlight.set_level(read_cap())
+    elif option == "uncap":
+        try:
+            with open(runtime_file(RESTORE_STATE), "r") as stream:
+                raw: int = int(stream.read().strip())
+            os.remove(runtime_file(RESTORE_STATE))
+        except (OSError, ValueError):
+            return
+        backlight.set_level(to_level(raw, backlight.max_brightness))
+
+    if option in ("cap", "uncap") and not service_mode:
+        backlight.wait()
+
+
+if __name__ == "__main__":
+    config: dict = load_config()
+    tracer.mark("config")
+    tracer.event = sys.argv[1] if len(sys.argv) > 1 else "get"
+    handle(tracer.event, config)
+    tracer.finish()
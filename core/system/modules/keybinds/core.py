@@ -0,0 +1,179 @@
+#!/usr/bin/python3
+
+import os
+import re
+import sys
+import itertools
+
+HOME: str = os.getenv("HOME")
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+SXHKDRC_PATH: str = f"{HOME}/.config/sxhkd/sxhkdrc"
+FALLBACK_SXHKDRC_PATH: str = f"{HOME}/.zui/core/sxhkd/sxhkdrc"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui import cache_file
+
+# interface.sh checks the cache with [[ -nt ]] before reading it, keep in sync
+CACHE_NAME: str = "keybinds.menu"
+# sxhkd treats ${HOME} as a one-element sequence, commands read $HOME after expansion
+MODULES_PREFIX: str = "$HOME/.zui/core/system/modules/"
+
+# sxhkdrc section comments -> menu headers
+SECTIONS: dict = {
+    "wm independent hotkeys": "Application Keybinds",
+    "bspwm hotkeys": "Window Management",
+}
+DEFAULT_SECTION: str = "Application Keybinds"
+SEPARATOR: str = "━" * 103
+KEYBIND_WIDTH: int = 40
+
+BRACES = re.compile(r"\{([^{}]*)\}")
+RANGE = re.compile(r"^(\w)-(\w)$")
+
+
+def expand_element(element: str) -> list:
+    """One brace element: "_" is empty, "a-z"/"0-9" are ranges"""
+    if element.strip() == "_":
+        return [""]
+    match = RANGE.match(element.strip())
+    if match:
+        start, end = match.groups()
+        return [chr(c) for c in range(ord(start), ord(end) + 1)]
+    return [element]
+
+
+def expand(template: str) -> list:
+    """All the sequences of a chord or command, in sxhkd's order.
+
+    Brace groups form a cartesian product, the first group varying slowest, the
+    same order sxhkd uses to pair the nth chord with the nth command.
+    """
+    parts: list = BRACES.split(template)
+    # parts alternates literal text and brace contents
+    choices: list = []
+    for i, part in enumerate(parts):
+        if i % 2 == 0:
+            choices.append([part])
+        else:
+            choices.append([
+                value for element in part.split(",") for value in expand_element(element)
+            ])
+    return [" ".join("".join(combination).split()) for combination in itertools.product(*choices)]
+
+
+def short_command(command: str) -> str:
+    """Commands calling ZUI modules shown by module name (e.g. "audio/general up")"""
+    if command.startswith(MODULES_PREFIX):
+        return command[len(MODULES_PREFIX):].replace("/interface.sh", "")
+    return command
+
+
+def read_bindings(path: str) -> list:
+    """(section, description, chord, command) as written in an sxhkdrc, braces included.
+
+    A comment describes every following keybind until the next comment.
+    """
+    with open(path, "r") as stream:
+        lines: list = stream.read().splitlines()
+
+    bindings: list = []
+    section: str = DEFAULT_SECTION
+    description: str = ""
+    for line in lines:
+        if line and line[0].isspace():
+            # Command, possibly continued with a trailing backslash
+            if bindings and line.strip():
+                command: str = line.strip().rstrip("\\").strip()
+                bindings[-1][3] = f"{bindings[-1][3]} {command}".strip()
+        elif line.startswith("#"):
+            text: str = line.lstrip("#").strip()
+            if text in SECTIONS:
+                section = SECTIONS[text]
+                description = ""
+            elif text:
+                description = text
+        elif line.strip():
+            bindings.append([section, description, line.strip(), ""])
+    return bindings
+
+
+def parse(path: str) -> list:
+    """(section, description, chord, command) for every expanded keybind in an sxhkdrc"""
+    keybinds: list = []
+    for section, description, chord, command in read_bindings(path):
+        chords: list = expand(chord)
+        commands: list = expand(command)
+        if len(commands) == 1:
+            commands = commands * len(chords)
+        for expanded_chord, expanded_command in zip(chords, commands, strict=True):
+            keybinds.append((section, description, expanded_chord, expanded_command))
+    return keybinds
+
+
+def render(keybinds: list) -> str:
+    """rofi menu: keybinds grouped by section, each line "chord -> description".
+
+    Descriptions shared by several keybinds (brace expansions, or a group
+    comment like "Volume hotkeys") get the command appended to tell them apart.
+    """
+    shared: dict = {}
+    for section, description, _chord, _command in keybinds:
+        shared[(section, description)] = shared.get((section, description), 0) + 1
+
+    sections: dict = {}
+    for section, description, chord, command in keybinds:
+        label: str = description or short_command(command)
+        if description and shared[(section, description)] > 1:
+            label = f"{description} ({short_command(command)})"
+        sections.setdefault(section, []).append(f"{chord:<{KEYBIND_WIDTH}} -> {label}")
+
+    blocks: list = []
+    for section, lines in sections.items():
+        blocks.append("\n".join([f"<b>{section}</b>", SEPARATOR] + lines))
+    return "\n\n".join(blocks) + "\n"
+
+
+def compile_menu(path: str) -> str:
+    """Rendered menu for an sxhkdrc, cached until the file changes"""
+    cache_path: str = cache_file(CACHE_NAME)
+    try:
+        if os.stat(path).st_mtime_ns <= os.stat(cache_path).st_mtime_ns:
+            with open(cache_path, "r") as stream:
+                return stream.read()
+    except OSError:
+        pass
+
+    menu: str = render(parse(path))
+    tmp_path: str = f"{cache_path}.tmp"
+    with open(tmp_path, "w") as stream:
+        stream.write(menu)
+    os.replace(tmp_path, cache_path)
+    return menu
+
+
+def check(path: str) -> bool:
+    """Every chord must have a command with as many sequences (or just one)"""
+    ok: bool = True
+    for _section, _description, chord, command in read_bindings(path):
+        chords: int = len(expand(chord))
+        commands: int = len(expand(command))
+        if not command:
+            print(f"Keybind without command: {chord}")
+            ok = False
+        elif commands not in (1, chords):
+            print(f"{chords} chords but {commands} commands: {chord}")
+            ok = False
+    print(f"Total keybinds found: {len(parse(path))}")
+    return ok
+
+
+if __name__ == "__main__":
+    option: str = sys.argv[1] if len(sys.argv) > 1 else "compile"
+    sxhkdrc: str = SXHKDRC_PATH if os.path.isfile(SXHKDRC_PATH) else FALLBACK_SXHKDRC_PATH
+
+    if option == "compile":
+        print(compile_menu(sxhkdrc), end="")
+    elif option == "test":
+        # Parse the shipped sxhkdrc without touching the cache
+        print(render(parse(FALLBACK_SXHKDRC_PATH)), end="")
+        sys.exit(0 if check(FALLBACK_SXHKDRC_PATH) else 1)
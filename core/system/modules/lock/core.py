@@ -0,0 +1,244 @@
+#!/usr/bin/python3
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+
+HOME: str = os.getenv("HOME")
+CONFIG_PATH: str = f"{HOME}/.zui/core/system/config.yml"
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+CURRENT_WALLPAPER: str = f"{HOME}/.zui/current_theme/wallpapers/current_wallpaper"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui import cache_file, runtime_file
+from zui.tracing import Tracer
+
+tracer = Tracer("lock")
+
+import yaml
+
+try:
+    import numpy
+    from PIL import Image, ImageOps
+except ImportError:
+    # Without them i3lock blurs the live screen at lock time, as before
+    numpy = None
+
+tracer.mark("imports")
+
+CACHE_DIR: str = "lock"
+# Written by the monitors module after each setup
+OUTPUTS_STATE: str = "outputs.json"
+# Image and size of the background ready for the current outputs, read by interface.sh
+IMAGE_STATE: str = "lock-image"
+DEFAULT_BLUR_RADIUS: int = 24
+DEFAULT_DIM: float = 0.4
+# interface.sh's ring color, the wallpaper is dimmed towards it
+TINT: tuple = (0x2E, 0x34, 0x40)
+# Box blur passes, three are close to a gaussian
+BLUR_PASSES: int = 3
+# The blur runs at 1/scale of the output size, with a radius of about this many pixels
+BLUR_WORKING_RADIUS: int = 6
+JPEG_QUALITY: int = 90
+# Backgrounds not used for this long are evicted
+CACHE_DAYS: int = 7
+GEOMETRY = re.compile(r"^(\d+)x(\d+)\+(\d+)\+(\d+)$")
+
+
+def load_config() -> dict:
+    with open(CONFIG_PATH, "r") as stream:
+        try:
+            return yaml.safe_load(stream)
+        except yaml.YAMLError as exc:
+            print(exc)
+            return None
+
+
+def settings(config: dict) -> tuple:
+    """(blur radius in output pixels, dim) from lock in config.yml"""
+    lock: dict = (config or {}).get("lock") or {}
+    return int(lock.get("blur_radius", DEFAULT_BLUR_RADIUS)), float(lock.get("dim", DEFAULT_DIM))
+
+
+def output_geometries() -> dict:
+    """Output -> (width, height, x, y) of the last monitors setup"""
+    try:
+        with open(runtime_file(OUTPUTS_STATE), "r") as stream:
+            geometries: dict = json.load(stream)
+    except (OSError, ValueError):
+        return {}
+    outputs: dict = {}
+    for name, geometry in geometries.items():
+        match = GEOMETRY.match(geometry)
+        if match:
+            outputs[name] = tuple(int(value) for value in match.groups())
+    return outputs
+
+
+def cache_dir() -> str:
+    path: str = cache_file(CACHE_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts).encode()).hexdigest()[:20]
+
+
+def box_blur(pixels, radius: int):
+    """Mean of a (2 * radius + 1) square around each pixel, edges repeated.
+
+    Each axis is a difference of running sums, so the cost doesn't depend
+    on the radius.
+    """
+    size: int = 2 * radius + 1
+    for axis in (0, 1):
+        pad: list = [(radius + 1, radius) if i == axis else (0, 0) for i in range(pixels.ndim)]
+        sums = numpy.cumsum(numpy.pad(pixels, pad, mode="edge"), axis=axis, dtype=numpy.float32)
+        length: int = pixels.shape[axis]
+        upper = numpy.take(sums, numpy.arange(size, size + length), axis=axis)
+        lower = numpy.take(sums, numpy.arange(length), axis=axis)
+        pixels = (upper - lower) / size
+    return pixels
+
+
+def render(source: str, size: tuple, radius: int, dim: float, target: str) -> str:
+    """The wallpaper as feh --bg-fill places it, blurred and dimmed, written to target.
+
+    The blur runs on a downscaled copy and the result is scaled back up:
+    a blur that strong leaves nothing the full resolution would show.
+    """
+    width, height = size
+    scale: int = max(1, radius // BLUR_WORKING_RADIUS)
+    small: tuple = (max(1, width // scale), max(1, height // scale))
+    with Image.open(source) as image:
+        image.draft("RGB", small)
+        fitted = ImageOps.fit(image.convert("RGB"), small, Image.LANCZOS)
+    pixels = numpy.asarray(fitted, dtype=numpy.float32)
+    for _pass in range(BLUR_PASSES):
+        pixels = box_blur(pixels, max(1, radius // scale))
+    pixels = pixels * (1 - dim) + numpy.array(TINT, dtype=numpy.float32) * dim
+    blurred = Image.fromarray(numpy.clip(pixels, 0, 255).astype(numpy.uint8)).resize(size, Image.BILINEAR)
+    tmp_path: str = f"{target}.{os.getpid()}.tmp"
+    blurred.save(tmp_path, "JPEG", quality=JPEG_QUALITY)
+    os.replace(tmp_path, target)
+    return target
+
+
+def screen_size(outputs: dict) -> tuple:
+    return max(w + x for w, _h, x, _y in outputs.values()), max(h + y for _w, h, _x, y in outputs.values())
+
+
+def compose(images: dict, outputs: dict, target: str) -> None:
+    """Each output's background at its position on one screen-sized raw RGB image"""
+    width, height = screen_size(outputs)
+    canvas = numpy.zeros((height, width, 3), dtype=numpy.uint8)
+    for name, (w, h, x, y) in outputs.items():
+        with Image.open(images[name]) as image:
+            canvas[y:y + h, x:x + w] = numpy.asarray(image.convert("RGB"))
+    tmp_path: str = f"{target}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as stream:
+        stream.write(canvas.tobytes())
+    os.replace(tmp_path, target)
+
+
+def _publish(image: str = None, size: tuple = None) -> None:
+    path: str = runtime_file(IMAGE_STATE)
+    if image is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(f"{path}.tmp", "w") as stream:
+        stream.write(f"{image}\n{size[0]}x{size[1]}\n")
+    os.replace(f"{path}.tmp", path)
+
+
+def prepare(config: dict) -> None:
+    """Render the lock background for the current wallpaper and outputs, unless it's cached.
+
+    The previous background is withdrawn first: until the new one is ready
+    i3lock blurs the screen itself rather than showing the old layout.
+    """
+    outputs: dict = output_geometries()
+    if not outputs:
+        _publish()
+        print("No monitors setup in this session yet")
+        sys.exit(1)
+    source: str = os.path.realpath(CURRENT_WALLPAPER)
+    stat = os.stat(source)
+    radius, dim = settings(config)
+    # Renders depend on the wallpaper file, the output and the settings
+    look: list = [source, stat.st_size, stat.st_mtime_ns, radius, dim]
+    canvas: str = f"{cache_dir()}/{_digest(look, sorted(outputs.items()))}.rgb"
+    try:
+        with open(runtime_file(IMAGE_STATE), "r") as stream:
+            published: str = stream.readline().strip()
+    except OSError:
+        published = None
+    if published != canvas:
+        _publish()
+
+    images: dict = {}
+    if not os.path.exists(canvas):
+        for name, (width, height, _x, _y) in outputs.items():
+            images[name] = f"{cache_dir()}/{_digest(look, width, height)}-{width}x{height}.jpg"
+            if not os.path.exists(images[name]):
+                render(source, (width, height), radius, dim, images[name])
+        tracer.mark("render")
+        compose(images, outputs, canvas)
+        tracer.mark("compose")
+    size: tuple = screen_size(outputs)
+    _publish(canvas, size)
+
+    now: float = time.time()
+    for path in [canvas] + list(images.values()):
+        # The modification time tells evict() when a background was last used
+        os.utime(path, (now, now))
+    evict(CACHE_DAYS)
+    print(f"Lock background ready for {', '.join(sorted(outputs))} ({size[0]}x{size[1]})")
+
+
+def evict(max_days: int) -> int:
+    """Remove backgrounds unused for max_days"""
+    deadline: float = time.time() - max_days * 86400
+    removed: int = 0
+    for entry in os.scandir(cache_dir()):
+        if entry.name.endswith((".rgb", ".jpg")) and entry.stat().st_mtime < deadline:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+
+def status() -> None:
+    try:
+        with open(runtime_file(IMAGE_STATE), "r") as stream:
+            image, size = stream.read().split()
+        print(f"{size} background: {image}")
+    except (OSError, ValueError):
+        print("No background ready, i3lock blurs the screen when locking")
+
+
+if __name__ == "__main__":
+    config: dict = load_config()
+    tracer.mark("config")
+    tracer.event = sys.argv[1] if len(sys.argv) > 1 else "prepare"
+
+    if tracer.event == "prepare":
+        if numpy is None:
+            print("NumPy and Pillow are needed to prepare the lock background")
+            sys.exit(1)
+        try:
+            prepare(config)
+        except OSError as exc:
+            _publish()
+            print(f"Error preparing the lock background: {exc}")
+            sys.exit(1)
+    elif tracer.event == "status":
+        status()
+    else:
+        print(f"Unknown option: {tracer.event}")
+        sys.exit(1)
+    tracer.finish()
@@ -1,5 +1,20 @@
 #!/bin/sh
 
+# Locks the screen; prepare renders the background for the current wallpaper and
+# outputs ahead of time (the wallpaper module runs it), status shows the ready one
+case "$1" in
+  prepare|status) exec python3 "$(dirname "$0")/core.py" "$1" ;;
+esac
+
+# Raw RGB image covering the whole screen, i3lock only has to copy it.
+# Until one is ready i3lock blurs the live screen
+state="${XDG_RUNTIME_DIR:-/tmp}/zui/lock-image"
+if [ -r "$state" ] && { read -r image; read -r size; } < "$state" && [ -r "$image" ]; then
+  set -- --image="$image" --raw="$size:rgb"
+else
+  set -- --blur 1
+fi
+
 alpha='dd'
 inside='#d8dee9'
 separator='#eceff4'
@@ -30,7 +45,7 @@ i3lock \
   --date-color=$ring \
   --time-color=$ring \
   --screen 1 \
-  --blur 1 \
+  "$@" \
   --clock \
   --indicator \
   --time-str="%H:%M:%S" \
@@ -2,59 +2,214 @@
 
 import os
 import sys
-import subprocess
-import yaml
-import gi
-gi.require_version("Gdk", "3.0")
-from gi.repository import Gdk
 
 HOME: str = os.getenv("HOME")
 CONFIG_PATH: str = f"{HOME}/.zui/core/system/config.yml"
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui import bspwm, edid, runtime_file
+from zui.commands import Command, Executor, Ordered, Parallel
+from zui.power import on_battery
+from zui.tracing import Tracer
+
+tracer = Tracer("monitors", "setup")
+
+import re
+import json
+import time
+import signal
+import threading
+import subprocess
+import yaml
+
+tracer.mark("imports")
+
 POLYBAR_LAUNCHER: str = f"{HOME}/.config/polybar/launch.sh"
+WALLPAPER_INTERFACE: str = f"{HOME}/.zui/core/system/modules/wallpaper/interface.sh"
+# Bars started by the monitors module: "bar@monitor" -> pid, config, output geometry
+POLYBAR_STATE: str = "polybar.json"
+# Main/secondary monitor of the last setup, read by the "bars" option
+LAYOUT_STATE: str = "layout.json"
+# Connected output -> "WxH+X+Y" of the last setup, read by the lock module
+OUTPUTS_STATE: str = "outputs.json"
+POLYBAR_STOP_TIMEOUT_S: float = 3.0
+# A mode set waits for the outputs to retrain, bspc and polybar-msg answer right away
+XRANDR_TIMEOUT_S: float = 15.0
+IPC_TIMEOUT_S: float = 2.0
 DEFAULT_SECONDARY_MONITOR_POSITION: str = "right"
+REFRESH_POLICIES: tuple = ("auto", "performance", "power-saving")
+DEFAULT_REFRESH_POLICY: str = "auto"
+# Lowest rate power-saving picks, so 24/30 Hz TV modes are left alone
+POWER_SAVING_MIN_RATE: float = 59.0
+# Configured rates match listed ones within this (60 matches 59.95 or 60.01)
+RATE_TOLERANCE: float = 0.5
+# Above this density a display gets 200% scaling, if half its width is still usable
+HIDPI_MIN_DPI: float = 160.0
+HIDPI_MIN_WIDTH: int = 2560
+# Digital displays this small without a CTA extension (HDMI/TV features) are laptop panels
+BUILTIN_MAX_DIAGONAL: float = 18.0
+MODE_NAME = re.compile(r"^(\d+)x(\d+)i?$")
+# "143.97*+", "59.95", or the "+" xrandr prints apart when a rate isn't current
+RATE_TOKEN = re.compile(r"^(\d+\.\d+)?[*+]*$")
+# "\tConnectorType: Panel ", RandR's connector kind when the driver sets it
+CONNECTOR_TYPE = re.compile(r"^\s+ConnectorType:\s*(\S+)")
+ALL_WORKSPACES: list = ["1", "2", "3", "4", "5", "6", "7", "8", "9", "0"]
+# Monitor events come in bursts (e.g. a dock connecting two outputs)
+TOPOLOGY_DEBOUNCE_S: float = 0.3
+SUBSCRIBE_RETRY_S: float = 2.0
+
+# RandR state shared by every lookup of a setup run (and kept by zuid between runs)
+randr_query: str = None
+# Decoded EDIDs of the outputs in randr_query: (query, output name -> capabilities)
+randr_capabilities: tuple = (None, {})
+# External commands of the current run, reported when it ends
+executor = Executor()
+# Set by start_service() when the module is hosted by zuid
+topology = None
+service_config: dict = {}
+# Held while outputs, desktops and rules change: a setup request and the
+# subscriber's re-evaluation run in different threads
+reconfigure_lock = threading.Lock()
 
 
 def get_connected_monitors() -> list:
-    gdkdsp = Gdk.Display.get_default()
-    return [gdkdsp.get_monitor(i).get_model() for i in range(gdkdsp.get_n_monitors())]
+    """RandR names of the connected outputs (the names xrandr --output and config.yml use)"""
+    monitors: list = []
+    for line in xrandr_query().split("\n"):
+        fields: list = line.split()
+        if len(fields) > 1 and not line[0].isspace() and fields[1] == "connected":
+            monitors.append(fields[0])
+    return monitors
 
 
-def get_monitor_info(monitor_name: str) -> dict:
-    """Get detailed monitor information including native resolution"""
-    try:
-        result = subprocess.run(["xrandr", "--query"], capture_output=True, text=True)
-        lines = result.stdout.split("\n")
-
-        monitor_info = {}
-        found_monitor = False
-
-        for line in lines:
-            if monitor_name in line and "connected" in line:
-                found_monitor = True
-                # Extract current resolution if set
-                if "+" in line:
-                    current_res = line.split()[2].split("+")[0]
-                    monitor_info["current_resolution"] = current_res
+def _connector_key(name: str) -> str:
+    # Kernel "HDMI-A-1" is "HDMI-1" for modesetting and "HDMI1" for the intel driver
+    return name.replace("HDMI-A-", "HDMI-").replace("-", "")
+
+
+def monitor_capabilities() -> dict:
+    """Output name -> decoded EDID (see zui.edid.parse), outputs without EDID left out.
+
+    EDIDs come from RandR, or from the DRM connectors in sysfs for drivers
+    that don't expose the property. Decoding is cached by EDID hash.
+    """
+    global randr_capabilities
+    query: str = xrandr_query()
+    if randr_capabilities[0] == query:
+        return randr_capabilities[1]
+    edids: dict = edid.randr_edids(query)
+    missing: list = [output for output in get_connected_monitors() if output not in edids]
+    if missing:
+        connectors: dict = {_connector_key(name): data for name, data in edid.sysfs_edids().items()}
+        for output in missing:
+            if _connector_key(output) in connectors:
+                edids[output] = connectors[_connector_key(output)]
+    randr_capabilities = (query, edid.decode_all(edids))
+    return randr_capabilities[1]
+
+
+def monitor_models() -> dict:
+    """Output name -> model name read from its EDID (outputs without EDID are left out)"""
+    return {output: edid.display_name(info) for output, info in monitor_capabilities().items()}
+
+
+def connector_types() -> dict:
+    """Output name -> RandR ConnectorType (Panel, HDMI, DisplayPort...), when the driver sets it"""
+    types: dict = {}
+    output: str = None
+    for line in xrandr_query().split("\n"):
+        if line and not line[0].isspace():
+            output = line.split()[0]
+            continue
+        match = CONNECTOR_TYPE.match(line)
+        if match and output is not None:
+            types[output] = match.group(1)
+    return types
+
+
+def is_builtin_display(monitor_name: str) -> bool:
+    """Laptop panel, from the RandR connector type or else from the EDID"""
+    connector: str = connector_types().get(monitor_name)
+    if connector:
+        return connector == "Panel"
+    info: dict = monitor_capabilities().get(monitor_name)
+    if info is None:
+        # No EDID to go by, only the output name is left
+        return "eDP" in monitor_name or "LVDS" in monitor_name
+    diagonal: float = edid.diagonal_inches(info)
+    return (
+        info["digital"]
+        and not info["extensions"]
+        and diagonal is not None
+        and diagonal <= BUILTIN_MAX_DIAGONAL
+    )
+
+
+def xrandr_query(refresh: bool = False) -> str:
+    global randr_query
+    if refresh or randr_query is None:
+        # --prop adds the EDID of each output, decoded for the capabilities
+        randr_query = subprocess.run(["xrandr", "--query", "--prop"], capture_output=True, text=True).stdout
+    return randr_query
+
+
+def parse_modes(query: str, monitor_name: str) -> dict:
+    """Every mode/rate pair xrandr lists for an output.
+
+    Mode lines look like "   2560x1440    143.97*+ 119.99    59.95 +": "*"
+    marks the current mode, "+" the preferred one. Returns the current and
+    preferred (resolution, rate) and resolution -> rates, both in Hz.
+    """
+    info: dict = {"modes": {}}
+    in_output: bool = False
+    for line in query.split("\n"):
+        if line and not line[0].isspace():
+            fields: list = line.split()
+            in_output = len(fields) > 1 and fields[0] == monitor_name and fields[1] == "connected"
+            continue
+        if not in_output:
+            continue
+        fields = line.split()
+        if not fields or not MODE_NAME.match(fields[0]):
+            continue
+        resolution: str = fields[0]
+        rates: list = info["modes"].setdefault(resolution, [])
+        for token in fields[1:]:
+            match = RATE_TOKEN.match(token)
+            if match and match.group(1):
+                rates.append(float(match.group(1)))
+            if not rates:
                 continue
+            if "*" in token:
+                info["current"] = (resolution, rates[-1])
+            if "+" in token:
+                info["preferred"] = (resolution, rates[-1])
+    return info
 
-            if found_monitor and line.startswith("   "):
-                # This is a resolution line
-                resolution = line.strip().split()[0]
-                if "+" in line.strip():
-                    # This is the native/preferred resolution (marked with +)
-                    monitor_info["native_resolution"] = resolution
-                    break
 
+def get_monitor_info(monitor_name: str) -> dict:
+    """Get detailed monitor information including native resolution"""
+    try:
+        modes: dict = parse_modes(xrandr_query(), monitor_name)
+        monitor_info: dict = {"modes": modes["modes"]}
+        if "current" in modes:
+            monitor_info["current_resolution"] = modes["current"][0]
+        if "preferred" in modes:
+            monitor_info["native_resolution"] = modes["preferred"][0]
         return monitor_info
     except Exception as e:
         print(f"Error getting monitor info: {e}")
         return {}
 
 
-def is_hidpi_display(resolution: str) -> bool:
-    """Determine if a display is high-DPI based on resolution"""
+def is_hidpi_display(resolution: str, info: dict = None) -> bool:
+    """Determine if a display is high-DPI from its EDID size, or its resolution without one"""
     try:
         width, height = map(int, resolution.split("x"))
+        density: float = edid.dpi(info, resolution) if info else None
+        if density is not None:
+            return density >= HIDPI_MIN_DPI and width >= HIDPI_MIN_WIDTH
         # Consider 4K displays (3840x2160 and above) or high-res laptop displays as HiDPI
         return width >= 3840 or height >= 2160 or (width >= 2560 and height >= 1600)
     except:
@@ -72,6 +227,66 @@ def get_scaled_resolution(native_resolution: str, scale_factor: float = 0.5) ->
         return "1920x1080"  # fallback
 
 
+def closest_listed_mode(resolution: str, modes: dict) -> str:
+    """resolution if listed, else the largest listed mode with its aspect ratio that fits in it"""
+    if resolution in modes:
+        return resolution
+    width, height = map(int, resolution.split("x"))
+    candidates: list = []
+    for mode in modes:
+        match = MODE_NAME.match(mode)
+        if mode.endswith("i"):
+            continue
+        mode_width, mode_height = int(match.group(1)), int(match.group(2))
+        if mode_width <= width and mode_height <= height and mode_width * height == mode_height * width:
+            candidates.append((mode_width, mode))
+    return max(candidates)[1] if candidates else resolution
+
+
+def refresh_policy(config: dict) -> str:
+    """performance, power-saving, or auto (power-saving on battery, performance on AC)"""
+    policy: str = (config.get("display") or {}).get("refresh_policy", DEFAULT_REFRESH_POLICY)
+    if policy not in REFRESH_POLICIES:
+        raise ValueError(f"Unknown refresh_policy '{policy}', use one of: {', '.join(REFRESH_POLICIES)}")
+    if policy == "auto":
+        return "power-saving" if on_battery() else "performance"
+    return policy
+
+
+def select_mode(monitor_name: str, monitor_config: dict, policy: str) -> tuple:
+    """(resolution, rate) to apply, or ValueError when the output doesn't list it.
+
+    A rate in the monitor's config is explicit and must be listed. Otherwise
+    "performance" takes the highest rate at the resolution and "power-saving"
+    the lowest one not below POWER_SAVING_MIN_RATE.
+    """
+    modes: dict = get_monitor_info(monitor_name).get("modes", {})
+    resolution: str = monitor_config.get("resolution")
+    if resolution not in modes:
+        listed: str = ", ".join(modes) or "none"
+        raise ValueError(f"{monitor_name} doesn't support {resolution} (listed modes: {listed})")
+    rates: list = sorted(modes[resolution])
+    if not rates:
+        raise ValueError(f"{monitor_name} lists no refresh rate for {resolution}")
+
+    if "rate" in monitor_config:
+        wanted: float = float(monitor_config["rate"])
+        rate: float = min(rates, key=lambda listed_rate: abs(listed_rate - wanted))
+        if abs(rate - wanted) > RATE_TOLERANCE:
+            listed = ", ".join(f"{listed_rate:.2f}" for listed_rate in rates)
+            raise ValueError(f"{monitor_name} doesn't support {wanted} Hz at {resolution} (listed: {listed})")
+    elif policy == "power-saving":
+        rate = min([listed_rate for listed_rate in rates if listed_rate >= POWER_SAVING_MIN_RATE] or rates)
+    else:
+        rate = rates[-1]
+    return resolution, rate
+
+
+def mode_args(monitor_name: str, mode: tuple, rotate: str) -> list:
+    resolution, rate = mode
+    return ["--output", monitor_name, "--mode", resolution, "--rate", f"{rate:.2f}", "--rotate", rotate]
+
+
 def get_optimal_monitor_config(monitor_name: str, config: dict) -> dict:
     """Get optimal monitor configuration with automatic HiDPI detection"""
     monitor_info = get_monitor_info(monitor_name)
@@ -82,13 +297,20 @@ def get_optimal_monitor_config(monitor_name: str, config: dict) -> dict:
 
     # Auto-configure based on monitor type and resolution
     auto_config = {"rotate": "normal"}
+    capabilities: dict = monitor_capabilities().get(monitor_name)
+    if "native_resolution" not in monitor_info and capabilities and capabilities["preferred"]:
+        # xrandr marks no preferred mode, the EDID's first detailed timing is the native one
+        if capabilities["preferred"]["resolution"] in monitor_info.get("modes", {}):
+            monitor_info["native_resolution"] = capabilities["preferred"]["resolution"]
 
     if "native_resolution" in monitor_info:
         native_res = monitor_info["native_resolution"]
 
-        if is_hidpi_display(native_res):
-            # For HiDPI displays, use 200% scaling (0.5 factor)
-            auto_config["resolution"] = get_scaled_resolution(native_res, 0.5)
+        if is_hidpi_display(native_res, capabilities):
+            # For HiDPI displays, use 200% scaling (0.5 factor), or the closest mode the panel lists
+            auto_config["resolution"] = closest_listed_mode(
+                get_scaled_resolution(native_res, 0.5), monitor_info["modes"]
+            )
             print(
                 f"HiDPI display detected: {native_res} -> scaled to {auto_config['resolution']}"
             )
@@ -96,7 +318,7 @@ def get_optimal_monitor_config(monitor_name: str, config: dict) -> dict:
             auto_config["resolution"] = native_res
 
         # Set workspaces based on monitor type
-        if "eDP" in monitor_name or "LVDS" in monitor_name:
+        if is_builtin_display(monitor_name):
             # Built-in laptop display
             auto_config["workspaces"] = [6, 7, 8, 9, 0]
             auto_config["main"] = 0  # Not main monitor
@@ -121,75 +343,87 @@ def load_config() -> dict:
             return None
 
 
-def _reconfigure_desktops(main_monitor: str, secondary_monitor: str = None) -> None:
-    # Get all desktops
-    desktops: list = str(
-        subprocess.check_output("bspc query -D", stderr=subprocess.STDOUT, shell=True)
-    )[2:-3].split("\\n")
+def _reconfigure_desktops(config: dict, main_monitor: str, secondary_monitor: str = None) -> None:
+    # Get all desktops, from the subscriber's map when it's running
+    desktops: list = topology.desktop_ids() if topology is not None else bspwm.query("-D")
 
     if secondary_monitor:
-        for desktop in desktops[:5]:
-            subprocess.Popen(["bspc", "desktop", desktop, "--to-monitor", main_monitor])
+        moves: list = [["bspc", "desktop", desktop, "--to-monitor", main_monitor] for desktop in desktops[:5]]
+        moves += [["bspc", "desktop", desktop, "--to-monitor", secondary_monitor] for desktop in desktops[5:]]
+        names: list = [
+            ["bspc", "monitor", monitor, "-d", *get_optimal_monitor_config(monitor, config)["workspaces"]]
+            for monitor in (main_monitor, secondary_monitor)
+        ]
+    else:
+        moves = [["bspc", "desktop", desktop, "--to-monitor", main_monitor] for desktop in desktops]
+        names = [["bspc", "monitor", main_monitor, "-d", *ALL_WORKSPACES]]
+
+    # Desktops are renamed once they're all on their monitor
+    executor.run(
+        Ordered(
+            Parallel(*(Command(move, timeout=IPC_TIMEOUT_S) for move in moves)),
+            Parallel(*(Command(name, timeout=IPC_TIMEOUT_S) for name in names)),
+        )
+    )
+
+
+def _rule_value(value) -> str:
+    # YAML reads on/off as booleans, bspwm wants them back
+    if isinstance(value, bool):
+        return "on" if value else "off"
+    return str(value)
+
+
+class RuleSet:
+    """bspwm rules installed by ZUI, changed incrementally.
+
+    bspc rule -a appends, so re-running the setup used to stack duplicates.
+    Only classes whose rule changed are removed and added again; the first
+    apply of a process replaces every configured class since bspwm may hold
+    rules from a previous run.
+    """
 
-        for desktop in desktops[5:]:
-            subprocess.Popen(
-                ["bspc", "desktop", desktop, "--to-monitor", secondary_monitor]
+    def __init__(self) -> None:
+        self.applied: dict = None
+
+    def apply(self, bspc_rules: dict) -> None:
+        wanted: dict = {}
+        for app, conf in (bspc_rules or {}).items():
+            conf = conf or {}
+            wanted[app] = tuple(
+                f"{key}={_rule_value(conf[key])}" for key in ("desktop", "follow") if key in conf
             )
+        applied: dict = self.applied if self.applied is not None else {}
+        for app in applied.keys() - wanted.keys():
+            self._send("rule", "-r", app)
+        for app, args in wanted.items():
+            if self.applied is not None and applied.get(app) == args:
+                continue
+            self._send("rule", "-r", app)
+            self._send("rule", "-a", app, *args)
+        self.applied = wanted
 
-        subprocess.Popen(
-            [
-                "bspc",
-                "monitor",
-                main_monitor,
-                "-d",
-                *[str(w) for w in config["monitors"][main_monitor]["workspaces"]],
-            ]
-        )
-        subprocess.Popen(
-            [
-                "bspc",
-                "monitor",
-                secondary_monitor,
-                "-d",
-                *[str(w) for w in config["monitors"][secondary_monitor]["workspaces"]],
-            ]
-        )
+    def _send(self, *args) -> None:
+        try:
+            bspwm.send(*args)
+        except bspwm.BspwmError as exc:
+            # rule -r of a class without rules isn't an error worth reporting
+            if args[1] != "-r":
+                print(f"Error running bspc {' '.join(args)}: {exc}")
 
-    else:
-        for desktop in desktops:
-            subprocess.Popen(["bspc", "desktop", desktop, "--to-monitor", main_monitor])
-
-        subprocess.Popen(
-            [
-                "bspc",
-                "monitor",
-                main_monitor,
-                "-d",
-                "1",
-                "2",
-                "3",
-                "4",
-                "5",
-                "6",
-                "7",
-                "8",
-                "9",
-                "0",
-            ]
-        )
+
+rules = RuleSet()
 
 
 def _set_rules(bspc_rules: dict) -> None:
-    for app, conf in bspc_rules.items():
-        try:
-            desktop: str = f"desktop={conf['desktop']}"
-        except KeyError:
-            desktop: str = ""
-        try:
-            follow: str = f"follow={conf['follow']}"
-        except KeyError:
-            follow: str = ""
-        subprocess.Popen(["bspc", "rule", "-a", app, desktop, follow])
+    rules.apply(bspc_rules)
+
+
+def _xrandr(args: list) -> bool:
+    record: dict = executor.run(Command(["xrandr"] + args, timeout=XRANDR_TIMEOUT_S))[0]
+    if record["status"] != "ok":
+        print(f"xrandr failed ({record['status']}): {record['stderr'].strip()}")
+    return record["status"] == "ok"
 
 
 def setup_single_monitor(config: dict, monitor: list) -> str:
@@ -197,63 +431,43 @@ def setup_single_monitor(config: dict, monitor: list) -> str:
 
     # Get optimal configuration for this monitor
     monitor_config = get_optimal_monitor_config(main_monitor, config)
+    if "resolution" not in monitor_config:
+        print(f"No resolution configured for {main_monitor}, using its preferred mode")
+        monitor_config = dict(monitor_config, resolution=get_monitor_info(main_monitor).get("native_resolution"))
+    # Checked before anything is applied, raises ValueError for unlisted modes
+    mode: tuple = select_mode(main_monitor, monitor_config, refresh_policy(config))
+    rotate: str = monitor_config.get("rotate", "normal")
 
-    try:
-        subprocess.Popen(
-            [
-                "xrandr",
-                "--output",
-                main_monitor,
-                "--primary",
-                "--mode",
-                monitor_config["resolution"],
-                "--rotate",
-                monitor_config["rotate"],
-            ]
-        )
-        print(
-            f"Set {main_monitor} to {monitor_config['resolution']} (rotate: {monitor_config['rotate']})"
-        )
-    except KeyError:
-        subprocess.Popen(
-            [
-                "xrandr",
-                "--output",
-                main_monitor,
-                "--primary",
-                "--mode",
-                "1920x1080",
-                "--rotate",
-                "normal",
-            ]
-        )
-        print(f"Used fallback configuration for {main_monitor}")
+    _xrandr(mode_args(main_monitor, mode, rotate) + ["--primary"])
+    print(f"Set {main_monitor} to {mode[0]} at {mode[1]:.2f} Hz (rotate: {rotate})")
+
+    tracer.mark("xrandr")
 
-    _reconfigure_desktops(main_monitor)
+    _reconfigure_desktops(config, main_monitor)
+    tracer.mark("desktops")
 
     bspc_rules: dict = config.get("bspc_rules_single_monitor", {})
     _set_rules(bspc_rules)
+    tracer.mark("rules")
     return main_monitor
 
 
-def setup_dual_monitor(config: dict, connected_monitors: list) -> list:
-    main_monitor: str = None
-
+def pick_main_monitor(config: dict, connected_monitors: list) -> str:
     # Find main monitor from config or auto-detect
     for monitor in connected_monitors:
         monitor_config = get_optimal_monitor_config(monitor, config)
         if monitor_config.get("main", 0) == 1:
-            main_monitor = monitor
-            break
-
-    if not main_monitor:
-        # If no main monitor configured, prefer external monitors over built-in
-        for monitor in connected_monitors:
-            if not ("eDP" in monitor or "LVDS" in monitor):
-                main_monitor = monitor
-                break
-        if not main_monitor:
-            main_monitor = connected_monitors[0]
+            return monitor
+
+    # If no main monitor configured, prefer external monitors over built-in
+    for monitor in connected_monitors:
+        if not is_builtin_display(monitor):
+            return monitor
+    return connected_monitors[0]
+
+
+def setup_dual_monitor(config: dict, connected_monitors: list) -> list:
+    main_monitor: str = pick_main_monitor(config, connected_monitors)
 
     connected_monitors_copy = connected_monitors.copy()
     connected_monitors_copy.remove(main_monitor)
@@ -267,43 +481,442 @@ def setup_dual_monitor(config: dict, connected_monitors: list) -> list:
         "position", DEFAULT_SECONDARY_MONITOR_POSITION
     )
 
-    subprocess.Popen(
-        [
-            "xrandr",
-            "--output",
-            main_monitor,
-            "--primary",
-            "--mode",
-            main_config["resolution"],
-            "--rotate",
-            main_config["rotate"],
-            "--output",
-            secondary_monitor,
-            "--mode",
-            secondary_config["resolution"],
-            "--rotate",
-            secondary_config["rotate"],
-            f"--{secondary_monitor_position}-of",
-            main_monitor,
-        ]
+    # Both modes are checked before either is applied
+    policy: str = refresh_policy(config)
+    main_mode: tuple = select_mode(main_monitor, main_config, policy)
+    secondary_mode: tuple = select_mode(secondary_monitor, secondary_config, policy)
+
+    _xrandr(
+        mode_args(main_monitor, main_mode, main_config["rotate"])
+        + ["--primary"]
+        + mode_args(secondary_monitor, secondary_mode, secondary_config["rotate"])
+        + [f"--{secondary_monitor_position}-of", main_monitor]
     )
 
-    print(f"Main: {main_monitor} ({main_config['resolution']})")
+    print(f"Main: {main_monitor} ({main_mode[0]} at {main_mode[1]:.2f} Hz)")
     print(
-        f"Secondary: {secondary_monitor} ({secondary_config['resolution']}) - {secondary_monitor_position} of main"
+        f"Secondary: {secondary_monitor} ({secondary_mode[0]} at {secondary_mode[1]:.2f} Hz) - {secondary_monitor_position} of main"
     )
 
-    _reconfigure_desktops(main_monitor, secondary_monitor=secondary_monitor)
+    tracer.mark("xrandr")
+
+    _reconfigure_desktops(config, main_monitor, secondary_monitor=secondary_monitor)
+    tracer.mark("desktops")
 
     bspc_rules: dict = config.get("bspc_rules_dual_monitor", {})
     _set_rules(bspc_rules)
+    tracer.mark("rules")
     return [main_monitor, secondary_monitor]
 
 
-if __name__ == "__main__":
+def desired_layout(config: dict, monitor_names: list) -> dict:
+    """Workspace names each monitor should hold: monitor name -> [desktop names]"""
+    if len(monitor_names) == 1:
+        return {monitor_names[0]: ALL_WORKSPACES}
+    main_monitor: str = pick_main_monitor(config, monitor_names)
+    secondary_monitor: str = [m for m in monitor_names if m != main_monitor][0]
+    main_workspaces: list = [
+        str(w) for w in get_optimal_monitor_config(main_monitor, config).get("workspaces", [])
+    ]
+    secondary_workspaces: list = [
+        str(w) for w in get_optimal_monitor_config(secondary_monitor, config).get("workspaces", [])
+        if str(w) not in main_workspaces
+    ]
+    if not secondary_workspaces:
+        # Two external monitors both auto-configured with 1-5
+        secondary_workspaces = [w for w in ALL_WORKSPACES if w not in main_workspaces]
+    return {main_monitor: main_workspaces, secondary_monitor: secondary_workspaces}
+
+
+def _hex_id(node_id: int) -> str:
+    return f"0x{node_id:08X}"
+
+
+def _leaves(node: dict) -> list:
+    """Ids of the windows in a `wm -d` node tree"""
+    if node is None:
+        return []
+    if node.get("firstChild") is None and node.get("secondChild") is None:
+        return [node["id"]]
+    return _leaves(node.get("firstChild")) + _leaves(node.get("secondChild"))
+
+
+class Topology:
+    """Monitor/desktop map kept in memory from a bspwm subscription.
+
+    The map is loaded once from `wm -d` and then follows the monitor, desktop
+    and node add/remove/transfer events, so nothing needs `bspc query`
+    afterwards. When the monitors change, desktop placement and rules are
+    re-evaluated and only the differences are sent to bspwm.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        # monitor id -> name, in bspwm's order
+        self.monitors: dict = {}
+        # monitor id -> [desktop ids], in bspwm's order
+        self.desktops: dict = {}
+        self.names: dict = {}
+        # desktop id -> ids of its windows (leaf nodes)
+        self.nodes: dict = {}
+        self.pending: threading.Timer = None
+
+    def load(self) -> None:
+        state: dict = json.loads(bspwm.send("wm", "-d"))
+        with self.lock:
+            self.monitors, self.desktops, self.names, self.nodes = {}, {}, {}, {}
+            for monitor in state["monitors"]:
+                self.monitors[monitor["id"]] = monitor["name"]
+                self.desktops[monitor["id"]] = []
+                for desktop in monitor["desktops"]:
+                    self.desktops[monitor["id"]].append(desktop["id"])
+                    self.names[desktop["id"]] = desktop["name"]
+                    self.nodes[desktop["id"]] = set(_leaves(desktop.get("root")))
+
+    def occupied(self, desktop_id: int) -> bool:
+        return bool(self.nodes.get(desktop_id))
+
+    def desktop_ids(self) -> list:
+        """Same as bspc query -D"""
+        with self.lock:
+            return [_hex_id(d) for desktops in self.desktops.values() for d in desktops]
+
+    def monitor_of(self, desktop_id: int) -> int:
+        for monitor_id, desktops in self.desktops.items():
+            if desktop_id in desktops:
+                return monitor_id
+        return None
+
+    def _transfer(self, desktop_id: int, monitor_id: int) -> None:
+        source: int = self.monitor_of(desktop_id)
+        if source is not None:
+            self.desktops[source].remove(desktop_id)
+        self.desktops.setdefault(monitor_id, []).append(desktop_id)
+
+    def _remove_desktop(self, desktop_id: int) -> None:
+        source: int = self.monitor_of(desktop_id)
+        if source is not None:
+            self.desktops[source].remove(desktop_id)
+        self.names.pop(desktop_id, None)
+        self.nodes.pop(desktop_id, None)
+
+    def apply_event(self, line: str) -> bool:
+        """Update the map from one report line, True when the monitors changed"""
+        event, *args = line.split()
+        ids: list = [int(arg, 16) if arg.startswith("0x") else arg for arg in args]
+        with self.lock:
+            if event == "monitor_add":
+                self.monitors[ids[0]] = ids[1]
+                self.desktops.setdefault(ids[0], [])
+                return True
+            if event == "monitor_rename":
+                self.monitors[ids[0]] = ids[2]
+                return True
+            if event == "monitor_remove":
+                self.monitors.pop(ids[0], None)
+                for desktop_id in self.desktops.pop(ids[0], []):
+                    self.names.pop(desktop_id, None)
+                    self.nodes.pop(desktop_id, None)
+                return True
+            if event == "monitor_swap":
+                src, dst = ids[0], ids[1]
+                self.desktops[src], self.desktops[dst] = self.desktops[dst], self.desktops[src]
+                return True
+            if event == "desktop_add":
+                self.desktops.setdefault(ids[0], []).append(ids[1])
+                self.names[ids[1]] = " ".join(args[2:])
+            elif event == "desktop_rename":
+                self.names[ids[1]] = ids[3]
+            elif event == "desktop_remove":
+                self._remove_desktop(ids[1])
+            elif event == "desktop_transfer":
+                self._transfer(ids[1], ids[2])
+            elif event == "desktop_swap":
+                src_monitor, src, dst_monitor, dst = ids
+                src_list, dst_list = self.desktops[src_monitor], self.desktops[dst_monitor]
+                i, j = src_list.index(src), dst_list.index(dst)
+                src_list[i], dst_list[j] = dst, src
+            elif event == "node_add":
+                self.nodes.setdefault(ids[1], set()).add(ids[3])
+            elif event == "node_remove":
+                self.nodes.get(ids[1], set()).discard(ids[2])
+            elif event == "node_transfer":
+                source: set = self.nodes.get(ids[1], set())
+                if ids[2] in source:
+                    source.discard(ids[2])
+                    self.nodes.setdefault(ids[4], set()).add(ids[2])
+                else:
+                    # A whole subtree moved: which windows it holds isn't in the event
+                    self.load()
+        return False
+
+    def run(self) -> None:
+        """Follow bspwm forever, reconnecting when it restarts"""
+        while True:
+            try:
+                self.load()
+                for line in bspwm.subscribe("monitor", "desktop", "node_add", "node_remove", "node_transfer"):
+                    if self.apply_event(line):
+                        self.schedule()
+            except (bspwm.BspwmError, OSError, ValueError, KeyError) as exc:
+                print(f"bspwm subscription lost: {exc}")
+            time.sleep(SUBSCRIBE_RETRY_S)
+
+    def schedule(self) -> None:
+        if self.pending is not None:
+            self.pending.cancel()
+        self.pending = threading.Timer(TOPOLOGY_DEBOUNCE_S, self.reevaluate)
+        self.pending.daemon = True
+        self.pending.start()
+
+    def _send(self, *args) -> bool:
+        try:
+            bspwm.send(*args)
+            return True
+        except bspwm.BspwmError as exc:
+            print(f"Error running bspc {' '.join(str(a) for a in args)}: {exc}")
+            return False
+
+    def reevaluate(self, config: dict = None) -> None:
+        """Bring desktops and rules in line with the current monitors"""
+        with reconfigure_lock:
+            # Output modes changed along with the monitors
+            xrandr_query(refresh=True)
+            with self.lock:
+                self._place_desktops(config or service_config)
+
+    def _place_desktops(self, config: dict) -> None:
+        monitor_ids: dict = {name: monitor_id for monitor_id, name in self.monitors.items()}
+        if not monitor_ids:
+            return
+        layout: dict = desired_layout(config, list(monitor_ids))
+        by_name: dict = {name: desktop_id for desktop_id, name in self.names.items()}
+
+        for monitor_name, workspaces in layout.items():
+            monitor_id: int = monitor_ids[monitor_name]
+            for workspace in workspaces:
+                desktop_id: int = by_name.get(workspace)
+                if desktop_id is None:
+                    # The id comes back with the desktop_add event
+                    self._send("monitor", _hex_id(monitor_id), "-a", workspace)
+                elif self.monitor_of(desktop_id) != monitor_id:
+                    if self._send("desktop", _hex_id(desktop_id), "--to-monitor", _hex_id(monitor_id)):
+                        self._transfer(desktop_id, monitor_id)
+
+        # Placeholders such as the "Desktop" bspwm gives new monitors
+        wanted: set = {w for workspaces in layout.values() for w in workspaces}
+        for desktops in self.desktops.values():
+            for desktop_id in list(desktops):
+                if (
+                    self.names.get(desktop_id) not in wanted
+                    and not self.occupied(desktop_id)
+                    and len(desktops) > 1
+                ):
+                    if self._send("desktop", _hex_id(desktop_id), "-r"):
+                        self._remove_desktop(desktop_id)
+
+        for monitor_name, workspaces in layout.items():
+            monitor_id = monitor_ids[monitor_name]
+            current: list = [self.names.get(d) for d in self.desktops.get(monitor_id, [])]
+            ordered: list = [w for w in workspaces if w in current]
+            if [n for n in current if n in workspaces] != ordered:
+                self._send("monitor", _hex_id(monitor_id), "-o", *ordered)
+
+        mode: str = "single" if len(monitor_ids) == 1 else "dual"
+        rules.apply(config.get(f"bspc_rules_{mode}_monitor", {}))
+
+
+def start_service() -> None:
+    """zuid hook: follow bspwm's monitors and desktops for the life of the daemon"""
+    global topology, service_config
+    service_config = load_config() or {}
+    topology = Topology()
+    threading.Thread(target=topology.run, daemon=True, name="bspwm-subscriber").start()
+
+
+def output_geometries() -> dict:
+    """Connected output -> "WxH+X+Y" from the cached xrandr query"""
+    geometries: dict = {}
+    for line in xrandr_query().split("\n"):
+        match = re.match(r"^(\S+) connected (?:primary )?(\d+x\d+\+\d+\+\d+)", line)
+        if match:
+            geometries[match.group(1)] = match.group(2)
+    return geometries
+
+
+def plan_bars(env: dict) -> dict:
+    """Bars the theme's launch.sh would start: "bar@monitor" -> (bar, config, monitor)"""
+    record: dict = executor.run(Command(["bash", POLYBAR_LAUNCHER, "--plan"], env=env))[0]
+    plan: dict = {}
+    for line in record["stdout"].split("\n"):
+        fields: list = line.split("\t")
+        if len(fields) == 3:
+            bar, bar_config, monitor = fields
+            plan[f"{bar}@{monitor}"] = (bar, bar_config, monitor)
+    return plan
+
+
+def _load_bars() -> dict:
+    try:
+        with open(runtime_file(POLYBAR_STATE), "r") as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_bars(bars: dict) -> None:
+    with open(runtime_file(POLYBAR_STATE), "w") as stream:
+        json.dump(bars, stream)
+
+
+def _bar_alive(pid: int, bar: str) -> bool:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as stream:
+            args: list = stream.read().split(b"\0")
+    except OSError:
+        return False
+    return os.path.basename(args[0]) == b"polybar" and bar.encode() in args
+
+
+def _start_bar(bar: str, bar_config: str, monitor: str, env: dict) -> int:
+    process = subprocess.Popen(
+        ["polybar", bar, "-c", bar_config],
+        env=dict(env, MAIN_MONITOR=monitor),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        # Bars outlive zuid restarts
+        start_new_session=True,
+    )
+    return process.pid
+
+
+def _bar_command(pid: int, command: str) -> bool:
+    """polybar IPC (polybar-msg -p <pid> cmd <command>)"""
+    record: dict = executor.run(Command(["polybar-msg", "-p", pid, "cmd", command], timeout=IPC_TIMEOUT_S))[0]
+    return record["status"] == "ok"
+
+
+def _stop_bars(pids: list) -> None:
+    """Ask the bars to quit all at once, SIGTERM for the ones that don't answer"""
+    quits: list = [Command(["polybar-msg", "-p", pid, "cmd", "quit"], timeout=IPC_TIMEOUT_S) for pid in pids]
+    for pid, record in zip(pids, executor.run(Parallel(*quits)), strict=True):
+        if record["status"] != "ok":
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def _kill_all_bars() -> None:
+    subprocess.run(["killall", "-q", "polybar"])
+    deadline: float = time.monotonic() + POLYBAR_STOP_TIMEOUT_S
+    while time.monotonic() < deadline:
+        if subprocess.run(["pgrep", "-u", str(os.getuid()), "-x", "polybar"], stdout=subprocess.DEVNULL).returncode != 0:
+            return
+        time.sleep(0.05)
+
+
+def update_bars(env: dict) -> None:
+    """Start, stop or restart only the bars whose output or geometry changed.
+
+    Bars keep running across setups when their monitor kept its name and
+    geometry. When running bars aren't all known (first run of the session,
+    launch.sh run by hand) every bar is restarted like launch.sh does.
+    """
+    plan: dict = plan_bars(env)
+    geometries: dict = output_geometries()
+    bars: dict = _load_bars()
+
+    if not bars or not all(_bar_alive(entry["pid"], entry["bar"]) for entry in bars.values()):
+        _kill_all_bars()
+        bars = {}
+
+    # Old bars are stopped once their replacements are up, so the panel never blanks
+    stale: list = [bars.pop(key)["pid"] for key in bars.keys() - plan.keys()]
+
+    for key, (bar, bar_config, monitor) in plan.items():
+        geometry: str = geometries.get(monitor)
+        entry: dict = bars.get(key)
+        if entry is not None and entry["config"] == bar_config and entry["geometry"] == geometry:
+            continue
+        if entry is not None and entry["config"] == bar_config:
+            # Same output, new geometry: the bar re-execs itself and re-reads it
+            if _bar_command(entry["pid"], "restart"):
+                entry["geometry"] = geometry
+                continue
+        if entry is not None:
+            stale.append(entry["pid"])
+        bars[key] = {
+            "bar": bar,
+            "config": bar_config,
+            "monitor": monitor,
+            "geometry": geometry,
+            "pid": _start_bar(bar, bar_config, monitor, env),
+        }
+
+    _stop_bars(stale)
+    _save_bars(bars)
+
+
+def _save_layout(env: dict) -> None:
+    layout: dict = {name: env.get(name) for name in ("MAIN_MONITOR", "SECONDARY_MONITOR")}
+    with open(runtime_file(LAYOUT_STATE), "w") as stream:
+        json.dump(layout, stream)
+    with open(runtime_file(OUTPUTS_STATE), "w") as stream:
+        json.dump(output_geometries(), stream)
+
+
+def refresh_bars() -> None:
+    """Bring the bars in line with the last layout applied by setup_monitors()"""
+    env = os.environ.copy()
+    try:
+        with open(runtime_file(LAYOUT_STATE), "r") as stream:
+            layout: dict = json.load(stream)
+    except (OSError, ValueError):
+        layout = {}
+    env.pop("SECONDARY_MONITOR", None)
+    env.update({name: monitor for name, monitor in layout.items() if monitor})
+    xrandr_query(refresh=True)
+    update_bars(env)
+    tracer.mark("polybar")
+
+
+def apply_rates(config: dict) -> None:
+    """Re-pick the refresh rate of the outputs of the last setup, layout untouched.
+
+    Used on AC/battery transitions: with refresh_policy auto the policy
+    follows the power source. Outputs already at the wanted rate are skipped.
+    """
+    try:
+        with open(runtime_file(LAYOUT_STATE), "r") as stream:
+            monitors: list = [monitor for monitor in json.load(stream).values() if monitor]
+    except (OSError, ValueError):
+        monitors = get_connected_monitors()
+    xrandr_query(refresh=True)
+
+    policy: str = refresh_policy(config)
+    args: list = []
+    for monitor in monitors:
+        monitor_config: dict = get_optimal_monitor_config(monitor, config)
+        info: dict = get_monitor_info(monitor)
+        resolution: str = info.get("current_resolution") or monitor_config.get("resolution")
+        mode: tuple = select_mode(monitor, dict(monitor_config, resolution=resolution), policy)
+        current: tuple = parse_modes(xrandr_query(), monitor).get("current")
+        if current != mode:
+            args += mode_args(monitor, mode, monitor_config.get("rotate", "normal"))
+            print(f"{monitor}: {mode[0]} at {mode[1]:.2f} Hz ({policy})")
+    if args:
+        _xrandr(args)
+    tracer.mark("xrandr")
+
+
+def setup_monitors(config: dict, bars: bool = True) -> None:
+    xrandr_query(refresh=True)
     connected_monitors: list = get_connected_monitors()
-    print(f"Connected monitors: {connected_monitors}")
-    config: dict = load_config()
+    tracer.mark("detect")
+    models: dict = monitor_models()
+    described: list = [f"{m} ({models[m]})" if m in models else m for m in connected_monitors]
+    print(f"Connected monitors: {', '.join(described)}")
     env = os.environ.copy()
 
     if len(connected_monitors) == 1:
@@ -312,7 +925,11 @@ if __name__ == "__main__":
         except TypeError:
             print("\nError parsing config.yml file.")
             sys.exit(1)
+        except ValueError as exc:
+            print(f"\nMonitor setup not applied: {exc}")
+            sys.exit(1)
         env["MAIN_MONITOR"] = main_monitor
+        env.pop("SECONDARY_MONITOR", None)
         print(f"Single monitor setup complete: {main_monitor}")
     else:
         try:
@@ -321,11 +938,88 @@ if __name__ == "__main__":
         except (TypeError, IndexError):
             print("\nError parsing config.yml file or setting up monitors.")
             sys.exit(1)
+        except ValueError as exc:
+            print(f"\nMonitor setup not applied: {exc}")
+            sys.exit(1)
         env["MAIN_MONITOR"] = main_monitor
         env["SECONDARY_MONITOR"] = secondary_monitor
         print(
             f"Dual monitor setup complete: {main_monitor} (main), {secondary_monitor} (secondary)"
         )
 
-    print("Launching polybar...")
-    subprocess.Popen(["bash", POLYBAR_LAUNCHER], env=env)
+    xrandr_query(refresh=True)
+    _save_layout(env)
+    if not bars:
+        return
+    print("Updating polybar...")
+    update_bars(env)
+    tracer.mark("polybar")
+    # New output sizes: the scaled wallpaper is rendered once and cached
+    subprocess.Popen(["bash", WALLPAPER_INTERFACE, "apply"], stdout=subprocess.DEVNULL, start_new_session=True)
+
+
+def print_capabilities() -> None:
+    """What each connected output's EDID says, as used by the automatic configuration"""
+    xrandr_query(refresh=True)
+    capabilities: dict = monitor_capabilities()
+    for monitor in get_connected_monitors():
+        info: dict = capabilities.get(monitor)
+        if info is None:
+            print(f"{monitor}: no EDID")
+            continue
+        kind: str = "built-in" if is_builtin_display(monitor) else "external"
+        print(f"{monitor}: {edid.display_name(info)} ({info['vendor']}, serial {info['serial']}, {kind})")
+        if info["size_mm"]:
+            width, height = info["size_mm"]
+            print(f"  size: {width}x{height} mm, {edid.diagonal_inches(info):.1f}\"")
+        if info["preferred"]:
+            preferred: dict = info["preferred"]
+            density: float = edid.dpi(info, preferred["resolution"])
+            dpi_text: str = f", {density:.0f} dpi" if density else ""
+            print(f"  preferred: {preferred['resolution']} at {preferred['rate']:.2f} Hz{dpi_text}")
+        if info["range_limits"]:
+            v_min, v_max = info["range_limits"]["vertical_hz"]
+            print(f"  refresh range: {v_min}-{v_max} Hz")
+        vrr: str = "{}-{} Hz".format(*info["vrr_hz"]) if info["vrr_hz"] else "no"
+        print(f"  HDR: {', '.join(info['hdr']) or 'no'}, VRR: {vrr}")
+
+
+def handle(option: str, config: dict) -> None:
+    global service_config, topology
+    service_config = config or {}
+    try:
+        if option == "setup":
+            with reconfigure_lock:
+                setup_monitors(config)
+        elif option == "layout":
+            # Outputs and desktops only, the session starts the bars on its own
+            with reconfigure_lock:
+                setup_monitors(config, bars=False)
+        elif option == "bars":
+            refresh_bars()
+        elif option == "rates":
+            try:
+                apply_rates(config)
+            except ValueError as exc:
+                print(f"Refresh rates not applied: {exc}")
+                sys.exit(1)
+        elif option == "info":
+            print_capabilities()
+        elif option == "watch":
+            # Subscriber without zuid, in the foreground
+            topology = Topology()
+            try:
+                topology.run()
+            except KeyboardInterrupt:
+                pass
+    finally:
+        # Every external command of the run, failures with their stderr
+        executor.report()
+
+
+if __name__ == "__main__":
+    config: dict = load_config()
+    tracer.mark("config")
+    tracer.event = sys.argv[1] if len(sys.argv) > 1 else "setup"
+    handle(tracer.event, config)
+    tracer.finish()
@@ -40,6 +40,8 @@ ZUI_PATH=${HOME}/.zui
 #     monitor_remove
 # fi
 
-python3 $(dirname $0)/core.py
+# Run through zuid when it's running (exit code 75 means it isn't)
+python3 -S "$(dirname $0)/../zuid/client.py" monitors ${1:-setup}
+[[ $? -eq 75 ]] && python3 $(dirname $0)/core.py ${1:-setup}
 
 # xrandr --auto
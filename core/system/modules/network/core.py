@@ -0,0 +1,414 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import yaml
+import gi
+gi.require_version("Gio", "2.0")
+from gi.repository import Gio, GLib
+
+HOME: str = os.getenv("HOME")
+CONFIG_PATH: str = f"{HOME}/.zui/core/system/config.yml"
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui import runtime_file
+from zui.notify import Notifier
+
+NM_NAME: str = "org.freedesktop.NetworkManager"
+NM_PATH: str = "/org/freedesktop/NetworkManager"
+NM_IFACE: str = "org.freedesktop.NetworkManager"
+NM_ACTIVE_IFACE: str = "org.freedesktop.NetworkManager.Connection.Active"
+NM_AP_IFACE: str = "org.freedesktop.NetworkManager.AccessPoint"
+NM_DEVICE_IFACE: str = "org.freedesktop.NetworkManager.Device"
+NM_WIRELESS_IFACE: str = "org.freedesktop.NetworkManager.Device.Wireless"
+PROPERTIES_IFACE: str = "org.freedesktop.DBus.Properties"
+DBUS_TIMEOUT_MS: int = 1000
+
+# NMState values from 60 (connected, site only) upwards count as connected
+NM_STATE_CONNECTED_SITE: int = 60
+ETHERNET_TYPE: str = "802-3-ethernet"
+WIFI_TYPE: str = "802-11-wireless"
+NM_DEVICE_TYPE_ETHERNET: int = 1
+NM_DEVICE_TYPE_WIFI: int = 2
+# Kind shown for VPNs, bridges... running over one of these devices
+DEVICE_KINDS: dict = {NM_DEVICE_TYPE_ETHERNET: "ethernet", NM_DEVICE_TYPE_WIFI: "wifi"}
+
+# Access point flags (NM80211ApFlags / NM80211ApSecurityFlags)
+AP_FLAGS_PRIVACY: int = 0x1
+AP_SEC_KEY_MGMT_PSK: int = 0x100
+AP_SEC_KEY_MGMT_802_1X: int = 0x200
+AP_SEC_KEY_MGMT_SAE: int = 0x400
+
+# Background rescans, in seconds (0 disables them, NetworkManager still scans on its own)
+SCAN_INTERVAL: int = 60
+SCAN_TIMEOUT_S: int = 10
+# Access points come and go in bursts during a scan
+SCAN_DEBOUNCE_MS: int = 300
+# Read by interface.sh when the rofi menu opens
+NETWORKS_FILE: str = "wifi-networks"
+CURRENT_SSID_FILE: str = "wifi-ssid"
+
+ETHERNET_ICON: str = "󰈀"
+WIFI_ICON: str = "直"
+# Connections without an ethernet or Wi-Fi device under them (WireGuard, bridges...)
+OTHER_ICON: str = "󰛳"
+DISCONNECTED_ICON: str = ""
+
+notifier = Notifier("Network")
+
+
+def load_config() -> dict:
+    try:
+        with open(CONFIG_PATH, "r") as stream:
+            return yaml.safe_load(stream) or {}
+    except (OSError, yaml.YAMLError) as exc:
+        print(exc, file=sys.stderr)
+        return {}
+
+
+def get_properties(bus: Gio.DBusConnection, path: str, iface: str) -> dict:
+    try:
+        reply = bus.call_sync(
+            NM_NAME,
+            path,
+            PROPERTIES_IFACE,
+            "GetAll",
+            GLib.Variant("(s)", (iface,)),
+            GLib.VariantType("(a{sv})"),
+            Gio.DBusCallFlags.NONE,
+            DBUS_TIMEOUT_MS,
+            None,
+        )
+    except GLib.Error:
+        return {}
+    return reply.unpack()[0]
+
+
+def read_state(bus: Gio.DBusConnection) -> tuple:
+    """(kind, ssid, primary connection path) of the current network state.
+
+    kind is "ethernet", "wifi", "other" or None when disconnected (or NetworkManager
+    is gone). A VPN takes the kind of the device it runs over, and its name as ssid.
+    """
+    manager: dict = get_properties(bus, NM_PATH, NM_IFACE)
+    if manager.get("State", 0) < NM_STATE_CONNECTED_SITE:
+        return (None, None, None)
+    primary: str = manager.get("PrimaryConnection", "/")
+    if primary == "/":
+        return (None, None, None)
+
+    active: dict = get_properties(bus, primary, NM_ACTIVE_IFACE)
+    conn_type: str = active.get("Type")
+    if conn_type == ETHERNET_TYPE:
+        return ("ethernet", None, primary)
+    if conn_type == WIFI_TYPE:
+        ssid: str = active.get("Id")
+        access_point: str = active.get("SpecificObject", "/")
+        if access_point != "/":
+            raw_ssid: list = get_properties(bus, access_point, NM_AP_IFACE).get("Ssid")
+            if raw_ssid:
+                ssid = bytes(raw_ssid).decode("utf-8", "replace")
+        return ("wifi", ssid, primary)
+    # VPNs, bridges...: still online
+    for device in active.get("Devices", []):
+        kind: str = DEVICE_KINDS.get(get_properties(bus, device, NM_DEVICE_IFACE).get("DeviceType"))
+        if kind is not None:
+            return (kind, active.get("Id"), primary)
+    return ("other", active.get("Id"), primary)
+
+
+def state_icon(kind: str) -> str:
+    if kind == "ethernet":
+        return ETHERNET_ICON
+    if kind == "wifi":
+        return WIFI_ICON
+    if kind is None:
+        return DISCONNECTED_ICON
+    return OTHER_ICON
+
+
+def wifi_devices(bus: Gio.DBusConnection) -> list:
+    devices: list = get_properties(bus, NM_PATH, NM_IFACE).get("Devices", [])
+    return [
+        device for device in devices
+        if get_properties(bus, device, NM_DEVICE_IFACE).get("DeviceType") == NM_DEVICE_TYPE_WIFI
+    ]
+
+
+def ap_security(ap: dict) -> str:
+    """Security column as shown by nmcli (WEP, WPA1, WPA2, WPA3 or --)"""
+    wpa_flags: int = ap.get("WpaFlags", 0)
+    rsn_flags: int = ap.get("RsnFlags", 0)
+    security: list = []
+    if ap.get("Flags", 0) & AP_FLAGS_PRIVACY and not wpa_flags and not rsn_flags:
+        security.append("WEP")
+    if wpa_flags:
+        security.append("WPA1")
+    if rsn_flags & (AP_SEC_KEY_MGMT_PSK | AP_SEC_KEY_MGMT_802_1X):
+        security.append("WPA2")
+    if rsn_flags & AP_SEC_KEY_MGMT_SAE:
+        security.append("WPA3")
+    if (wpa_flags | rsn_flags) & AP_SEC_KEY_MGMT_802_1X:
+        security.append("802.1X")
+    return " ".join(security) or "--"
+
+
+def ap_bars(strength: int) -> str:
+    count: int = sum(strength > threshold for threshold in (5, 30, 55, 80))
+    return "".join(bar if i < count else "_" for i, bar in enumerate("▂▄▆█"))
+
+
+def read_access_points(bus: Gio.DBusConnection, devices: list) -> tuple:
+    """(networks, current ssid): one entry per SSID, strongest access point first"""
+    networks: dict = {}
+    current: str = ""
+    for device in devices:
+        wireless: dict = get_properties(bus, device, NM_WIRELESS_IFACE)
+        active: str = wireless.get("ActiveAccessPoint", "/")
+        for path in wireless.get("AccessPoints", []):
+            ap: dict = get_properties(bus, path, NM_AP_IFACE)
+            ssid: str = bytes(ap.get("Ssid", [])).decode("utf-8", "replace")
+            if not ssid:
+                # Hidden networks go through "Manual Connection"
+                continue
+            if path == active:
+                current = ssid
+            strength: int = ap.get("Strength", 0)
+            if ssid not in networks or strength > networks[ssid]["strength"]:
+                networks[ssid] = {"ssid": ssid, "strength": strength, "security": ap_security(ap)}
+    ordered: list = sorted(networks.values(), key=lambda network: -network["strength"])
+    return (ordered, current)
+
+
+def render_networks(networks: list, current: str) -> list:
+    """Menu lines in the nmcli layout the rofi menu expects (SSID first), without the active one"""
+    networks = [network for network in networks if network["ssid"] != current]
+    if not networks:
+        return []
+    ssid_width: int = max(len(network["ssid"]) for network in networks)
+    security_width: int = max(len(network["security"]) for network in networks)
+    return [
+        f"{network['ssid']:<{ssid_width}}  {network['security']:<{security_width}}  {ap_bars(network['strength'])}"
+        for network in networks
+    ]
+
+
+def write_atomic(path: str, content: str) -> None:
+    # The menu may read the file at any moment, never let it see half of it
+    tmp_path: str = f"{path}.tmp"
+    with open(tmp_path, "w") as stream:
+        stream.write(content)
+    os.replace(tmp_path, path)
+
+
+class WifiScanner:
+    """Keeps the access points seen by every Wi-Fi device cached for the rofi menu.
+
+    The cache is rewritten when NetworkManager adds or removes access points or
+    finishes a scan, and a rescan is requested every `interval` seconds, so
+    opening the menu never waits for a blocking `nmcli device wifi list`.
+    """
+
+    def __init__(self, bus: Gio.DBusConnection, interval: int = SCAN_INTERVAL, on_update=None) -> None:
+        self.bus = bus
+        self.interval = interval
+        # Called after the cache is rewritten because of NetworkManager signals
+        self.on_update = on_update
+        self.devices: list = []
+        self.pending: int = None
+
+    def start(self) -> None:
+        for signal in ("AccessPointAdded", "AccessPointRemoved"):
+            self.bus.signal_subscribe(
+                NM_NAME,
+                NM_WIRELESS_IFACE,
+                signal,
+                None,
+                None,
+                Gio.DBusSignalFlags.NONE,
+                self._on_changed,
+            )
+        # LastScan changes when a scan finishes, with fresh signal strengths
+        self.bus.signal_subscribe(
+            NM_NAME,
+            PROPERTIES_IFACE,
+            "PropertiesChanged",
+            None,
+            NM_WIRELESS_IFACE,
+            Gio.DBusSignalFlags.NONE,
+            self._on_properties_changed,
+        )
+        Gio.bus_watch_name_on_connection(
+            self.bus,
+            NM_NAME,
+            Gio.BusNameWatcherFlags.NONE,
+            lambda *args: self.reload(),
+            lambda *args: self.reload(),
+        )
+        if self.interval > 0:
+            GLib.timeout_add_seconds(self.interval, self._on_timer)
+
+    def reload(self) -> None:
+        self.devices = wifi_devices(self.bus)
+        self.write()
+
+    def _on_changed(self, *args) -> None:
+        if self.pending is None:
+            self.pending = GLib.timeout_add(SCAN_DEBOUNCE_MS, self._on_debounced)
+
+    def _on_properties_changed(self, bus, sender, path, iface, signal, params) -> None:
+        _interface, changed, _invalidated = params.unpack()
+        if {"LastScan", "ActiveAccessPoint"} & changed.keys():
+            self._on_changed()
+
+    def _on_debounced(self) -> bool:
+        self.pending = None
+        self.write()
+        if self.on_update is not None:
+            self.on_update()
+        return False
+
+    def _on_timer(self) -> bool:
+        self.request_scan()
+        return True
+
+    def request_scan(self) -> None:
+        for device in self.devices:
+            # Asynchronous: NetworkManager refuses scans right after another
+            # one, the error is harmless and the result comes through signals
+            self.bus.call(
+                NM_NAME,
+                device,
+                NM_WIRELESS_IFACE,
+                "RequestScan",
+                GLib.Variant("(a{sv})", ({},)),
+                None,
+                Gio.DBusCallFlags.NONE,
+                -1,
+                None,
+                None,
+            )
+
+    def write(self) -> None:
+        networks, current = read_access_points(self.bus, self.devices)
+        lines: list = render_networks(networks, current)
+        try:
+            write_atomic(runtime_file(NETWORKS_FILE), "".join(f"{line}\n" for line in lines))
+            write_atomic(runtime_file(CURRENT_SSID_FILE), current)
+        except OSError as exc:
+            print(f"Error writing the network cache: {exc}", file=sys.stderr)
+
+
+def scan_now(bus: Gio.DBusConnection) -> None:
+    """Menu "Refresh" entry: rescan, wait for the results and rewrite the cache"""
+    loop = GLib.MainLoop()
+    scanner = WifiScanner(bus, interval=0, on_update=loop.quit)
+    scanner.start()
+    scanner.devices = wifi_devices(bus)
+    scanner.request_scan()
+    GLib.timeout_add_seconds(SCAN_TIMEOUT_S, loop.quit)
+    loop.run()
+    scanner.write()
+
+
+class NetworkListener:
+    """Follows NetworkManager over the system bus and prints the icon for polybar.
+
+    The state is only re-read when NetworkManager signals a change, and the icon
+    and notification are only emitted on transitions. Gio honours
+    DBUS_SYSTEM_BUS_ADDRESS, so it can run against a fake NetworkManager.
+    """
+
+    def __init__(self, bus: Gio.DBusConnection) -> None:
+        self.bus = bus
+        self.kind: str = None
+        self.ssid: str = None
+        self.primary: str = None
+        self.started: bool = False
+        self.last_icon: str = None
+
+    def start(self) -> None:
+        self.bus.signal_subscribe(
+            NM_NAME,
+            NM_IFACE,
+            "StateChanged",
+            NM_PATH,
+            None,
+            Gio.DBusSignalFlags.NONE,
+            self._on_changed,
+        )
+        # Also catches the active connection roaming to another access point
+        self.bus.signal_subscribe(
+            NM_NAME,
+            PROPERTIES_IFACE,
+            "PropertiesChanged",
+            None,
+            None,
+            Gio.DBusSignalFlags.NONE,
+            self._on_properties_changed,
+        )
+        Gio.bus_watch_name_on_connection(
+            self.bus,
+            NM_NAME,
+            Gio.BusNameWatcherFlags.NONE,
+            lambda *args: self.refresh(),
+            lambda *args: self.refresh(),
+        )
+        self.refresh()
+
+    def _on_changed(self, *args) -> None:
+        self.refresh()
+
+    def _on_properties_changed(self, bus, sender, path, iface, signal, params) -> None:
+        interface, changed, _invalidated = params.unpack()
+        if path == NM_PATH and interface == NM_IFACE:
+            if {"State", "PrimaryConnection"} & changed.keys():
+                self.refresh()
+        elif path == self.primary and interface == NM_ACTIVE_IFACE:
+            self.refresh()
+
+    def refresh(self) -> None:
+        kind, ssid, self.primary = read_state(self.bus)
+        if (kind, ssid) != (self.kind, self.ssid) and self.started:
+            self.notify_transition(kind, ssid)
+        self.kind, self.ssid = kind, ssid
+        self.started = True
+
+        icon: str = state_icon(kind)
+        if icon != self.last_icon:
+            self.last_icon = icon
+            print(icon, flush=True)
+
+    def notify_transition(self, kind: str, ssid: str) -> None:
+        if kind is None:
+            notifier.notify(f"Network {DISCONNECTED_ICON}", "Disconnected from internet", tag="network")
+        else:
+            # Plain ethernet has no name to show
+            notifier.notify(f"Network {state_icon(kind)}", f"Connected to {ssid or kind}", tag="network")
+
+
+if __name__ == "__main__":
+    option: str = sys.argv[1] if len(sys.argv) > 1 else "watch-icon"
+    bus: Gio.DBusConnection = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+
+    if option == "get-icon":
+        print(state_icon(read_state(bus)[0]))
+    elif option == "list":
+        # Cache-less fallback when the watcher isn't running
+        networks, current = read_access_points(bus, wifi_devices(bus))
+        for line in render_networks(networks, current):
+            print(line)
+    elif option == "scan":
+        scan_now(bus)
+    elif option == "watch-icon":
+        # The polybar watcher is the long-running network process, it also
+        # keeps the Wi-Fi scan cache up to date
+        network_config: dict = load_config().get("network") or {}
+        listener = NetworkListener(bus)
+        listener.start()
+        WifiScanner(bus, network_config.get("scan_interval", SCAN_INTERVAL)).start()
+        try:
+            GLib.MainLoop().run()
+        except KeyboardInterrupt:
+            pass
@@ -32,25 +32,35 @@ function toggle_wifi () {
   echo $toggle
 }
 
+# Wi-Fi scan cache kept up to date by the polybar watcher (core.py watch-icon)
+NETWORK_CACHE="${XDG_RUNTIME_DIR:-/tmp}/zui"
+
 function current_connection () {
-  CURRENT_SSID=$(nmcli -t -f active,ssid dev wifi | awk -F':' '$1=="yes" {print $2}')
+  if [[ -f "${NETWORK_CACHE}/wifi-ssid" ]]; then
+    CURRENT_SSID=$(<"${NETWORK_CACHE}/wifi-ssid")
+  else
+    CURRENT_SSID=$(nmcli -t -f active,ssid dev wifi list --rescan no | awk -F':' '$1=="yes" {print $2}')
+  fi
   [[ "$CURRENT_SSID" != '' ]] && currcon="Disconnect from $CURRENT_SSID" || currcon=""
   echo $currcon
 }
 
 function nmcli_list () {
   # get list of available connections without the active connection (if it's connected)
-  CURRENT_SSID=$(nmcli -t -f active,ssid dev wifi | awk -F':' '$1=="yes" {print $2}')
-  echo "$(nmcli --fields IN-USE,SSID,SECURITY,BARS device wifi list | sed "s/^IN-USE\s//g" | sed '/*/d' | sed 's/^ *//' | sed '/^SSID\s/d')"
+  if [[ -f "${NETWORK_CACHE}/wifi-networks" ]]; then
+    echo "$(<"${NETWORK_CACHE}/wifi-networks")"
+  else
+    python3 $(dirname $0)/core.py list
+  fi
 }
 
 function menu () {
   wa=$(wifiactive); ws=$(wifistate);
   if [[ $ws =~ $ENABLED ]]; then
     if [[ "$wa" != '' ]]; then
-        echo "$1\n\n$2\n$3\nManual Connection"
+        echo "$1\n\n$2\n$3\nRefresh Networks\nManual Connection"
     else
-        echo "$1\n\n$3\nManual Connection"
+        echo "$1\n\n$3\nRefresh Networks\nManual Connection"
     fi
   else
     echo "$3"
@@ -89,6 +99,10 @@ function main () {
     elif [[ "$OPS" =~ 'Disconnect' ]]; then
       nmcli con down uuid $CURRENT_UUID
 
+    elif [[ "$OPS" == 'Refresh Networks' ]]; then
+      python3 $(dirname $0)/core.py scan
+      main
+
     elif [[ "$OPS" =~ 'Manual' ]]; then
       # Manual entry of the SSID
       MSSID=$(echo -en "" | rofi -dmenu -p "直 SSID:")
@@ -108,7 +122,7 @@ function main () {
       fi
 
     else
-        if [[ "$OPS" =~ "WPA2" ]] || [[ "$OPS" =~ "WEP" ]]; then
+        if [[ "$OPS" =~ "WPA" ]] || [[ "$OPS" =~ "WEP" ]]; then
           WIFIPASS=$(echo -en "" | rofi -dmenu -password -p "$(echo ${OPS} | xargs | cut -d" " -f1)  :" -theme ${HOME}/.config/rofi/themes/launcher.rasi)
         fi
 
@@ -128,21 +142,9 @@ function main () {
     fi
 }
 
-function get_icon () {
-  ETHERNET=$(nmcli device | grep ethernet | grep " con")
-  WIFI=$(nmcli device | grep wifi | grep " con")
-
-  if [[ ${ETHERNET} ]]; then
-    notify-send "Network 󰈀" "Connected to ethernet";
-    echo '󰈀'
-  elif [[ ${WIFI} ]]; then
-    echo '直'
-  else
-    notify-send "Network " "Disconnected from internet";
-    echo ''
-  fi
-}
-
-
+# Icon state comes from NetworkManager's D-Bus signals, see core.py
+if [[ $1 == "get-icon" || $1 == "watch-icon" ]]; then
+  exec python3 $(dirname $0)/core.py $1
+fi
 
-if [[ $1 == "get-icon" ]]; then get_icon; else main; cleanup_networks; fi
+main; cleanup_networks
@@ -0,0 +1,242 @@
+#!/usr/bin/python3
+
+import os
+import re
+import sys
+import time
+import threading
+import subprocess
+
+HOME: str = os.getenv("HOME")
+CONFIG_PATH: str = f"{HOME}/.zui/core/system/config.yml"
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+MODULES_PATH: str = f"{HOME}/.zui/core/system/modules"
+PICOM_CONFIG_PATH: str = f"{HOME}/.config/picom/picom.conf"
+# modules.ini reads ${file:~/.cache/zui/polybar/<module>-interval:default}, keep in sync
+POLYBAR_INTERVALS_PATH: str = f"{HOME}/.cache/zui/polybar"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui import runtime_file
+from zui.power import on_battery, uevents
+from zui.tracing import Tracer
+
+tracer = Tracer("power")
+
+import yaml
+
+tracer.mark("imports")
+
+PROFILES: tuple = ("ac", "battery")
+# picom.conf with the profile's settings, picom runs with --config <this> while it applies
+# (the session starts it that way too, keep in sync with session/core.py)
+PICOM_OVERRIDE: str = "picom-power.conf"
+# Plugging the adapter sends a burst of uevents (adapter, then each battery)
+SETTLE_S: float = 0.5
+RETRY_S: float = 5.0
+POLYBAR_INTERVAL_MODULES: tuple = ("cpu", "memory", "disk", "battery")
+
+# Set by start_service() when the module is hosted by zuid
+service_mode: bool = False
+watcher = None
+
+
+def load_config() -> dict:
+    with open(CONFIG_PATH, "r") as stream:
+        try:
+            return yaml.safe_load(stream)
+        except yaml.YAMLError as exc:
+            print(exc)
+            return None
+
+
+def get_profile(config: dict, name: str) -> dict:
+    """power.<ac|battery> from config.yml; missing settings mean the theme's defaults"""
+    return ((config or {}).get("power") or {}).get(name) or {}
+
+
+def _running(name: str) -> bool:
+    result = subprocess.run(["pgrep", "-u", str(os.getuid()), "-x", name], stdout=subprocess.DEVNULL)
+    return result.returncode == 0
+
+
+def _module(name: str, option: str) -> None:
+    subprocess.run(
+        ["bash", f"{MODULES_PATH}/{name}/interface.sh", option],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def apply_refresh_rates(profile: dict) -> None:
+    # display.refresh_policy auto picks the rate from the power source
+    _module("monitors", "rates")
+
+
+def picom_config(base: str, settings: dict) -> str:
+    """picom.conf with some settings replaced (libconfig rejects duplicated settings)"""
+    for key, value in settings.items():
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif isinstance(value, str):
+            value = f'"{value}"'
+        line: str = f"{key} = {value};"
+        pattern = re.compile(rf"^\s*{re.escape(key)}\s*=.*$", re.MULTILINE)
+        base, count = pattern.subn(line.replace("\\", "\\\\"), base)
+        if not count:
+            base += f"\n{line}\n"
+    return base
+
+
+def apply_picom(profile: dict) -> None:
+    """picom can't change backend or vsync live: restart it with or without the override"""
+    settings: dict = profile.get("picom") or {}
+    override: str = runtime_file(PICOM_OVERRIDE)
+    if not settings and not os.path.exists(override):
+        return
+    args: list = ["picom", "--experimental-backends"]
+    if settings:
+        with open(PICOM_CONFIG_PATH, "r") as stream:
+            base: str = stream.read()
+        with open(override, "w") as stream:
+            stream.write(picom_config(base, settings))
+        args += ["--config", override]
+    else:
+        os.remove(override)
+    if not _running("picom"):
+        return
+    subprocess.run(["pkill", "-u", str(os.getuid()), "-x", "picom"])
+    deadline: float = time.monotonic() + 3.0
+    while _running("picom") and time.monotonic() < deadline:
+        time.sleep(0.05)
+    subprocess.Popen(
+        args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+
+
+def apply_polybar(profile: dict) -> None:
+    intervals: dict = profile.get("polybar_intervals") or {}
+    os.makedirs(POLYBAR_INTERVALS_PATH, exist_ok=True)
+    changed: bool = False
+    for module in POLYBAR_INTERVAL_MODULES:
+        path: str = f"{POLYBAR_INTERVALS_PATH}/{module}-interval"
+        if module in intervals:
+            with open(path, "w") as stream:
+                stream.write(str(intervals[module]))
+            changed = True
+        elif os.path.exists(path):
+            os.remove(path)
+            changed = True
+    if changed:
+        # Bars re-read their config (and the interval files) in place
+        subprocess.run(["polybar-msg", "cmd", "restart"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def apply_backlight(profile: dict) -> None:
+    cap_path: str = runtime_file("backlight-cap")
+    if "backlight_cap" in profile:
+        with open(cap_path, "w") as stream:
+            stream.write(str(profile["backlight_cap"]))
+        _module("backlight", "cap")
+    elif os.path.exists(cap_path):
+        os.remove(cap_path)
+        _module("backlight", "uncap")
+
+
+# Transition steps, in order: name -> apply(profile)
+STEPS: dict = {
+    "refresh": apply_refresh_rates,
+    "picom": apply_picom,
+    "polybar": apply_polybar,
+    "backlight": apply_backlight,
+}
+
+
+def apply_profile(name: str, config: dict) -> dict:
+    """Apply every step of a profile, returning the milliseconds each one took"""
+    profile: dict = get_profile(config, name)
+    transition = Tracer("power", name, from_process_start=False)
+    timings: dict = {}
+    for step, apply in STEPS.items():
+        started: float = time.monotonic()
+        try:
+            apply(profile)
+        except OSError as exc:
+            print(f"Error applying {step} for {name}: {exc}")
+        timings[step] = (time.monotonic() - started) * 1000
+        transition.mark(step)
+    transition.finish()
+    total: float = sum(timings.values())
+    steps: str = ", ".join(f"{step} {elapsed:.0f}" for step, elapsed in timings.items())
+    print(f"Applied {name} profile in {total:.0f} ms ({steps})")
+    return timings
+
+
+class Watcher:
+    """Applies the ac/battery profile whenever the power source changes"""
+
+    def __init__(self) -> None:
+        self.profile: str = None
+        self.timer: threading.Timer = None
+        self.lock = threading.Lock()
+
+    def check(self) -> None:
+        with self.lock:
+            profile: str = "battery" if on_battery() else "ac"
+            if profile == self.profile:
+                return
+            self.profile = profile
+            apply_profile(profile, load_config())
+
+    def schedule(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = threading.Timer(SETTLE_S, self.check)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def run(self) -> None:
+        self.check()
+        while True:
+            try:
+                for _event in uevents("power_supply"):
+                    self.schedule()
+            except OSError as exc:
+                print(f"Error reading power_supply uevents: {exc}")
+            time.sleep(RETRY_S)
+
+
+def start_service() -> None:
+    """zuid hook: follow the power source for the whole session"""
+    global service_mode, watcher
+    service_mode = True
+    watcher = Watcher()
+    threading.Thread(target=watcher.run, daemon=True).start()
+
+
+def handle(option: str, config: dict) -> None:
+    if option == "status":
+        profile: str = "battery" if on_battery() else "ac"
+        print(f"{profile}: {get_profile(config, profile) or 'theme defaults'}")
+    elif option == "apply":
+        apply_profile("battery" if on_battery() else "ac", config)
+    elif option in PROFILES:
+        apply_profile(option, config)
+    elif option == "watch":
+        if service_mode:
+            print("Already watching the power source in zuid")
+            return
+        try:
+            Watcher().run()
+        except KeyboardInterrupt:
+            pass
+    else:
+        print(f"Unknown option: {option}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    config: dict = load_config()
+    tracer.mark("config")
+    tracer.event = sys.argv[1] if len(sys.argv) > 1 else "status"
+    handle(tracer.event, config)
+    tracer.finish()
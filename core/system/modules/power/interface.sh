@@ -0,0 +1,9 @@
+#!/usr/bin/env bash
+
+# AC/battery profiles: status, apply, ac, battery or watch. zuid follows the power
+# source on its own, requests go through it when it's running (exit code 75 means it isn't)
+python3 -S "$(dirname $0)/../zuid/client.py" power ${1:-status}
+status=$?
+[[ ${status} -ne 75 ]] && exit ${status}
+
+exec python3 $(dirname $0)/core.py ${1:-status}
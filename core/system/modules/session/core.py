@@ -0,0 +1,225 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+
+HOME: str = os.getenv("HOME")
+ZUI_PATH: str = f"{HOME}/.zui"
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+MODULES_PATH: str = f"{ZUI_PATH}/core/system/modules"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui import runtime_file
+from zui.tracing import Tracer
+
+tracer = Tracer("session", "start")
+
+# Last session start, one record per component
+TIMELINE_STATE: str = "session.json"
+# Output of the one-shot components
+LOG_NAME: str = "session.log"
+# How long a replaced daemon gets to exit before it's started again
+REPLACE_TIMEOUT_S: float = 3.0
+TIMELINE_WIDTH: int = 50
+
+# Session components: name -> command and start options
+#   after:   components that must have finished starting first
+#   daemon:  long-running, started detached and not waited for
+#   replace: daemon killed (pkill -x) and started again on every bspwmrc run
+#   unique:  daemon left alone when a process matching this (pgrep -f) is running
+#   config:  runtime file passed with --config when it exists
+COMPONENTS: dict = {
+    "sxhkd": {"command": ["sxhkd"], "daemon": True, "replace": True},
+    "dunst": {"command": ["dunst"], "daemon": True, "replace": True},
+    "zuid": {
+        "command": ["python3", f"{MODULES_PATH}/zuid/core.py"],
+        "daemon": True,
+        "unique": "zuid/core.py",
+    },
+    "cursor": {"command": ["xsetroot", "-cursor_name", "left_ptr"]},
+    "layout": {"command": ["bash", f"{MODULES_PATH}/monitors/interface.sh", "layout"]},
+    "polybar": {
+        "command": ["bash", f"{MODULES_PATH}/monitors/interface.sh", "bars"],
+        "after": ["layout"],
+    },
+    "wallpaper": {"command": ["bash", f"{MODULES_PATH}/wallpaper/interface.sh", "apply"], "after": ["layout"]},
+    # Started once the outputs are final so it doesn't rebuild its buffers
+    # The power module's picom.conf (battery settings) may already be there at login
+    "picom": {
+        "command": ["picom", "--experimental-backends"],
+        "daemon": True,
+        "after": ["layout"],
+        "config": "picom-power.conf",
+    },
+}
+
+
+def start_order(components: dict) -> list:
+    """Components sorted so each one comes after its dependencies (Kahn's algorithm)"""
+    for name, component in components.items():
+        for dependency in component.get("after", []):
+            if dependency not in components:
+                raise ValueError(f"{name} depends on unknown component {dependency}")
+
+    pending: dict = {name: set(component.get("after", [])) for name, component in components.items()}
+    order: list = []
+    while pending:
+        ready: list = [name for name, dependencies in pending.items() if not dependencies]
+        if not ready:
+            raise ValueError(f"Dependency cycle between {', '.join(sorted(pending))}")
+        for name in ready:
+            order.append(name)
+            del pending[name]
+        for dependencies in pending.values():
+            dependencies.difference_update(ready)
+    return order
+
+
+def _running(pattern: str, exact: bool) -> bool:
+    flag: str = "-x" if exact else "-f"
+    result = subprocess.run(
+        ["pgrep", "-u", str(os.getuid()), flag, pattern], stdout=subprocess.DEVNULL
+    )
+    return result.returncode == 0
+
+
+def _replace(name: str) -> None:
+    """Stop a running daemon and wait until it's gone (instead of a fixed sleep)"""
+    if subprocess.run(["pkill", "-u", str(os.getuid()), "-x", name]).returncode != 0:
+        return
+    deadline: float = time.monotonic() + REPLACE_TIMEOUT_S
+    while time.monotonic() < deadline and _running(name, exact=True):
+        time.sleep(0.05)
+
+
+class Session:
+    """Starts the session components concurrently, each as soon as its dependencies are up.
+
+    A dependency is up when a one-shot command has exited or a daemon has been
+    spawned. A failed dependency doesn't hold its dependents back: a wallpaper
+    on a half-configured layout beats no wallpaper.
+    """
+
+    def __init__(self, components: dict) -> None:
+        self.components = components
+        self.order: list = start_order(components)
+        self.done: dict = {name: threading.Event() for name in components}
+        self.timeline: dict = {}
+        self.log_lock = threading.Lock()
+        self.started: float = None
+
+    def _elapsed_ms(self) -> float:
+        return round((time.monotonic() - self.started) * 1000, 1)
+
+    def _log(self, name: str, output: str) -> None:
+        if not output:
+            return
+        with self.log_lock:
+            with open(runtime_file(LOG_NAME), "a") as stream:
+                stream.writelines(f"[{name}] {line}\n" for line in output.splitlines())
+
+    def _start(self, name: str) -> str:
+        """Run one component, returning its status"""
+        component: dict = self.components[name]
+        command: list = component["command"]
+        if component.get("config") and os.path.exists(runtime_file(component["config"])):
+            command = command + ["--config", runtime_file(component["config"])]
+        if not component.get("daemon"):
+            result = subprocess.run(
+                command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+            )
+            self._log(name, result.stdout)
+            return "ok" if result.returncode == 0 else f"exit {result.returncode}"
+
+        if component.get("unique") and _running(component["unique"], exact=False):
+            return "running"
+        if component.get("replace"):
+            _replace(os.path.basename(command[0]))
+        subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            # Daemons belong to the X session, not to this process
+            start_new_session=True,
+        )
+        return "spawned"
+
+    def _run(self, name: str) -> None:
+        component: dict = self.components[name]
+        for dependency in component.get("after", []):
+            self.done[dependency].wait()
+        record: dict = {"after": component.get("after", []), "start_ms": self._elapsed_ms()}
+        try:
+            record["status"] = self._start(name)
+        except OSError as exc:
+            record["status"] = f"error: {exc.strerror}"
+            self._log(name, str(exc))
+        record["end_ms"] = self._elapsed_ms()
+        self.timeline[name] = record
+        tracer.mark(name)
+        self.done[name].set()
+
+    def run(self) -> dict:
+        try:
+            os.remove(runtime_file(LOG_NAME))
+        except FileNotFoundError:
+            pass
+        self.started = time.monotonic()
+        threads: list = [threading.Thread(target=self._run, args=(name,)) for name in self.order]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {name: self.timeline[name] for name in self.order}
+
+
+def save_timeline(timeline: dict) -> None:
+    with open(runtime_file(TIMELINE_STATE), "w") as stream:
+        json.dump({"time": time.time(), "components": timeline}, stream)
+
+
+def load_timeline() -> dict:
+    try:
+        with open(runtime_file(TIMELINE_STATE), "r") as stream:
+            return json.load(stream)["components"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def print_timeline(timeline: dict) -> None:
+    """One row per component: start/end in ms and a bar spanning its startup"""
+    total: float = max([record["end_ms"] for record in timeline.values()] + [1.0])
+    scale: float = TIMELINE_WIDTH / total
+    print(f"{'component':<12}{'start':>9}{'end':>9}  {'status':<12}")
+    for name, record in sorted(timeline.items(), key=lambda item: item[1]["start_ms"]):
+        offset: int = round(record["start_ms"] * scale)
+        length: int = max(1, round((record["end_ms"] - record["start_ms"]) * scale))
+        bar: str = " " * offset + "█" * length
+        print(
+            f"{name:<12}{record['start_ms']:>9.1f}{record['end_ms']:>9.1f}  {record['status']:<12}{bar}"
+        )
+    print(f"\nSession started in {total:.1f} ms")
+
+
+if __name__ == "__main__":
+    option: str = sys.argv[1] if len(sys.argv) > 1 else "start"
+
+    if option == "start":
+        session = Session(COMPONENTS)
+        timeline: dict = session.run()
+        save_timeline(timeline)
+        tracer.finish()
+    elif option == "timeline":
+        timeline: dict = load_timeline()
+        if not timeline:
+            print("No session start recorded yet")
+            sys.exit(1)
+        print_timeline(timeline)
+    else:
+        print(f"Unknown option: {option}")
+        sys.exit(1)
@@ -0,0 +1,4 @@
+#!/usr/bin/env bash
+
+# Session bootstrap: "start" from bspwmrc, "timeline" to see where login time went
+exec python3 $(dirname $0)/core.py "$@"
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import time
+import fcntl
+import argparse
+
+HOME: str = os.getenv("HOME")
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui import runtime_file
+from zui.metrics import BUCKETS_S, LOCK_NAME, PROM_NAME, STATE_NAME, load_state, parse_key
+
+DEFAULT_EVENTS: int = 20
+
+
+def bucket_percentile(histogram: list, pct: int) -> str:
+    """Upper bound of the bucket holding the percentile, in ms ("> 5000" past the last one)"""
+    # Past the last bound is the +Inf bucket
+    counts: list = histogram[: len(BUCKETS_S)]
+    rank: float = pct / 100 * histogram[-1]
+    cumulative: int = 0
+    for bound, count in zip(BUCKETS_S, counts, strict=True):
+        cumulative += count
+        if cumulative >= rank:
+            return f"<= {bound * 1000:g}"
+    return f"> {BUCKETS_S[-1] * 1000:g}"
+
+
+def summary(state: dict) -> None:
+    events: dict = {}
+    for key, histogram in state["histograms"].items():
+        name, labels = parse_key(key)
+        if name == "zui_event_duration_seconds":
+            events[(labels["module"], labels["event"])] = histogram
+    if not events:
+        print("No events recorded this session")
+        return
+
+    failures: dict = {}
+    spawned: dict = {}
+    for key, value in state["counters"].items():
+        name, labels = parse_key(key)
+        if name == "zui_event_failures_total":
+            failures[(labels["module"], labels["event"])] = value
+        elif name == "zui_subprocesses_total":
+            spawned[(labels["module"], labels["program"])] = value
+    last: dict = {}
+    for key, value in state["gauges"].items():
+        name, labels = parse_key(key)
+        if name == "zui_event_last_duration_seconds":
+            last[(labels["module"], labels["event"])] = value
+
+    print(f"{'module':<12}{'event':<24}{'runs':>7}{'failed':>8}{'mean':>9}{'last':>9}{'p95':>11}")
+    for (module, event), histogram in sorted(events.items()):
+        runs: int = histogram[-1]
+        mean: float = histogram[-2] / runs * 1000 if runs else 0.0
+        row: str = (
+            f"{runs:>7}{failures.get((module, event), 0):>8g}{mean:>9.1f}"
+            f"{last.get((module, event), 0) * 1000:>9.1f}{bucket_percentile(histogram, 95):>11}"
+        )
+        print(f"{module:<12}{event:<24}{row}")
+    print("(durations in ms)")
+
+    if spawned:
+        print(f"\n{'module':<12}{'program':<24}{'spawned':>7}")
+        for (module, program), count in sorted(spawned.items(), key=lambda item: -item[1]):
+            print(f"{module:<12}{program:<24}{count:>7g}")
+
+
+def recent_events(state: dict, count: int) -> None:
+    for event in state["events"][-count:]:
+        clock: str = time.strftime("%H:%M:%S", time.localtime(event["time"]))
+        status: str = "" if event["ok"] else "  failed"
+        print(f"{clock}  {event['module']:<12}{event['event'] or '':<24}{event['ms']:>9.1f} ms{status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Module metrics of the current session")
+    parser.add_argument("option", type=str, nargs="?", default="summary")
+    parser.add_argument("count", type=int, nargs="?", default=DEFAULT_EVENTS)
+    args = parser.parse_args()
+
+    if args.option == "summary":
+        summary(load_state())
+    elif args.option == "events":
+        recent_events(load_state(), args.count)
+    elif args.option == "prom":
+        try:
+            with open(runtime_file(PROM_NAME), "r") as stream:
+                sys.stdout.write(stream.read())
+        except FileNotFoundError:
+            print("No metrics recorded this session")
+            sys.exit(1)
+    elif args.option == "reset":
+        # Under the lock, so a module flushing right now doesn't bring the old totals back
+        with open(runtime_file(LOCK_NAME), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            for name in (STATE_NAME, PROM_NAME):
+                try:
+                    os.remove(runtime_file(name))
+                except FileNotFoundError:
+                    pass
+    else:
+        print(f"Unknown option: {args.option}")
+        sys.exit(1)
@@ -0,0 +1,4 @@
+#!/usr/bin/env bash
+
+# Event counts, durations and spawned processes of the modules this session
+python3 $(dirname $0)/core.py "$@"
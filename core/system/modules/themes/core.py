@@ -0,0 +1,470 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import subprocess
+import configparser
+
+HOME: str = os.getenv("HOME")
+ZUI_PATH: str = f"{HOME}/.zui"
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+CONFIG_DIR: str = os.getenv("XDG_CONFIG_HOME", f"{HOME}/.config")
+THEMES_PATH: str = f"{ZUI_PATH}/themes"
+CURRENT_THEME: str = f"{ZUI_PATH}/current_theme"
+MODULES_PATH: str = f"{ZUI_PATH}/core/system/modules"
+XSETTINGSD_PATH: str = f"{HOME}/.xsettingsd"
+# Content-addressed theme store: every unique file once, themes are trees built from it
+STORE_PATH: str = f"{ZUI_PATH}/store"
+OBJECTS_PATH: str = f"{STORE_PATH}/objects"
+TREES_PATH: str = f"{STORE_PATH}/trees"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui.tracing import Tracer
+
+tracer = Tracer("themes")
+
+# ~/.config/<name> -> ~/.zui/current_theme/<name>, created by install_theme.sh.
+# Links go through current_theme, so swapping that one link switches them all.
+CONFIG_LINKS: tuple = ("rofi", "dunst", "gtk-3.0", "gtk-4.0", "lsd", "nvim", "picom", "sublime-text")
+WALLPAPER_LINK: str = "wallpapers/current_wallpaper"
+WALLPAPER_EXTENSIONS: tuple = (".png", ".jpg", ".jpeg")
+# Files nothing edits in place, hardlinked to their object when reflink isn't available
+# (sed -i and editors saving atomically replace the file, breaking the link): these
+# types and anything larger than a config file gets (binaries in system/bin...)
+SHARED_SUFFIXES: tuple = (".sublime-package", ".user-ca-bundle") + WALLPAPER_EXTENSIONS
+SHARED_MIN_SIZE: int = 64 * 1024
+
+# ioctl(dest, FICLONE, src): share the source's extents copy-on-write (btrfs, xfs...)
+FICLONE: int = 0x40049409
+HASH_CHUNK: int = 1 << 20
+
+# settings.ini key -> (xsettingsd setting, gsettings key)
+GTK_SETTINGS: dict = {
+    "gtk-theme-name": ("Net/ThemeName", "gtk-theme"),
+    "gtk-icon-theme-name": ("Net/IconThemeName", "icon-theme"),
+    "gtk-cursor-theme-name": ("Gtk/CursorThemeName", "cursor-theme"),
+    "gtk-font-name": ("Gtk/FontName", "font-name"),
+}
+
+
+def _run(*command) -> bool:
+    try:
+        return subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+    except OSError:
+        return False
+
+
+def _running(name: str) -> bool:
+    return _run("pgrep", "-u", str(os.getuid()), "-x", name)
+
+
+def reload_polybar(theme_path: str) -> None:
+    # Bars re-exec in place (same pid) and read the new config, then the
+    # monitors module starts or stops bars the new launch.sh adds or drops
+    _run("polybar-msg", "cmd", "restart")
+    _run("bash", f"{MODULES_PATH}/monitors/interface.sh", "bars")
+
+
+def reload_dunst(theme_path: str) -> None:
+    if not _running("dunst"):
+        return
+    if not _run("dunstctl", "reload"):
+        # dunst < 1.7 can't reload its config
+        _run("pkill", "-u", str(os.getuid()), "-x", "dunst")
+        subprocess.Popen(
+            ["dunst"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+
+
+def reload_picom(theme_path: str) -> None:
+    # SIGUSR1: picom re-reads its config file
+    _run("pkill", "-USR1", "-u", str(os.getuid()), "-x", "picom")
+
+
+def reload_gtk(theme_path: str) -> None:
+    """Running GTK apps follow XSETTINGS: update xsettingsd if it runs, gsettings otherwise"""
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(f"{theme_path}/gtk-3.0/settings.ini")
+    if not parser.has_section("Settings"):
+        return
+    values: dict = {key: parser.get("Settings", key) for key in GTK_SETTINGS if parser.has_option("Settings", key)}
+
+    if _running("xsettingsd"):
+        try:
+            with open(XSETTINGSD_PATH, "r") as stream:
+                lines: list = stream.read().splitlines()
+        except OSError:
+            lines = []
+        names: set = {GTK_SETTINGS[key][0] for key in values}
+        lines = [line for line in lines if line.split(" ", 1)[0] not in names]
+        lines += [f'{GTK_SETTINGS[key][0]} "{value}"' for key, value in values.items()]
+        with open(XSETTINGSD_PATH, "w") as stream:
+            stream.write("\n".join(lines) + "\n")
+        _run("pkill", "-HUP", "-u", str(os.getuid()), "-x", "xsettingsd")
+    else:
+        for key, value in values.items():
+            _run("gsettings", "set", "org.gnome.desktop.interface", GTK_SETTINGS[key][1], value)
+
+
+def reload_wallpaper(theme_path: str) -> None:
+    subprocess.Popen(
+        ["bash", f"{MODULES_PATH}/wallpaper/interface.sh", "apply"],
+        stdout=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+# Components reloaded live when their files differ between themes: name -> (theme path, reload).
+# Everything else (rofi, nvim, lsd, sublime-text) reads its config when it starts.
+COMPONENTS: dict = {
+    "polybar": ("polybar", reload_polybar),
+    "dunst": ("dunst", reload_dunst),
+    "picom": ("picom", reload_picom),
+    "gtk": ("gtk-3.0", reload_gtk),
+    "wallpaper": (WALLPAPER_LINK, reload_wallpaper),
+}
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as stream:
+        for chunk in iter(lambda: stream.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def tree_digest(path: str) -> str:
+    """sha256 over the relative paths and contents of a file or directory (None if missing)"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    if os.path.isfile(path):
+        files: list = [("", path)]
+    else:
+        files = []
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            for name in sorted(names):
+                files.append((os.path.relpath(f"{root}/{name}", path), f"{root}/{name}"))
+    for relative, full in files:
+        digest.update(relative.encode() + b"\0")
+        try:
+            with open(full, "rb") as stream:
+                for chunk in iter(lambda: stream.read(HASH_CHUNK), b""):
+                    digest.update(chunk)
+        except OSError:
+            # Dangling link
+            digest.update(b"\0missing")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def changed_components(old_path: str, new_path: str) -> list:
+    return [
+        name
+        for name, (path, _reload) in COMPONENTS.items()
+        if tree_digest(f"{old_path}/{path}") != tree_digest(f"{new_path}/{path}")
+    ]
+
+
+def replace_link(target: str, link: str) -> None:
+    """Point link at target in one rename, so nothing ever sees it missing"""
+    tmp_link: str = f"{link}.{os.getpid()}.tmp"
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, link)
+
+
+def ensure_wallpaper_link(theme_path: str) -> None:
+    """Same choice as install_theme.sh: wallpapers/default, else the first image.
+
+    The link is relative so it resolves inside the theme even before the switch.
+    """
+    link: str = f"{theme_path}/{WALLPAPER_LINK}"
+    wallpapers: str = os.path.dirname(link)
+    if os.path.islink(link) and os.readlink(link).startswith(f"{CURRENT_THEME}/"):
+        # Older installs link through current_theme, which still is the old theme here
+        replace_link(os.path.basename(os.readlink(link)), link)
+    if os.path.exists(link) or not os.path.isdir(wallpapers):
+        return
+    if os.path.exists(f"{wallpapers}/default"):
+        replace_link("default", link)
+        return
+    images: list = sorted(name for name in os.listdir(wallpapers) if name.lower().endswith(WALLPAPER_EXTENSIONS))
+    if images:
+        replace_link(images[0], link)
+
+
+def update_config_links(theme_path: str) -> None:
+    """~/.config links for the components the new theme has, none for the ones it lacks"""
+    for name in CONFIG_LINKS:
+        link: str = f"{CONFIG_DIR}/{name}"
+        target: str = f"{CURRENT_THEME}/{name}"
+        if os.path.isdir(f"{theme_path}/{name}"):
+            if not os.path.islink(link) or os.readlink(link) != target:
+                if os.path.isdir(link) and not os.path.islink(link):
+                    print(f"Not replacing {link}: it isn't a link")
+                    continue
+                replace_link(target, link)
+        elif os.path.islink(link) and os.readlink(link) == target:
+            os.remove(link)
+
+
+def current_theme() -> str:
+    # current_theme -> themes/<theme>, which may itself link into the store
+    return os.path.basename(os.readlink(CURRENT_THEME)) if os.path.islink(CURRENT_THEME) else None
+
+
+def object_path(name: str) -> str:
+    return f"{OBJECTS_PATH}/{name[:2]}/{name}"
+
+
+def add_object(path: str) -> tuple:
+    """Store a file by content hash, returning (object name, bytes added).
+
+    Objects are read-only: they are shared by every theme using them. The
+    executable bit is part of the name, trees restore it from there.
+    """
+    executable: bool = os.access(path, os.X_OK)
+    name: str = file_digest(path) + (".x" if executable else "")
+    target: str = object_path(name)
+    if os.path.exists(target):
+        return name, 0
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path: str = f"{target}.{os.getpid()}.tmp"
+    shutil.copyfile(path, tmp_path)
+    os.chmod(tmp_path, 0o555 if executable else 0o444)
+    os.replace(tmp_path, target)
+    return name, os.path.getsize(target)
+
+
+def scan(source: str) -> tuple:
+    """Import a theme directory: (manifest, bytes added to the store).
+
+    The manifest maps each relative path to ["file", object] or ["link",
+    target]. Empty directories are left out, like rsync -m does.
+    """
+    manifest: dict = {}
+    added: int = 0
+    for root, dirs, names in os.walk(source):
+        dirs.sort()
+        for name in sorted(names + [d for d in dirs if os.path.islink(f"{root}/{d}")]):
+            path: str = f"{root}/{name}"
+            relative: str = os.path.relpath(path, source)
+            if os.path.islink(path):
+                manifest[relative] = ["link", os.readlink(path)]
+            else:
+                object_name, size = add_object(path)
+                manifest[relative] = ["file", object_name]
+                added += size
+    return manifest, added
+
+
+def _clone(source: str, dest: str) -> None:
+    with open(source, "rb") as src, open(dest, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def _shared(relative: str, path: str) -> bool:
+    return relative.lower().endswith(SHARED_SUFFIXES) or os.path.getsize(path) >= SHARED_MIN_SIZE
+
+
+def link_method() -> str:
+    """reflink where the filesystem supports it, hardlink otherwise.
+
+    ~/.config links into the trees, so their files get edited. A reflinked
+    file is a private copy-on-write copy and costs no space until it's
+    edited. Without reflink only the large files (see SHARED_SUFFIXES) are
+    hardlinked to their read-only object and the config files are copied:
+    an edit written in place would change the object for every theme.
+    """
+    os.makedirs(OBJECTS_PATH, exist_ok=True)
+    probe: str = f"{OBJECTS_PATH}/.probe.{os.getpid()}"
+    with open(probe, "wb") as stream:
+        stream.write(b"probe")
+    try:
+        _clone(probe, f"{probe}.clone")
+        return "reflink"
+    except OSError:
+        return "hardlink"
+    finally:
+        for path in (probe, f"{probe}.clone"):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def materialize(manifest: dict, tree: str, method: str) -> None:
+    for relative, (kind, value) in manifest.items():
+        dest: str = f"{tree}/{relative}"
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if kind == "link":
+            os.symlink(value, dest)
+            continue
+        source: str = object_path(value)
+        if method == "reflink":
+            try:
+                _clone(source, dest)
+            except OSError:
+                # A store on another filesystem
+                shutil.copy2(source, dest)
+        elif _shared(relative, source):
+            try:
+                # Keeps the object's read-only mode
+                os.link(source, dest)
+                continue
+            except OSError:
+                shutil.copy2(source, dest)
+        else:
+            shutil.copy2(source, dest)
+        # Writable, unlike the object it comes from
+        os.chmod(dest, 0o755 if value.endswith(".x") else 0o644)
+
+
+def shares_editable(tree: str, manifest: dict) -> bool:
+    """Whether files that get edited are hardlinked to their object, as older installs did"""
+    for relative, (kind, _value) in manifest.items():
+        path: str = f"{tree}/{relative}"
+        try:
+            if kind == "file" and os.lstat(path).st_nlink > 1 and not _shared(relative, path):
+                return True
+        except OSError:
+            continue
+    return False
+
+
+def install(theme: str, source: str) -> bool:
+    """Import a theme into the store and point themes/<theme> at its tree.
+
+    Trees are named after their manifest, so reinstalling an unchanged theme
+    only swaps a link. Theme directories from older installs (plain copies)
+    are replaced.
+    """
+    if not os.path.isdir(source):
+        print(f"Theme directory not found: {source}")
+        return False
+    manifest, added = scan(source)
+    tracer.mark("scan")
+
+    manifest_id: str = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:12]
+    tree: str = f"{TREES_PATH}/{theme}-{manifest_id}"
+    method: str = link_method()
+    stale: bool = os.path.isdir(tree) and shares_editable(tree, manifest)
+    if stale or not os.path.isdir(tree):
+        tmp_tree: str = f"{tree}.{os.getpid()}.tmp"
+        materialize(manifest, tmp_tree, method)
+        with open(f"{tmp_tree}.json", "w") as stream:
+            json.dump(manifest, stream)
+        os.replace(f"{tmp_tree}.json", f"{tree}.json")
+        if stale:
+            # Rebuilt with private copies of the config files, the old one goes
+            old_tree: str = f"{tree}.{os.getpid()}.old"
+            os.rename(tree, old_tree)
+            os.rename(tmp_tree, tree)
+            shutil.rmtree(old_tree)
+        else:
+            os.rename(tmp_tree, tree)
+    tracer.mark("materialize")
+
+    os.makedirs(THEMES_PATH, exist_ok=True)
+    theme_path: str = f"{THEMES_PATH}/{theme}"
+    if os.path.isdir(theme_path) and not os.path.islink(theme_path):
+        old_copy: str = f"{THEMES_PATH}/.{theme}.{os.getpid()}.old"
+        os.rename(theme_path, old_copy)
+        replace_link(tree, theme_path)
+        shutil.rmtree(old_copy)
+    else:
+        replace_link(tree, theme_path)
+    print(f"Installed '{theme}': {len(manifest)} files, {added / 1024:.0f} KiB new in the store ({method})")
+    return True
+
+
+def gc() -> None:
+    """Remove trees no theme links to, then objects no remaining tree uses"""
+    live_trees: set = set()
+    if os.path.isdir(THEMES_PATH):
+        for name in os.listdir(THEMES_PATH):
+            if os.path.islink(f"{THEMES_PATH}/{name}"):
+                live_trees.add(os.path.realpath(f"{THEMES_PATH}/{name}"))
+
+    live_objects: set = set()
+    removed_trees: int = 0
+    for name in os.listdir(TREES_PATH) if os.path.isdir(TREES_PATH) else []:
+        tree: str = f"{TREES_PATH}/{name}"
+        if not os.path.isdir(tree) or os.path.islink(tree):
+            continue
+        if tree not in live_trees:
+            shutil.rmtree(tree)
+            if os.path.exists(f"{tree}.json"):
+                os.remove(f"{tree}.json")
+            removed_trees += 1
+            continue
+        try:
+            with open(f"{tree}.json", "r") as stream:
+                manifest: dict = json.load(stream)
+        except (OSError, ValueError):
+            print(f"No manifest for {tree}, keeping every object")
+            return
+        live_objects.update(value for kind, value in manifest.values() if kind == "file")
+
+    removed_objects: int = 0
+    freed: int = 0
+    for root, _dirs, names in os.walk(OBJECTS_PATH):
+        for name in names:
+            if name not in live_objects:
+                freed += os.path.getsize(f"{root}/{name}")
+                os.remove(f"{root}/{name}")
+                removed_objects += 1
+    print(f"Removed {removed_trees} trees and {removed_objects} objects ({freed / 1024:.0f} KiB)")
+
+
+def switch(theme: str) -> bool:
+    new_path: str = f"{THEMES_PATH}/{theme}"
+    if not os.path.isdir(new_path):
+        print(f"Theme '{theme}' is not installed in {THEMES_PATH}")
+        return False
+    old_path: str = os.path.realpath(CURRENT_THEME)
+    if old_path == os.path.realpath(new_path):
+        print(f"Theme '{theme}' is already the current theme")
+        return True
+
+    ensure_wallpaper_link(new_path)
+    changed: list = changed_components(old_path, new_path)
+    tracer.mark("diff")
+
+    replace_link(new_path, CURRENT_THEME)
+    update_config_links(new_path)
+    tracer.mark("links")
+
+    for name in changed:
+        COMPONENTS[name][1](new_path)
+        tracer.mark(name)
+    print(f"Switched to '{theme}', reloaded: {', '.join(changed) or 'nothing'}")
+    return True
+
+
+if __name__ == "__main__":
+    option: str = sys.argv[1] if len(sys.argv) > 1 else "current"
+    tracer.event = option
+
+    if option == "switch" and len(sys.argv) > 2:
+        started: float = time.monotonic()
+        if not switch(sys.argv[2]):
+            sys.exit(1)
+        print(f"Theme switch took {(time.monotonic() - started) * 1000:.0f} ms")
+    elif option == "diff" and len(sys.argv) > 2:
+        print("\n".join(changed_components(os.path.realpath(CURRENT_THEME), f"{THEMES_PATH}/{sys.argv[2]}")))
+    elif option == "install" and len(sys.argv) > 3:
+        if not install(sys.argv[2], sys.argv[3]):
+            sys.exit(1)
+    elif option == "gc":
+        gc()
+    elif option == "current":
+        print(current_theme() or "No theme installed")
+    else:
+        print("Usage: core.py switch <theme> | diff <theme> | install <theme> <dir> | gc | current")
+        sys.exit(1)
+    tracer.finish()
@@ -0,0 +1,4 @@
+#!/usr/bin/env bash
+
+# Live theme switch: swaps ~/.zui/current_theme and reloads only what changed
+exec python3 $(dirname $0)/core.py "$@"
@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import time
+import threading
+
+HOME: str = os.getenv("HOME")
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui import bspwm
+from zui.tracing import Tracer
+
+tracer = Tracer("tiles")
+
+# direction -> (edge, fallback edge, x sign, y sign)
+DIRECTIONS: dict = {
+    "west": ("right", "left", -1, 0),
+    "east": ("right", "left", 1, 0),
+    "north": ("top", "bottom", 0, -1),
+    "south": ("top", "bottom", 0, 1),
+}
+
+# Step in pixels: a tap moves the first one (the steps the old bspc script used),
+# holding the key ramps up to the second one
+FLOATING_STEPS: tuple = (20, 60)
+TILED_STEPS: tuple = (100, 250)
+RAMP_REPEATS: int = 12
+# Key repeats closer than this belong to the same hold
+HOLD_TIMEOUT_S: float = 0.25
+FRAME_RATE: int = 60
+
+# Set by start_service() when the module is hosted by zuid
+service_mode: bool = False
+
+
+def start_service() -> None:
+    """zuid hook: accumulate key repeats and resize from a frame loop"""
+    global service_mode
+    service_mode = True
+
+
+def step_size(steps: tuple, repeats: int) -> int:
+    """Accelerating step curve: quadratic ramp from the min to the max step"""
+    min_step, max_step = steps
+    progress: float = min(1.0, repeats / RAMP_REPEATS)
+    return round(min_step + (max_step - min_step) * progress**2)
+
+
+class Resizer:
+    """Resizes the focused node through the bspwm socket.
+
+    Repeats of a held key are accumulated and applied at most once per frame,
+    and the edge that worked for a node is remembered so the fallback edge
+    (a node at the screen border can't move its outer edge) costs one request
+    only the first time.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.node: str = None
+        self.steps: tuple = TILED_STEPS
+        self.direction: str = None
+        self.repeats: int = 0
+        self.last_press: float = 0.0
+        self.pending_x: int = 0
+        self.pending_y: int = 0
+        # axis -> edge that last worked for the current node
+        self.edges: dict = {}
+        self.frame_loop: threading.Thread = None
+
+    def press(self, direction: str) -> None:
+        now: float = time.monotonic()
+        with self.lock:
+            held: bool = direction == self.direction and now - self.last_press < HOLD_TIMEOUT_S
+            self.last_press = now
+            if held:
+                self.repeats += 1
+            else:
+                # Resizes left from the previous hold go to their own edge
+                self.flush()
+                self.direction = direction
+                self.repeats = 0
+                self.focus_changed()
+
+            _edge, _fallback, x_sign, y_sign = DIRECTIONS[direction]
+            step: int = step_size(self.steps, self.repeats)
+            self.pending_x += x_sign * step
+            self.pending_y += y_sign * step
+            tracer.mark("press")
+
+            if not service_mode:
+                self.flush()
+            elif self.frame_loop is None:
+                self.frame_loop = threading.Thread(target=self._run_frames, daemon=True)
+                self.frame_loop.start()
+
+    def focus_changed(self) -> None:
+        """New hold: read the focused node and whether it floats"""
+        focused: list = bspwm.query("-N", "-n", "focused")
+        node: str = focused[0] if focused else None
+        if node != self.node:
+            self.node = node
+            self.edges = {}
+        floating: bool = bool(self.node) and bool(bspwm.query("-N", "-n", f"{self.node}.floating"))
+        self.steps = FLOATING_STEPS if floating else TILED_STEPS
+
+    def _run_frames(self) -> None:
+        frame: float = 1 / FRAME_RATE
+        while True:
+            with self.lock:
+                if not self.pending_x and not self.pending_y:
+                    self.frame_loop = None
+                    return
+                self.flush()
+            time.sleep(frame)
+
+    def flush(self) -> None:
+        """One resize with everything accumulated since the last frame (lock held)"""
+        dx, dy = self.pending_x, self.pending_y
+        self.pending_x = self.pending_y = 0
+        if self.node is None or (not dx and not dy):
+            return
+        edge, fallback, _x_sign, _y_sign = DIRECTIONS[self.direction]
+        axis: str = "x" if dx else "y"
+        first: str = self.edges.get(axis, edge)
+        for candidate in (first, fallback if first == edge else edge):
+            try:
+                bspwm.send("node", self.node, "-z", candidate, dx, dy)
+                self.edges[axis] = candidate
+                break
+            except bspwm.BspwmError:
+                continue
+        tracer.mark("resize")
+
+
+resizer = Resizer()
+
+
+def handle(option: str, config: dict) -> None:
+    if option not in DIRECTIONS:
+        print(f"Unknown direction: {option}")
+        sys.exit(1)
+    resizer.press(option)
+
+
+if __name__ == "__main__":
+    tracer.event = sys.argv[1] if len(sys.argv) > 1 else None
+    handle(tracer.event, {})
+    tracer.finish()
@@ -1,16 +1,9 @@
 #!/usr/bin/env bash
 
-if bspc query -N -n focused.floating > /dev/null; then
-	step=20
-else
-	step=100
-fi
+# Resizes go through zuid when it's running (exit code 75 means it isn't),
+# so key repeats are accumulated and applied once per frame by the same process.
+python3 -S "$(dirname $0)/../zuid/client.py" tiles $1
+status=$?
+[[ ${status} -ne 75 ]] && exit ${status}
 
-case "$1" in
-	west) dir=right; falldir=left; x="-$step"; y=0;;
-	east) dir=right; falldir=left; x="$step"; y=0;;
-	north) dir=top; falldir=bottom; x=0; y="-$step";;
-	south) dir=top; falldir=bottom; x=0; y="$step";;
-esac
-
-bspc node -z "$dir" "$x" "$y" || bspc node -z "$falldir" "$x" "$y"
+exec python3 $(dirname $0)/core.py $1
@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+
+import os
+import sys
+import json
+import argparse
+
+HOME: str = os.getenv("HOME")
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui import runtime_file
+from zui.tracing import trace_path
+
+PERCENTILES: tuple = (50, 95, 99)
+
+
+def load_events(path: str) -> list:
+    events: list = []
+    try:
+        with open(path, "r") as stream:
+            for line in stream:
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    except OSError as exc:
+        print(f"Error reading traces: {exc}")
+    return events
+
+
+def percentile(values: list, pct: int) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    rank: int = max(1, -(-pct * len(values) // 100))
+    return values[rank - 1]
+
+
+def stage_durations(events: list) -> dict:
+    """Per (module, event): time spent in each stage, measured from the previous one"""
+    groups: dict = {}
+    for event in events:
+        durations: dict = groups.setdefault((event["module"], event.get("event")), {})
+        previous: float = 0.0
+        for stage, elapsed in event["stages"].items():
+            if stage == "start":
+                continue
+            durations.setdefault(stage, []).append(elapsed - previous)
+            previous = elapsed
+        durations.setdefault("total", []).append(previous)
+    return groups
+
+
+def summary(events: list) -> None:
+    for (module, event), durations in stage_durations(events).items():
+        count: int = len(durations["total"])
+        print(f"{module} {event or ''} ({count} events)")
+        print(f"  {'stage':<12}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES))
+        for stage, values in durations.items():
+            values.sort()
+            row: str = "".join(f"{percentile(values, p):>10.1f}" for p in PERCENTILES)
+            print(f"  {stage:<12}{row}")
+        print("")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="p50/p95/p99 per stage, in ms")
+    parser.add_argument("option", type=str, nargs="?", default="summary")
+    parser.add_argument("--file", type=str, default=None)
+    parser.add_argument("--module", type=str, default=None)
+    args = parser.parse_args()
+
+    path: str = args.file or trace_path() or runtime_file("trace.jsonl")
+
+    if args.option == "summary":
+        events: list = [
+            e for e in load_events(path) if args.module in (None, e.get("module"))
+        ]
+        if not events:
+            print(f"No traces found in {path}")
+            sys.exit(1)
+        summary(events)
+    elif args.option == "clear":
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
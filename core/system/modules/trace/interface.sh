@@ -0,0 +1,4 @@
+#!/usr/bin/env bash
+
+# Summarize the latency traces recorded with ZUI_TRACE=1
+python3 $(dirname $0)/core.py "$@"
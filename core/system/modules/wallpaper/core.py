@@ -0,0 +1,233 @@
+#!/usr/bin/python3
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+HOME: str = os.getenv("HOME")
+CONFIG_PATH: str = f"{HOME}/.zui/core/system/config.yml"
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+WALLPAPERS_PATH: str = f"{HOME}/.zui/current_theme/wallpapers"
+CURRENT_WALLPAPER: str = f"{WALLPAPERS_PATH}/current_wallpaper"
+LOCK_INTERFACE: str = f"{HOME}/.zui/core/system/modules/lock/interface.sh"
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui import cache_file
+from zui.tracing import Tracer
+
+tracer = Tracer("wallpaper")
+
+import yaml
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    # Without Pillow the wallpaper is scaled by feh at every start, as before
+    Image = None
+
+tracer.mark("imports")
+
+CACHE_DIR: str = "wallpapers"
+# source path -> [size, mtime_ns, sha256], so unchanged sources aren't hashed again
+INDEX_NAME: str = "index.json"
+IMAGE_EXTENSIONS: tuple = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+# Scaled images not applied for this long are evicted
+DEFAULT_CACHE_DAYS: int = 30
+JPEG_QUALITY: int = 95
+HASH_CHUNK: int = 1 << 20
+
+# " 0: +*eDP-1 1920/344x1080/193+0+0  eDP-1", in Xinerama order (the order feh uses)
+MONITOR_LINE = re.compile(r"^\s*\d+:\s+\S+\s+(\d+)/\d+x(\d+)/\d+\+\d+\+\d+\s+(\S+)$")
+
+
+def load_config() -> dict:
+    with open(CONFIG_PATH, "r") as stream:
+        try:
+            return yaml.safe_load(stream)
+        except yaml.YAMLError as exc:
+            print(exc)
+            return None
+
+
+def output_sizes() -> list:
+    """(output, (width, height)) for each active monitor, in Xinerama order"""
+    try:
+        result = subprocess.run(["xrandr", "--listmonitors"], capture_output=True, text=True)
+    except OSError:
+        return []
+    sizes: list = []
+    for line in result.stdout.splitlines():
+        match = MONITOR_LINE.match(line)
+        if match:
+            width, height, name = match.groups()
+            sizes.append((name, (int(width), int(height))))
+    return sizes
+
+
+def cache_dir() -> str:
+    path: str = cache_file(CACHE_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _load_index() -> dict:
+    try:
+        with open(f"{cache_dir()}/{INDEX_NAME}", "r") as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(index: dict) -> None:
+    path: str = f"{cache_dir()}/{INDEX_NAME}"
+    with open(f"{path}.tmp", "w") as stream:
+        json.dump(index, stream)
+    os.replace(f"{path}.tmp", path)
+
+
+def source_hash(path: str, index: dict) -> str:
+    """sha256 of the source image, read from the index while the file is unchanged"""
+    stat = os.stat(path)
+    entry: list = index.get(path)
+    if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+        return entry[2]
+    digest = hashlib.sha256()
+    with open(path, "rb") as stream:
+        for chunk in iter(lambda: stream.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    index[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    return index[path][2]
+
+
+def cached_path(digest: str, size: tuple) -> str:
+    width, height = size
+    return f"{cache_dir()}/{digest[:20]}-{width}x{height}.jpg"
+
+
+def render(source: str, size: tuple, target: str) -> str:
+    """Scale and crop like feh --bg-fill, written atomically to target.
+
+    draft() lets the JPEG decoder downscale by 1/2, 1/4 or 1/8 while decoding,
+    so a 6K source is never fully decoded for a 1080p output.
+    """
+    with Image.open(source) as image:
+        image.draft("RGB", size)
+        scaled = ImageOps.fit(image.convert("RGB"), size, Image.LANCZOS)
+    tmp_path: str = f"{target}.{os.getpid()}.tmp"
+    scaled.save(tmp_path, "JPEG", quality=JPEG_QUALITY, subsampling=0)
+    os.replace(tmp_path, target)
+    return target
+
+
+def prepare(sources: list, sizes: list) -> dict:
+    """Scaled image for each (source, size), rendering the missing ones in parallel.
+
+    Pillow releases the GIL while decoding and resampling, so threads scale
+    different outputs (or wallpapers) at the same time.
+    """
+    index: dict = _load_index()
+    jobs: dict = {}
+    for source in sources:
+        digest: str = source_hash(source, index)
+        for size in sizes:
+            jobs[(source, size)] = cached_path(digest, size)
+    _save_index(index)
+    tracer.mark("hash")
+
+    missing: list = [(key, path) for key, path in jobs.items() if not os.path.exists(path)]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(len(missing), os.cpu_count() or 1)) as executor:
+            list(executor.map(lambda job: render(job[0][0], job[0][1], job[1]), missing))
+        tracer.mark("render")
+    return jobs
+
+
+def apply(config: dict) -> None:
+    source: str = os.path.realpath(CURRENT_WALLPAPER)
+    sizes: list = output_sizes()
+    if Image is None or not sizes:
+        subprocess.run(["feh", "--bg-fill", CURRENT_WALLPAPER])
+        return
+
+    try:
+        jobs: dict = prepare([source], sorted({size for _name, size in sizes}))
+    except OSError as exc:
+        print(f"Error scaling wallpaper: {exc}")
+        subprocess.run(["feh", "--bg-fill", CURRENT_WALLPAPER])
+        return
+
+    # Exact size already: feh only has to place each image on its monitor
+    images: list = [jobs[(source, size)] for _name, size in sizes]
+    subprocess.run(["feh", "--bg-center"] + images)
+    tracer.mark("apply")
+    now: float = time.time()
+    for image in set(images):
+        # The modification time tells evict() when a size was last used
+        os.utime(image, (now, now))
+    evict(cache_days(config))
+
+
+def prerender() -> None:
+    """Scale every wallpaper of the current theme for the current outputs"""
+    if Image is None:
+        print("Pillow is not installed, wallpapers can't be pre-scaled")
+        sys.exit(1)
+    sources: list = sorted({
+        os.path.realpath(f"{WALLPAPERS_PATH}/{name}")
+        for name in os.listdir(WALLPAPERS_PATH)
+        if name.lower().endswith(IMAGE_EXTENSIONS) or name in ("default", "current_wallpaper")
+    })
+    sizes: list = sorted({size for _name, size in output_sizes()})
+    jobs: dict = prepare(sources, sizes)
+    print(f"{len(jobs)} scaled wallpapers ready for {len(sizes)} output sizes")
+
+
+def cache_days(config: dict) -> int:
+    return ((config or {}).get("wallpaper") or {}).get("cache_days", DEFAULT_CACHE_DAYS)
+
+
+def evict(max_days: int, keep_sizes: set = None) -> int:
+    """Remove scaled images unused for max_days, or for sizes outside keep_sizes"""
+    deadline: float = time.time() - max_days * 86400
+    removed: int = 0
+    for entry in os.scandir(cache_dir()):
+        if not entry.name.endswith(".jpg"):
+            continue
+        stale: bool = entry.stat().st_mtime < deadline
+        if keep_sizes is not None:
+            stale = stale or entry.name.rsplit("-", 1)[-1][:-len(".jpg")] not in keep_sizes
+        if stale:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    config: dict = load_config()
+    tracer.mark("config")
+    tracer.event = sys.argv[1] if len(sys.argv) > 1 else "apply"
+
+    if tracer.event == "apply":
+        apply(config)
+        # New wallpaper or new outputs: the lock screen background is rendered again
+        subprocess.Popen(
+            ["sh", LOCK_INTERFACE, "prepare"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    elif tracer.event == "prerender":
+        prerender()
+    elif tracer.event == "evict":
+        # Stale sizes: everything the current outputs don't use
+        current: set = {f"{width}x{height}" for _name, (width, height) in output_sizes()} or None
+        print(f"Removed {evict(cache_days(config), current)} scaled wallpapers")
+    else:
+        print(f"Unknown option: {tracer.event}")
+        sys.exit(1)
+    tracer.finish()
@@ -0,0 +1,4 @@
+#!/usr/bin/env bash
+
+# Wallpaper scaled once per output size and cached: apply, prerender or evict
+exec python3 $(dirname $0)/core.py "${1:-apply}"
@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+# Minimal zuid client, kept to the standard library so `python3 -S` starts fast.
+# Usage: client.py <module> <args...>
+# Exits with 75 (EX_TEMPFAIL) when the daemon can't serve the request, so the
+# calling interface.sh can fall back to running the module directly.
+
+import os
+import sys
+import json
+import socket
+
+EX_TEMPFAIL: int = 75
+SOCKET_PATH: str = f"{os.getenv('XDG_RUNTIME_DIR', '/tmp')}/zui/zuid.sock"
+
+if __name__ == "__main__":
+    request: bytes = json.dumps({"module": sys.argv[1], "args": sys.argv[2:]}).encode() + b"\n"
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(SOCKET_PATH)
+            sock.sendall(request)
+            response: dict = json.loads(sock.makefile("rb").readline())
+    except (OSError, ValueError, IndexError):
+        sys.exit(EX_TEMPFAIL)
+
+    if response.get("fallback"):
+        sys.exit(EX_TEMPFAIL)
+    sys.stdout.write(response.get("output", ""))
+    sys.exit(0 if response.get("ok") else 1)
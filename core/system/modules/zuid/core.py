@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+
+import os
+import io
+import sys
+import json
+import signal
+import socket
+import asyncio
+import threading
+import traceback
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+HOME: str = os.getenv("HOME")
+CONFIG_PATH: str = f"{HOME}/.zui/core/system/config.yml"
+ZUI_LIB_PATH: str = f"{HOME}/.zui/core/system/lib"
+MODULES_PATH: str = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+sys.path.insert(0, ZUI_LIB_PATH)
+from zui import runtime_file
+from zui.metrics import registry
+from zui.tracing import Tracer
+
+import yaml
+
+SOCKET_PATH: str = runtime_file("zuid.sock")
+
+# Python modules hosted by the daemon: name -> core.py
+PLUGINS: dict = {
+    "audio": f"{MODULES_PATH}/audio/general/core.py",
+    "backlight": f"{MODULES_PATH}/backlight/core.py",
+    "monitors": f"{MODULES_PATH}/monitors/core.py",
+    "power": f"{MODULES_PATH}/power/core.py",
+    "tiles": f"{MODULES_PATH}/tiles/core.py",
+}
+
+
+class ThreadStdout(io.TextIOBase):
+    """sys.stdout replacement sending each worker thread's prints to its own buffer"""
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self.local = threading.local()
+
+    def capture(self, buffer: io.StringIO = None) -> None:
+        self.local.buffer = buffer
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer or self.stream).write(text)
+
+    def flush(self) -> None:
+        if getattr(self.local, "buffer", None) is None:
+            self.stream.flush()
+
+
+class Plugin:
+    """A module's core.py loaded in-process. Requests to one plugin are serialized."""
+
+    def __init__(self, name: str, path: str) -> None:
+        self.name = name
+        spec = importlib.util.spec_from_file_location(f"zuid_{name}", path)
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+        if hasattr(self.module, "start_service"):
+            self.module.start_service()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+
+    def call(self, option: str, config: dict) -> dict:
+        buffer = io.StringIO()
+        sys.stdout.capture(buffer)
+        tracer = Tracer(self.name, option, from_process_start=False)
+        self.module.tracer = tracer
+        ok: bool = True
+        try:
+            self.module.handle(option, config)
+        except SystemExit as exc:
+            ok = exc.code in (None, 0)
+        except Exception:
+            ok = False
+            traceback.print_exc(file=buffer)
+        finally:
+            sys.stdout.capture(None)
+            tracer.finish(ok)
+        return {"ok": ok, "output": buffer.getvalue()}
+
+
+class Daemon:
+    def __init__(self) -> None:
+        self.plugins: dict = {}
+        self.config: dict = {}
+        self.config_mtime: float = None
+
+    def load_plugins(self) -> None:
+        for name, path in PLUGINS.items():
+            try:
+                self.plugins[name] = Plugin(name, path)
+                print(f"Loaded plugin {name}")
+            except Exception as exc:
+                # Requests for this module fall back to running it directly
+                print(f"Error loading plugin {name}: {exc}")
+
+    def get_config(self) -> dict:
+        """Config shared by every plugin, reloaded when config.yml changes"""
+        try:
+            mtime: float = os.stat(CONFIG_PATH).st_mtime
+        except OSError:
+            return self.config
+        if mtime != self.config_mtime:
+            with open(CONFIG_PATH, "r") as stream:
+                try:
+                    self.config = yaml.safe_load(stream) or {}
+                    self.config_mtime = mtime
+                except yaml.YAMLError as exc:
+                    print(exc)
+        return self.config
+
+    async def dispatch(self, request: dict) -> dict:
+        module: str = request.get("module")
+        args: list = request.get("args") or []
+        if module == "zuid":
+            return {"ok": True, "output": " ".join(self.plugins) + "\n"}
+        plugin: Plugin = self.plugins.get(module)
+        if plugin is None or not args:
+            return {"ok": False, "fallback": True}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(plugin.executor, plugin.call, args[0], self.get_config())
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            line: bytes = await reader.readline()
+            try:
+                response: dict = await self.dispatch(json.loads(line))
+            except (json.JSONDecodeError, AttributeError):
+                response = {"ok": False, "output": "Invalid request\n"}
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        if os.path.exists(SOCKET_PATH):
+            os.remove(SOCKET_PATH)
+        server = await asyncio.start_unix_server(self.handle_client, path=SOCKET_PATH)
+        os.chmod(SOCKET_PATH, 0o600)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        print(f"zuid listening on {SOCKET_PATH}")
+        async with server:
+            await stop.wait()
+        os.remove(SOCKET_PATH)
+
+
+def is_running() -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(SOCKET_PATH)
+            return True
+        except OSError:
+            return False
+
+
+if __name__ == "__main__":
+    if is_running():
+        print("zuid is already running")
+        sys.exit(0)
+
+    sys.stdout = ThreadStdout(sys.stdout)
+    daemon = Daemon()
+    daemon.get_config()
+    daemon.load_plugins()
+    try:
+        asyncio.run(daemon.serve())
+    finally:
+        # Requests are only counted in memory between the periodic flushes
+        registry.stop()
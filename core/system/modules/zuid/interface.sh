@@ -0,0 +1,14 @@
+#!/usr/bin/env bash
+
+# zuid: session daemon hosting the Python modules behind one Unix socket
+case "$1" in
+    status)
+        python3 -S $(dirname $0)/client.py zuid status || echo "zuid is not running"
+        ;;
+    stop)
+        pkill -f "zuid/core.py"
+        ;;
+    *)
+        exec python3 $(dirname $0)/core.py
+        ;;
+esac
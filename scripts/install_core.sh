@@ -81,34 +81,6 @@ install_core_components() {
     echo ""
 }
 
-# Configure network triggers
-configure_network_triggers() {
-    log_info "Configuring network triggers"
-    # Create temporary trigger file with user substitution
-    if ! run_with_progress "- Creating network trigger configuration" sh -c "cp '${BASE_PATH}/core/system/modules/network/trigger-check-network' '${TMP_PATH}/trigger-check-network' && sed -i 's/<user>/${USER}/g' '${TMP_PATH}/trigger-check-network'"; then
-        log_error "Failed to create network trigger configuration"
-        return 1
-    fi
-    
-    # Install network triggers
-    if ! run_with_progress "- Installing network up trigger" sudo ln -snf "${TMP_PATH}/trigger-check-network" /etc/network/if-up.d/trigger-check-network; then
-        log_error "Failed to install network up trigger"
-    fi
-
-    if ! run_with_progress "- Installing network down trigger" sudo ln -snf "${TMP_PATH}/trigger-check-network" /etc/network/if-down.d/trigger-check-network; then
-        log_error "Failed to install network down trigger"
-    fi
-
-    if ! run_with_progress "- Installing network post-down trigger" sudo ln -snf "${TMP_PATH}/trigger-check-network" /etc/network/if-post-down.d/trigger-check-network; then
-        log_error "Failed to install network post-down trigger"
-    fi
-
-    if ! run_with_progress "- Installing network pre-up trigger" sudo ln -snf "${TMP_PATH}/trigger-check-network" /etc/network/if-pre-up.d/trigger-check-network; then
-        log_error "Failed to install network pre-up trigger"
-    fi
-    echo ""
-}
-
 # Main installation function
 main() {
     echo -e "${CYAN}╭─────────────────────────────────────────────────────────╮${NC}"
@@ -119,7 +91,6 @@ main() {
 
     create_zui_structure
     install_core_components
-    configure_network_triggers
 
     echo ""
     log_info "ZUI installed to: ${ZUI_PATH}"
@@ -95,7 +95,7 @@ install_system_packages() {
         libxkbcommon-dev libxkbcommon-x11-dev libstartup-notification0-dev libxcb-xrm0 \
         libxcb-xrm-dev libxcb-shape0 libxcb-shape0-dev pavucontrol python3-pip \
         libhidapi-libusb0 libx11-dev libxinerama-dev libxss-dev libglib2.0-dev \
-        libgtk-3-dev libxdg-basedir-dev libnotify-dev libnotify-bin python3-pulsectl \
+        libgtk-3-dev libxdg-basedir-dev libnotify-dev libnotify-bin python3-pulsectl python3-pil python3-numpy \
         curl git wget rsync zsh; then
         log_error "Failed to install system packages"
         exit 1
@@ -213,14 +213,6 @@ install_polybar() {
 install_audio_tools() {
     log_info "Installing audio and media tools"
 
-    if [[ ! -d "${TMP_PATH}/zscroll" ]]; then
-        if run_with_progress "- Installing zscroll" bash -c "git clone https://github.com/noctuid/zscroll '${TMP_PATH}/zscroll' >> '${LOG_FILE}' 2>&1 && cd '${TMP_PATH}/zscroll' && sudo python3 setup.py install >> '${LOG_FILE}' 2>&1 && sudo chown -R ${USER}:${USER} '${TMP_PATH}/zscroll' >> '${LOG_FILE}' 2>&1"; then
-            track_software "zscroll (Text Scrolling Tool)"
-        else
-            log_warn "Failed to clone or install zscroll"
-        fi
-    fi
-    
     if run_with_progress "- Installing playerctl" sudo apt install -y playerctl; then
         track_software "playerctl (Media Player Controller)"
     else
@@ -44,8 +44,14 @@ copy_theme_files() {
     
     log_info "Setting up theme files"
     
+    # Add the theme to the store (each unique file kept once, themes are linked trees)
+    if [[ -f "${ZUI_PATH}/core/system/modules/themes/core.py" ]]; then
+        if ! run_with_progress "- Adding theme files to the theme store" python3 "${ZUI_PATH}/core/system/modules/themes/core.py" install "${theme}" "${BASE_PATH}/themes/${theme}"; then
+            log_error "Failed to add theme files to the theme store"
+            return 1
+        fi
     # Create theme directory and copy files
-    if ! run_with_progress "- Creating theme directory and copying files" bash -c "mkdir -p '${ZUI_PATH}/themes/${theme}' && rsync -am '${BASE_PATH}/themes/${theme}/' '${ZUI_PATH}/themes/${theme}/'"; then
+    elif ! run_with_progress "- Creating theme directory and copying files" bash -c "mkdir -p '${ZUI_PATH}/themes/${theme}' && rsync -am '${BASE_PATH}/themes/${theme}/' '${ZUI_PATH}/themes/${theme}/'"; then
         log_error "Failed to copy theme files"
         return 1
     fi
@@ -65,7 +71,7 @@ create_theme_symlinks() {
     
     # Link current wallpaper
     if [[ -f "${ZUI_PATH}/current_theme/wallpapers/default" ]]; then
-        if ! run_with_progress "- Creating wallpaper symlink" ln -sfn "${ZUI_PATH}/current_theme/wallpapers/default" "${ZUI_PATH}/current_theme/wallpapers/current_wallpaper"; then
+        if ! run_with_progress "- Creating wallpaper symlink" ln -sfn default "${ZUI_PATH}/current_theme/wallpapers/current_wallpaper"; then
             log_warn "Failed to create wallpaper symlink"
         fi
     elif [[ -d "${ZUI_PATH}/current_theme/wallpapers" ]]; then
@@ -73,6 +79,8 @@ create_theme_symlinks() {
         local wallpaper
         wallpaper=$(find "${ZUI_PATH}/current_theme/wallpapers" -type f \( -name "*.png" -o -name "*.jpg" -o -name "*.jpeg" \) | head -n1)
         if [[ -n "${wallpaper}" ]]; then
+            # Relative to the wallpapers directory, like the default link
+            wallpaper="${wallpaper#"${ZUI_PATH}/current_theme/wallpapers/"}"
             if ! run_with_progress "- Creating fallback wallpaper symlink" ln -sfn "${wallpaper}" "${ZUI_PATH}/current_theme/wallpapers/current_wallpaper"; then
                 log_warn "Failed to create fallback wallpaper symlink"
             fi
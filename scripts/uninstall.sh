@@ -268,7 +268,7 @@ remove_system_rules() {
     sudo udevadm control --reload-rules 2>/dev/null || \
         log_warn "Failed to reload udev rules"
     
-    # Remove network triggers
+    # Remove network triggers (installed by older versions)
     local triggers=(
         "/etc/network/if-up.d/trigger-check-network"
         "/etc/network/if-down.d/trigger-check-network"
@@ -0,0 +1,175 @@
+"""Modules run against a throwaway home whose ~/.zui/core is this checkout.
+
+The modules compute their paths (config, runtime and cache directories) when
+they're imported, so the environment is set up before any of them is loaded.
+"""
+
+import importlib
+import importlib.util
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+REPO_PATH: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES_PATH: str = f"{REPO_PATH}/core/system/modules"
+SANDBOX: str = tempfile.mkdtemp(prefix="zui-tests-")
+
+os.environ["HOME"] = f"{SANDBOX}/home"
+os.environ["XDG_RUNTIME_DIR"] = f"{SANDBOX}/runtime"
+os.environ["XDG_CACHE_HOME"] = f"{SANDBOX}/cache"
+os.makedirs(f"{SANDBOX}/home/.zui")
+os.symlink(f"{REPO_PATH}/core", f"{SANDBOX}/home/.zui/core")
+sys.path.insert(0, f"{REPO_PATH}/core/system/lib")
+
+
+@pytest.fixture
+def load_module():
+    """Import a module's core.py (e.g. "backlight/core.py") as a fresh module object"""
+
+    def load(relative_path: str):
+        name: str = "zui_test_" + relative_path.replace("/", "_").replace(".py", "")
+        spec = importlib.util.spec_from_file_location(name, f"{MODULES_PATH}/{relative_path}")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    return load
+
+
+def require(name: str):
+    """Import name or skip the test (libpulse missing fails with OSError, not ImportError)"""
+    try:
+        return importlib.import_module(name)
+    except (ImportError, OSError, ValueError) as exc:
+        pytest.skip(f"{name} unavailable: {exc}")
+
+
+@pytest.fixture
+def session_bus(monkeypatch):
+    """Address of a private dbus-daemon, also set as the session bus of the test"""
+    if shutil.which("dbus-daemon") is None:
+        pytest.skip("dbus-daemon not installed")
+    daemon = subprocess.Popen(
+        ["dbus-daemon", "--session", "--nofork", "--print-address"],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    address: str = daemon.stdout.readline().strip()
+    monkeypatch.setenv("DBUS_SESSION_BUS_ADDRESS", address)
+    yield address
+    daemon.terminate()
+    daemon.wait()
+
+
+def connect(address: str):
+    """A new connection to the bus at address, independent of the cached session bus"""
+    require("gi")
+    from gi.repository import Gio
+
+    return Gio.DBusConnection.new_for_address_sync(
+        address,
+        Gio.DBusConnectionFlags.AUTHENTICATION_CLIENT | Gio.DBusConnectionFlags.MESSAGE_BUS_CONNECTION,
+        None,
+        None,
+    )
+
+
+class FakeService:
+    """One D-Bus interface served at one or more paths, from its own thread and main loop.
+
+    handler(path, method, args) returns the reply as a GLib.Variant (or None),
+    every call is recorded in calls as (method, args).
+    """
+
+    def __init__(self, address: str, name: str, paths, xml: str, handler) -> None:
+        self.address = address
+        self.name = name
+        self.paths: list = [paths] if isinstance(paths, str) else list(paths)
+        self.xml = xml
+        self.handler = handler
+        self.calls: list = []
+        self.connection = None
+        self.loop = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "FakeService":
+        self.thread.start()
+        assert self.ready.wait(5), f"{self.name} didn't start"
+        return self
+
+    def _run(self) -> None:
+        from gi.repository import Gio, GLib
+
+        context = GLib.MainContext()
+        # Calls are dispatched to the thread-default context at registration
+        context.push_thread_default()
+        self.loop = GLib.MainLoop(context)
+        self.connection = connect(self.address)
+        node = Gio.DBusNodeInfo.new_for_xml(self.xml)
+        for path in self.paths:
+            self.connection.register_object(path, node.interfaces[0], self._on_call, None, None)
+        self.connection.call_sync(
+            "org.freedesktop.DBus",
+            "/org/freedesktop/DBus",
+            "org.freedesktop.DBus",
+            "RequestName",
+            GLib.Variant("(su)", (self.name, 0x4)),
+            GLib.VariantType("(u)"),
+            Gio.DBusCallFlags.NONE,
+            -1,
+            None,
+        )
+        self.ready.set()
+        self.loop.run()
+        # Dropping the connection releases the name, like a player quitting
+        self.connection.close_sync(None)
+        context.pop_thread_default()
+
+    def _on_call(self, connection, sender, path, interface, method, parameters, invocation) -> None:
+        args = parameters.unpack()
+        self.calls.append((method, args))
+        invocation.return_value(self.handler(path, method, args))
+
+    def emit(self, interface: str, signal: str, parameters, path: str = None) -> None:
+        self.connection.emit_signal(None, path or self.paths[0], interface, signal, parameters)
+        self.connection.flush_sync(None)
+
+    def stop(self) -> None:
+        if self.thread.is_alive():
+            self.loop.quit()
+            self.thread.join(5)
+
+
+@pytest.fixture
+def dbus_service(session_bus):
+    """Start fake services on the private bus: dbus_service(name, paths, xml, handler)"""
+    require("gi")
+    services: list = []
+
+    def start(name: str, paths, xml: str, handler) -> FakeService:
+        service = FakeService(session_bus, name, paths, xml, handler).start()
+        services.append(service)
+        return service
+
+    yield start
+    for service in services:
+        service.stop()
+
+
+def wait_for(predicate, timeout: float = 5.0) -> None:
+    """Run the default main context (where listeners get their signals) until predicate holds"""
+    from gi.repository import GLib
+
+    context = GLib.MainContext.default()
+    deadline: float = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        if not context.iteration(False):
+            time.sleep(0.01)
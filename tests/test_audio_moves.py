@@ -0,0 +1,121 @@
+import types
+
+import pytest
+
+from conftest import require
+
+SINKS: list = [types.SimpleNamespace(name=name, index=index) for index, name in enumerate(("speakers", "headset", "hdmi"), 1)]
+
+
+def stream(index: int, sink: int, name: str, binary: str = "") -> types.SimpleNamespace:
+    return types.SimpleNamespace(
+        index=index, sink=sink, proplist={"application.name": name, "application.process.binary": binary}
+    )
+
+
+STREAMS: list = [
+    stream(10, 1, "Firefox", "firefox"),
+    stream(11, 1, "Discord", "Discord"),
+    stream(12, 1, "OBS Studio", "obs"),
+    # Already on the new default
+    stream(13, 2, "mpv", "mpv"),
+    stream(14, 1, "Broken", "broken"),
+]
+CONFIG: dict = {"audio": {"app_rules": {"discord": "stay", "obs": "hdmi", "firefox": "unplugged-dac"}}}
+
+
+@pytest.fixture
+def audio(load_module):
+    require("pulsectl")
+    return load_module("audio/general/core.py")
+
+
+class PublicPulse:
+    """Only the public pulsectl API: one sink_input_move() call per stream"""
+
+    def __init__(self, audio) -> None:
+        self.audio = audio
+        self.moved: list = []
+
+    def sink_list(self) -> list:
+        return SINKS
+
+    def sink_input_list(self) -> list:
+        return STREAMS
+
+    def sink_input_move(self, index: int, sink: int) -> None:
+        if index == 14:
+            raise self.audio.pulsectl.PulseOperationFailed(index)
+        self.moved.append((index, sink))
+
+
+class PipelinedPulse(PublicPulse):
+    """The pulsectl internals: a context operations are queued on and an iterate() answering them"""
+
+    connected: bool = True
+
+    def __init__(self, audio, log: list) -> None:
+        super().__init__(audio)
+        self.log = log
+        self._ctx = types.SimpleNamespace(pending=[])
+
+    def _pulse_iterate(self) -> None:
+        self.log.append("iterate")
+        while self._ctx.pending:
+            callback, success = self._ctx.pending.pop(0)
+            callback(self._ctx, success, None)
+
+
+def fake_libpulse(log: list) -> types.SimpleNamespace:
+    class CallError(Exception):
+        pass
+
+    def move(ctx, index: int, sink: int, callback, userdata) -> None:
+        log.append(("send", index, sink))
+        if index == 99:
+            raise CallError("no such stream")
+        ctx.pending.append((callback, int(index != 14)))
+
+    pa = types.SimpleNamespace(CallError=CallError, context_move_sink_input_by_index=move)
+    return types.SimpleNamespace(pa=pa, PA_CONTEXT_SUCCESS_CB_T=lambda function: function)
+
+
+def test_follow_default_applies_app_rules(audio):
+    pulse = PublicPulse(audio)
+    audio.follow_default(pulse, CONFIG, "headset")
+    # Discord stays, OBS goes to its sink, Firefox's sink isn't there so it follows the default
+    assert pulse.moved == [(10, 2), (12, 3)]
+
+
+def test_public_api_without_the_internals(audio, capsys):
+    pulse = PublicPulse(audio)
+    assert audio.move_sink_inputs(pulse, [(10, 2), (14, 2)]) == {10: True, 14: False}
+    assert pulse.moved == [(10, 2)]
+    audio.move_sink_inputs(pulse, [(12, 3)])
+    # Said once, not on every sink change
+    assert capsys.readouterr().out.count("moving streams one at a time") == 1
+
+
+def test_moves_are_pipelined(audio, monkeypatch):
+    log: list = []
+    monkeypatch.setattr(audio, "libpulse", fake_libpulse(log))
+    pulse = PipelinedPulse(audio, log)
+    results: dict = audio.move_sink_inputs(pulse, [(10, 2), (14, 2), (99, 2)])
+    assert results == {10: True, 14: False, 99: False}
+    # Every move is sent before waiting for the first reply
+    assert log == [("send", 10, 2), ("send", 14, 2), ("send", 99, 2), "iterate"]
+    assert pulse.moved == []
+
+
+def test_changed_internals_fall_back(audio, monkeypatch):
+    log: list = []
+    libpulse = fake_libpulse(log)
+    del libpulse.pa.CallError
+    monkeypatch.setattr(audio, "libpulse", libpulse)
+    pulse = PipelinedPulse(audio, log)
+    assert audio.move_sink_inputs(pulse, [(10, 2)]) == {10: True}
+    assert log == []
+    assert pulse.moved == [(10, 2)]
+
+    monkeypatch.setattr(audio, "libpulse", None)
+    assert audio.move_sink_inputs(pulse, [(12, 3)]) == {12: True}
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def backlight(load_module):
+    return load_module("backlight/core.py")
+
+
+def make_device(root, name: str, max_brightness: int, brightness: int, kind: str = "raw", status: str = None) -> str:
+    """A /sys/class/backlight/<name> lookalike made of regular files"""
+    path = root / name
+    path.mkdir(parents=True)
+    (path / "max_brightness").write_text(f"{max_brightness}\n")
+    (path / "brightness").write_text(f"{brightness}\n")
+    (path / "type").write_text(f"{kind}\n")
+    if status is not None:
+        (path / "device").mkdir()
+        (path / "device" / "status").write_text(f"{status}\n")
+    return str(path)
+
+
+def test_find_device_prefers_the_connected_panel(backlight, tmp_path):
+    make_device(tmp_path, "acpi_video0", 100, 50, kind="firmware")
+    make_device(tmp_path, "amdgpu_bl0", 255, 128, kind="raw", status="connected")
+    make_device(tmp_path, "intel_backlight", 1000, 500, kind="raw", status="disconnected")
+    assert backlight.find_device(str(tmp_path)) == f"{tmp_path}/amdgpu_bl0"
+
+
+def test_find_device_falls_back_to_type_priority(backlight, tmp_path):
+    make_device(tmp_path, "acpi_video0", 100, 50, kind="firmware")
+    make_device(tmp_path, "intel_backlight", 1000, 500, kind="raw")
+    make_device(tmp_path, "broken", 0, 0, kind="firmware")
+    assert backlight.find_device(str(tmp_path)) == f"{tmp_path}/acpi_video0"
+
+
+def test_find_device_honours_the_configured_device(backlight, tmp_path):
+    make_device(tmp_path, "acpi_video0", 100, 50, kind="firmware")
+    make_device(tmp_path, "intel_backlight", 1000, 500, kind="raw")
+    assert backlight.find_device(str(tmp_path), preferred="intel_backlight") == f"{tmp_path}/intel_backlight"
+    assert backlight.find_device(str(tmp_path / "missing")) is None
+
+
+def test_shorter_value_replaces_the_whole_file(backlight, tmp_path):
+    device = backlight.Backlight(make_device(tmp_path, "intel_backlight", 255, 160))
+    device.write_raw(99)
+    assert (tmp_path / "intel_backlight" / "brightness").read_text() == "99"
+    assert device.read_raw() == 99
+
+
+def test_curve_round_trips(backlight):
+    for raw in (1, 10, 128, 255):
+        assert backlight.to_raw(backlight.to_level(raw, 255), 255) == raw
+
+
+def test_step_animates_to_the_next_level(backlight, tmp_path):
+    device = backlight.Backlight(make_device(tmp_path, "intel_backlight", 1000, 100))
+    start = backlight.to_level(100, 1000)
+    target = device.step(1)
+    device.wait()
+    assert target == pytest.approx(start + backlight.LEVEL_STEP)
+    assert device.read_raw() == backlight.to_raw(target, 1000)
+
+    # Taps while the animation runs add up
+    device.step(-1)
+    target = device.step(-1)
+    device.wait()
+    assert target < start
+    assert device.read_raw() == backlight.to_raw(target, 1000)
+
+
+def test_level_stays_above_the_minimum(backlight, tmp_path):
+    device = backlight.Backlight(make_device(tmp_path, "intel_backlight", 1000, 60))
+    device.set_level(0.0)
+    device.wait()
+    assert device.read_raw() == backlight.to_raw(device.min_level, 1000)
+
+
+def test_cap_lowers_and_uncap_restores(backlight, tmp_path, monkeypatch):
+    path = make_device(tmp_path, "intel_backlight", 1000, 800)
+    monkeypatch.setattr(backlight, "find_device", lambda root=None, preferred=None: path)
+    with open(backlight.runtime_file(backlight.CAP_STATE), "w") as stream:
+        stream.write("0.5")
+    try:
+        backlight.handle("cap", {})
+        assert backlight.devices[path].read_raw() == backlight.to_raw(0.5, 1000)
+
+        os.remove(backlight.runtime_file(backlight.CAP_STATE))
+        backlight.handle("uncap", {})
+        assert backlight.devices[path].read_raw() == 800
+    finally:
+        for name in (backlight.CAP_STATE, backlight.RESTORE_STATE):
+            if os.path.exists(backlight.runtime_file(name)):
+                os.remove(backlight.runtime_file(name))
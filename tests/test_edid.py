@@ -0,0 +1,287 @@
+import pytest
+
+from zui import edid
+
+
+def timing(width: int, height: int, h_blank: int, v_blank: int, clock_hz: int, width_mm: int, height_mm: int) -> bytes:
+    """A detailed timing descriptor"""
+    descriptor = bytearray(18)
+    descriptor[0:2] = (clock_hz // 10000).to_bytes(2, "little")
+    descriptor[2], descriptor[3] = width & 0xFF, h_blank & 0xFF
+    descriptor[4] = (width >> 8) << 4 | h_blank >> 8
+    descriptor[5], descriptor[6] = height & 0xFF, v_blank & 0xFF
+    descriptor[7] = (height >> 8) << 4 | v_blank >> 8
+    descriptor[12], descriptor[13] = width_mm & 0xFF, height_mm & 0xFF
+    descriptor[14] = (width_mm >> 8) << 4 | height_mm >> 8
+    return bytes(descriptor)
+
+
+def text(tag: int, value: str) -> bytes:
+    """A display descriptor holding text, ended by a line feed and padded with spaces"""
+    descriptor = bytearray(18)
+    descriptor[3] = tag
+    descriptor[5:18] = (value + "\n").encode().ljust(13, b" ")[:13]
+    return bytes(descriptor)
+
+
+def checksum(block: bytearray) -> bytes:
+    block[127] = -sum(block[:127]) % 256
+    return bytes(block)
+
+
+def base_block(vendor: str, product: int, descriptors: list, size_cm: tuple = (60, 34), serial: int = 0,
+               revision: int = 4, features: int = 0, extensions: int = 0) -> bytes:
+    block = bytearray(128)
+    block[:8] = edid.HEADER
+    block[8:10] = sum((ord(letter) - 64) << shift for letter, shift in zip(vendor, (10, 5, 0), strict=True)).to_bytes(2, "big")
+    block[10:12] = product.to_bytes(2, "little")
+    block[12:16] = serial.to_bytes(4, "little")
+    block[18], block[19] = 1, revision
+    block[20] = 0xA5
+    block[21], block[22] = size_cm
+    block[24] = features
+    for offset, descriptor in zip(edid.DESCRIPTOR_OFFSETS[:len(descriptors)], descriptors, strict=True):
+        block[offset:offset + 18] = descriptor
+    block[126] = extensions
+    return checksum(block)
+
+
+DELL: bytes = base_block(
+    "DEL",
+    0xA0F5,
+    [
+        timing(3840, 2160, 160, 62, 533250000, 597, 336),
+        text(edid.TAG_NAME, "DELL U2720Q"),
+        text(edid.TAG_SERIAL, "8GVXJ23"),
+    ],
+)
+PANEL: bytes = base_block("BOE", 0x0A1B, [timing(2560, 1600, 160, 46, 268500000, 286, 179)], (29, 18), serial=0x1234)
+
+
+def hexdump(data: bytes) -> str:
+    return "".join(f"\t\t{data[offset:offset + 16].hex()}\n" for offset in range(0, len(data), 16))
+
+
+# xrandr --query --prop, trimmed to a few modes
+XRANDR_PROP: str = (
+    "Screen 0: minimum 320 x 200, current 6400 x 2160, maximum 16384 x 16384\n"
+    "eDP-1 connected 2560x1600+3840+0 (normal left inverted right x axis y axis) 286mm x 179mm\n"
+    "\tEDID: \n"
+    f"{hexdump(PANEL)}"
+    "\tscaling mode: Full aspect \n"
+    "\t\tsupported: Full, Center, Full aspect\n"
+    "\tBroadcast RGB: Automatic \n"
+    "\t\tsupported: Automatic, Full, Limited 16:235\n"
+    "\tnon-desktop: 0 \n"
+    "\t\trange: (0, 1)\n"
+    "   2560x1600     60.00*+  48.00  \n"
+    "   1920x1200     60.00  \n"
+    "DP-1 connected primary 3840x2160+0+0 (normal left inverted right x axis y axis) 597mm x 336mm\n"
+    "\tEDID: \n"
+    f"{hexdump(DELL)}"
+    "\tHDCP Content Type: HDCP Type0 \n"
+    "\t\tsupported: HDCP Type0, HDCP Type1\n"
+    "\tmax bpc: 12 \n"
+    "\t\trange: (6, 16)\n"
+    "\tCONNECTOR_ID: 95 \n"
+    "\t\tsupported: 95\n"
+    "   3840x2160     60.00*+  30.00  \n"
+    "   1920x1080     60.00    59.94  \n"
+    "HDMI-1 disconnected (normal left inverted right x axis y axis)\n"
+    "\tEDID: \n"
+    "\tmax bpc: 12 \n"
+    "\t\trange: (8, 12)\n"
+    "DP-2 disconnected (normal left inverted right x axis y axis)\n"
+    "\tnon-desktop: 0 \n"
+    "\t\trange: (0, 1)\n"
+)
+
+
+def test_randr_edids_reads_each_output():
+    edids: dict = edid.randr_edids(XRANDR_PROP)
+    assert edids == {"eDP-1": PANEL, "DP-1": DELL}
+
+
+def test_randr_edids_at_the_end_of_the_output():
+    # The last output's EDID runs until the end of the text
+    query: str = f"DP-1 connected 3840x2160+0+0 597mm x 336mm\n\tEDID: \n{hexdump(DELL)}"
+    assert edid.randr_edids(query) == {"DP-1": DELL}
+    assert edid.randr_edids("") == {}
+
+
+def test_parse_identification():
+    info: dict = edid.parse(DELL)
+    assert info["vendor"] == "DEL"
+    assert info["product"] == 0xA0F5
+    assert info["model"] == "DELL U2720Q"
+    assert info["serial"] == "8GVXJ23"
+    assert info["version"] == "1.4"
+    assert info["digital"] is True
+    assert edid.display_name(info) == "DELL U2720Q"
+
+
+def test_parse_preferred_mode_and_size():
+    info: dict = edid.parse(DELL)
+    assert info["preferred"]["resolution"] == "3840x2160"
+    assert info["preferred"]["rate"] == pytest.approx(60.0, abs=0.01)
+    # The timing's millimeters win over the centimeters of the header
+    assert info["size_mm"] == [597, 336]
+    assert edid.diagonal_inches(info) == pytest.approx(27.0, abs=0.1)
+    assert edid.dpi(info, "3840x2160") == pytest.approx(163.4, abs=0.1)
+
+
+def test_parse_without_name_or_serial_descriptors():
+    info: dict = edid.parse(PANEL)
+    assert info["model"] is None
+    # The header's numeric serial stands in for the descriptor
+    assert info["serial"] == 0x1234
+    assert edid.display_name(info) == "BOE 0A1B"
+
+
+def test_name_ends_at_the_line_feed():
+    data: bytes = base_block("SAM", 1, [timing(1920, 1080, 280, 45, 148500000, 531, 299), text(edid.TAG_NAME, "C27F390")])
+    assert edid.parse(data)["model"] == "C27F390"
+
+
+def test_parse_rejects_a_bad_checksum():
+    data = bytearray(DELL)
+    data[127] = (data[127] + 1) % 256
+    with pytest.raises(edid.EdidError, match="checksum"):
+        edid.parse(bytes(data))
+
+
+def test_parse_rejects_what_is_not_an_edid():
+    with pytest.raises(edid.EdidError):
+        edid.parse(b"\0" * 128)
+    with pytest.raises(edid.EdidError):
+        edid.parse(DELL[:100])
+
+
+def test_decode_all_skips_invalid_edids():
+    decoded: dict = edid.decode_all({"DP-1": DELL, "HDMI-1": b"\xff" * 128})
+    assert list(decoded) == ["DP-1"]
+    assert decoded["DP-1"]["model"] == "DELL U2720Q"
+
+
+def limits(v_min: int, v_max: int, h_min: int = 30, h_max: int = 160, clock_mhz: int = 600, flags: int = 0) -> bytes:
+    """A display range limits descriptor"""
+    descriptor = bytearray(18)
+    descriptor[3], descriptor[4] = edid.TAG_RANGE_LIMITS, flags
+    descriptor[5:10] = bytes([v_min, v_max, h_min, h_max, clock_mhz // 10])
+    return bytes(descriptor)
+
+
+def cta_block(*data_blocks: bytes) -> bytes:
+    """A CTA-861 extension holding data_blocks (each with its tag/length header)"""
+    block = bytearray(128)
+    block[0], block[1] = edid.EXTENSION_CTA, 3
+    payload: bytes = b"".join(data_blocks)
+    block[4:4 + len(payload)] = payload
+    block[2] = 4 + len(payload)
+    return checksum(block)
+
+
+def data_block(tag: int, payload: bytes) -> bytes:
+    return bytes([tag << 5 | len(payload)]) + payload
+
+
+def hdr_block(eotfs: int) -> bytes:
+    return data_block(edid.CTA_EXTENDED_BLOCK, bytes([edid.CTA_HDR_STATIC_METADATA, eotfs, 0x01]))
+
+
+def hf_vsdb(v_min: int, v_max: int) -> bytes:
+    """HDMI Forum vendor block with its VRR range in bytes 9 and 10 of the payload"""
+    payload = bytearray(11)
+    payload[0:3] = edid.OUI_HDMI_FORUM.to_bytes(3, "little")
+    payload[3], payload[4] = 1, 0x78
+    payload[9] = (v_max >> 8) << 6 | v_min
+    payload[10] = v_max & 0xFF
+    return data_block(edid.CTA_VENDOR_BLOCK, bytes(payload))
+
+
+def amd_vsdb(v_min: int, v_max: int, freesync: bool = True) -> bytes:
+    payload = bytearray(8)
+    payload[0:3] = edid.OUI_AMD.to_bytes(3, "little")
+    payload[3], payload[4] = 1, int(freesync)
+    payload[5], payload[6] = v_min, v_max
+    return data_block(edid.CTA_VENDOR_BLOCK, bytes(payload))
+
+
+MODE: bytes = timing(2560, 1440, 160, 41, 241500000, 597, 336)
+
+
+def monitor(*extensions: bytes, descriptors: list = (), revision: int = 4, continuous: bool = False) -> bytes:
+    base: bytes = base_block(
+        "AUS",
+        0x27A1,
+        [MODE, text(edid.TAG_NAME, "VG27AQ"), *descriptors],
+        revision=revision,
+        features=0x01 if continuous else 0,
+        extensions=len(extensions),
+    )
+    return base + b"".join(extensions)
+
+
+def test_range_limits():
+    info: dict = edid.parse(monitor(descriptors=[limits(48, 165, 30, 250, 600)]))
+    assert info["range_limits"] == {"vertical_hz": [48, 165], "horizontal_khz": [30, 250], "max_pixel_clock_mhz": 600}
+
+
+def test_range_limits_offsets():
+    # EDID 1.4: the maximum vertical rate is 255 Hz more with bit 1, the minimum too with bits 0 and 1
+    descriptor: bytes = limits(48, 5, flags=0x02)
+    assert edid.range_limits(descriptor, 4)["vertical_hz"] == [48, 260]
+    assert edid.range_limits(limits(5, 5, flags=0x03), 4)["vertical_hz"] == [260, 260]
+    assert edid.range_limits(limits(10, 20, 5, 5, flags=0x0C), 4)["horizontal_khz"] == [260, 260]
+    # The flags byte means nothing before 1.4
+    assert edid.range_limits(descriptor, 3)["vertical_hz"] == [48, 5]
+
+
+def test_hdr_transfer_functions():
+    # Bit 0 is SDR, then traditional HDR gamma, PQ (SMPTE ST 2084) and HLG
+    assert edid.parse(monitor(cta_block(hdr_block(0x0D))))["hdr"] == ["pq", "hlg"]
+    assert edid.parse(monitor(cta_block(hdr_block(0x03))))["hdr"] == ["hdr-gamma"]
+    assert edid.parse(monitor(cta_block(hdr_block(0x01))))["hdr"] == []
+    assert edid.parse(monitor())["hdr"] == []
+
+
+def test_hdmi_forum_vrr():
+    info: dict = edid.parse(monitor(cta_block(hdr_block(0x05), hf_vsdb(48, 144))))
+    assert info["vrr_hz"] == [48, 144]
+    assert info["hdr"] == ["pq"]
+    # VRRmax takes two bits from the VRRmin byte above 255 Hz
+    assert edid.parse(monitor(cta_block(hf_vsdb(48, 300))))["vrr_hz"] == [48, 300]
+    # A zero VRRmin means no VRR
+    assert edid.parse(monitor(cta_block(hf_vsdb(0, 144))))["vrr_hz"] is None
+
+
+def test_freesync_over_hdmi():
+    assert edid.parse(monitor(cta_block(amd_vsdb(40, 75))))["vrr_hz"] == [40, 75]
+    assert edid.parse(monitor(cta_block(amd_vsdb(40, 75, freesync=False))))["vrr_hz"] is None
+
+
+def test_adaptive_sync_from_continuous_range_limits():
+    wide: bytes = monitor(descriptors=[limits(48, 165)], continuous=True)
+    assert edid.parse(wide)["continuous_frequency"] is True
+    assert edid.parse(wide)["vrr_hz"] == [48, 165]
+    # A fixed-rate monitor with its usual 56-76 Hz tolerance isn't VRR without the flag
+    assert edid.parse(monitor(descriptors=[limits(56, 76)]))["vrr_hz"] is None
+    assert edid.parse(monitor(descriptors=[limits(59, 61)], continuous=True))["vrr_hz"] is None
+    # Nor before EDID 1.4, where the bit meant something else
+    assert edid.parse(monitor(descriptors=[limits(48, 165)], revision=3, continuous=True))["vrr_hz"] is None
+
+
+def test_cta_range_wins_over_range_limits():
+    data: bytes = monitor(cta_block(hf_vsdb(40, 120)), descriptors=[limits(48, 165)], continuous=True)
+    assert edid.parse(data)["vrr_hz"] == [40, 120]
+
+
+def test_broken_extensions_are_ignored():
+    block = bytearray(cta_block(hf_vsdb(48, 144)))
+    block[127] ^= 0xFF
+    assert edid.parse(monitor(bytes(block)))["vrr_hz"] is None
+    # An extension count larger than the data only reads the blocks that are there
+    data = bytearray(monitor(cta_block(hf_vsdb(48, 144))))
+    data[126] = 3
+    data[127] = -sum(data[:127]) % 256
+    assert edid.parse(bytes(data))["vrr_hz"] == [48, 144]
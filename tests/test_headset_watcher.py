@@ -0,0 +1,179 @@
+import types
+
+import pytest
+
+from conftest import require
+
+CARD: str = "bluez_card.00_1B_66_AA_BB_CC"
+CONFIG: dict = {"audio": {"bluetooth_headsets": {CARD: "a2dp"}}}
+
+
+@pytest.fixture
+def audio(load_module, monkeypatch):
+    require("pulsectl")
+    module = load_module("audio/general/core.py")
+    monkeypatch.setattr(module, "load_config", lambda path: CONFIG)
+    module.notifications = []
+    monkeypatch.setattr(module, "send_notification", lambda config, sink_name=None: module.notifications.append(sink_name))
+    return module
+
+
+class Event:
+    def __init__(self, facility: str, t: str, index: int) -> None:
+        self.facility = facility
+        self.t = t
+        self.index = index
+
+
+class FakePulse:
+    """Cards and sinks of a sound server, changed by script steps between event_listen calls.
+
+    Each step runs when the watcher waits for events and queues the events it
+    causes, all of them delivered in one batch like a busy server does. Profile
+    switches complete in the next step, the old profile's sink going first.
+    """
+
+    def __init__(self, pulsectl, script: list) -> None:
+        self.pulsectl = pulsectl
+        self.script = script
+        self.cards: dict = {}
+        self.sinks: dict = {}
+        self.queue: list = []
+        self.profile_requests: list = []
+        self.default: str = None
+        self.next_index: int = 100
+
+    def event_mask_set(self, *masks) -> None:
+        pass
+
+    def event_callback_set(self, callback) -> None:
+        self.callback = callback
+
+    def event_listen(self) -> None:
+        if not self.script:
+            # Ends HeadsetWatcher.watch()
+            raise self.pulsectl.PulseDisconnected("script done")
+        self.script.pop(0)(self)
+        events, self.queue = self.queue, []
+        # Like pulsectl, every event of the iteration reaches the callback
+        for event in events:
+            try:
+                self.callback(event)
+            except self.pulsectl.PulseLoopStop:
+                pass
+
+    def emit(self, facility: str, t: str, index: int) -> None:
+        self.queue.append(Event(facility, t, index))
+
+    def card_list(self) -> list:
+        return list(self.cards.values())
+
+    def card_info(self, index: int):
+        if index not in self.cards:
+            raise self.pulsectl.PulseIndexError(index)
+        return self.cards[index]
+
+    def sink_list(self) -> list:
+        return list(self.sinks.values())
+
+    def sink_info(self, index: int):
+        if index not in self.sinks:
+            raise self.pulsectl.PulseIndexError(index)
+        return self.sinks[index]
+
+    def sink_input_list(self) -> list:
+        return []
+
+    def sink_default_set(self, name: str) -> None:
+        self.default = name
+
+    def card_profile_set(self, card, profile: str) -> None:
+        self.profile_requests.append(profile)
+
+    # Script steps
+
+    def add_card(self, index: int, profile: str) -> None:
+        profiles: list = [
+            types.SimpleNamespace(name=name, priority=priority, available=1)
+            for name, priority in (("off", 0), ("headset-head-unit", 30), ("a2dp-sink-sbc", 10), ("a2dp-sink-aac", 20))
+        ]
+        self.cards[index] = types.SimpleNamespace(
+            index=index, name=CARD, profile_list=profiles, profile_active=types.SimpleNamespace(name=profile)
+        )
+        self.emit("card", "new", index)
+        if profile != "off":
+            self.add_sink(index, profile)
+
+    def add_sink(self, card: int, profile: str) -> None:
+        self.next_index += 1
+        self.sinks[self.next_index] = types.SimpleNamespace(
+            index=self.next_index, name=f"bluez_output.00_1B_66_AA_BB_CC.{profile}", card=card
+        )
+        self.emit("sink", "new", self.next_index)
+
+    def finish_switch(self, card: int) -> None:
+        profile: str = self.profile_requests.pop(0)
+        for index in [index for index, sink in self.sinks.items() if sink.card == card]:
+            del self.sinks[index]
+            self.emit("sink", "remove", index)
+        self.cards[card].profile_active = types.SimpleNamespace(name=profile)
+        self.emit("card", "change", card)
+        self.add_sink(card, profile)
+
+
+def watch(audio, pulse: FakePulse):
+    watcher = audio.HeadsetWatcher(connect=lambda name: pulse)
+    with pytest.raises(audio.pulsectl.PulseDisconnected):
+        watcher.watch(pulse)
+    return watcher
+
+
+def test_profile_switch_then_default(audio):
+    pulse = FakePulse(audio.pulsectl, [lambda p: p.add_card(7, "off"), lambda p: p.finish_switch(7)])
+    watcher = watch(audio, pulse)
+    # "a2dp" is the best available A2DP codec
+    assert pulse.cards[7].profile_active.name == "a2dp-sink-aac"
+    assert pulse.default == "bluez_output.00_1B_66_AA_BB_CC.a2dp-sink-aac"
+    assert audio.notifications == [pulse.default]
+    assert watcher.pending == {}
+
+
+def test_sink_of_the_wrong_profile_is_ignored(audio):
+    pulse = FakePulse(audio.pulsectl, [lambda p: p.add_card(7, "headset-head-unit")])
+    watcher = audio.HeadsetWatcher(connect=lambda name: pulse)
+    with pytest.raises(audio.pulsectl.PulseDisconnected):
+        watcher.watch(pulse)
+    # The headset profile's sink showed up and was left alone
+    assert pulse.profile_requests == ["a2dp-sink-aac"]
+    assert pulse.default is None
+    assert 7 in watcher.pending
+
+    pulse.script = [lambda p: p.finish_switch(7)]
+    with pytest.raises(audio.pulsectl.PulseDisconnected):
+        watcher.watch(pulse)
+    assert pulse.default == "bluez_output.00_1B_66_AA_BB_CC.a2dp-sink-aac"
+    assert watcher.pending == {}
+
+
+def test_card_already_in_its_profile(audio):
+    pulse = FakePulse(audio.pulsectl, [])
+    pulse.add_card(7, "a2dp-sink-aac")
+    pulse.queue = []
+    watch(audio, pulse)
+    # Connected before the watcher started: picked up from card_list()
+    assert pulse.profile_requests == []
+    assert pulse.default == "bluez_output.00_1B_66_AA_BB_CC.a2dp-sink-aac"
+
+
+def test_card_removed_while_pending(audio):
+    def disconnect(pulse: FakePulse) -> None:
+        # The new sink is reported, but the card is gone before it's looked at
+        pulse.add_sink(7, "a2dp-sink-aac")
+        del pulse.cards[7]
+        pulse.emit("card", "remove", 7)
+
+    pulse = FakePulse(audio.pulsectl, [lambda p: p.add_card(7, "off"), disconnect])
+    watcher = watch(audio, pulse)
+    assert pulse.default is None
+    assert audio.notifications == []
+    assert watcher.pending == {}
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+SXHKDRC: str = os.path.join(os.path.dirname(__file__), "..", "core", "sxhkd", "sxhkdrc")
+
+
+@pytest.fixture
+def keybinds(load_module, monkeypatch, tmp_path):
+    import zui
+
+    monkeypatch.setattr(zui, "CACHE_PATH", str(tmp_path / "cache"))
+    return load_module("keybinds/core.py")
+
+
+def test_expand(keybinds):
+    assert keybinds.expand("super + {_,shift + }w") == ["super + w", "super + shift + w"]
+    assert keybinds.expand("bspc node -{f,s} {west,east}") == [
+        "bspc node -f west",
+        "bspc node -f east",
+        "bspc node -s west",
+        "bspc node -s east",
+    ]
+    assert keybinds.expand("super + ctrl + {1-9}") == [f"super + ctrl + {n}" for n in range(1, 10)]
+    assert keybinds.expand("bspc desktop -f {a-c}") == ["bspc desktop -f a", "bspc desktop -f b", "bspc desktop -f c"]
+
+
+def test_chords_are_paired_with_their_commands(keybinds, tmp_path):
+    sxhkdrc = tmp_path / "sxhkdrc"
+    sxhkdrc.write_text(
+        "# bspwm hotkeys\n"
+        "# Focus or send to the given desktop\n"
+        "super + {_,shift + }{1-3}\n"
+        "\tbspc {desktop -f,node -d} {1-3}\n"
+        "# Terminal\n"
+        "super + {Return,t}\n"
+        "\tgnome-terminal \\\n"
+        "\t  --maximize\n"
+    )
+    parsed: list = keybinds.parse(str(sxhkdrc))
+    assert [(chord, command) for _section, _description, chord, command in parsed] == [
+        ("super + 1", "bspc desktop -f 1"),
+        ("super + 2", "bspc desktop -f 2"),
+        ("super + 3", "bspc desktop -f 3"),
+        ("super + shift + 1", "bspc node -d 1"),
+        ("super + shift + 2", "bspc node -d 2"),
+        ("super + shift + 3", "bspc node -d 3"),
+        # One command for every chord
+        ("super + Return", "gnome-terminal --maximize"),
+        ("super + t", "gnome-terminal --maximize"),
+    ]
+    assert {section for section, *_rest in parsed} == {"Window Management"}
+
+
+def test_shipped_sxhkdrc_compiles(keybinds, capsys):
+    assert keybinds.check(SXHKDRC)
+    menu: str = keybinds.compile_menu(SXHKDRC)
+    assert menu.startswith("<b>Application Keybinds</b>\n")
+    assert "<b>Window Management</b>" in menu
+    assert f"{'super + Return':<{keybinds.KEYBIND_WIDTH}} -> Terminal" in menu
+    assert f"{'super + ctrl + 9':<{keybinds.KEYBIND_WIDTH}} -> " in menu
+    assert "{" not in menu
+
+
+def test_cache_follows_the_sxhkdrc_mtime(keybinds, tmp_path):
+    sxhkdrc = tmp_path / "sxhkdrc"
+    sxhkdrc.write_text("# Terminal\nsuper + Return\n\tgnome-terminal\n")
+    os.utime(sxhkdrc, ns=(1_000_000_000, 1_000_000_000))
+    assert "-> Terminal" in keybinds.compile_menu(str(sxhkdrc))
+
+    # Same mtime: the cache is read, not the file
+    cache_path: str = keybinds.cache_file(keybinds.CACHE_NAME)
+    with open(cache_path, "a") as stream:
+        stream.write("cached\n")
+    assert keybinds.compile_menu(str(sxhkdrc)).endswith("cached\n")
+
+    sxhkdrc.write_text("# Browser\nsuper + b\n\tbrave-browser\n")
+    # Newer than the cache even on filesystems with coarse timestamps
+    newer: int = os.stat(cache_path).st_mtime_ns + 1_000_000_000
+    os.utime(sxhkdrc, ns=(newer, newer))
+    assert keybinds.compile_menu(str(sxhkdrc)) == keybinds.render(keybinds.parse(str(sxhkdrc)))
+    assert "-> Browser" in keybinds.compile_menu(str(sxhkdrc))
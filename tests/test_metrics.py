@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import REPO_PATH
+
+
+@pytest.fixture
+def metrics(monkeypatch, tmp_path):
+    import zui
+    import zui.metrics
+
+    monkeypatch.setattr(zui, "RUNTIME_PATH", str(tmp_path))
+    return zui.metrics
+
+
+@pytest.fixture
+def registry(metrics):
+    registry = metrics.Registry()
+    yield registry
+    registry.stopped.set()
+
+
+def test_events_are_kept_in_memory_until_flushed(metrics, registry, monkeypatch, tmp_path):
+    import zui.tracing
+
+    monkeypatch.setattr(zui.tracing, "registry", registry)
+    for ok in (True, False):
+        zui.tracing.Tracer("backlight", "up", from_process_start=False).finish(ok)
+    assert not os.path.exists(tmp_path / metrics.STATE_NAME)
+
+    registry.flush()
+    # A second process flushing its own numbers
+    other = metrics.Registry()
+    other.record_event("backlight", "up", 0.2)
+    other.stop()
+
+    state: dict = metrics.load_state()
+    labels: dict = {"module": "backlight", "event": "up"}
+    assert state["counters"][metrics._key("zui_events_total", labels)] == 3
+    assert state["counters"][metrics._key("zui_event_failures_total", labels)] == 1
+    histogram: list = state["histograms"][metrics._key("zui_event_duration_seconds", labels)]
+    assert histogram[-1] == 3 and histogram[metrics.BUCKETS_S.index(0.25)] == 1
+    assert [event["ok"] for event in state["events"]] == [True, False, True]
+
+    prom: str = (tmp_path / metrics.PROM_NAME).read_text()
+    assert 'zui_event_duration_seconds_bucket{event="up",module="backlight",le="+Inf"} 3' in prom
+    assert 'zui_events_total{event="up",module="backlight"} 3' in prom
+
+
+def test_one_shot_runs_flush_at_exit(metrics, tmp_path):
+    script: str = "from zui.tracing import Tracer; Tracer('tiles', 'west').finish()"
+    env: dict = dict(os.environ, XDG_RUNTIME_DIR=str(tmp_path), PYTHONPATH=f"{REPO_PATH}/core/system/lib")
+    subprocess.run([sys.executable, "-c", script], env=env, check=True)
+    with open(tmp_path / "zui" / metrics.STATE_NAME) as stream:
+        assert [event["event"] for event in metrics.json.load(stream)["events"]] == ["west"]
+
+
+def test_flushed_periodically(metrics, registry, monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, "FLUSH_INTERVAL_S", 0.01)
+    registry.record_event("power", "battery", 0.01)
+    deadline: float = time.monotonic() + 5
+    while not os.path.exists(tmp_path / metrics.STATE_NAME):
+        assert time.monotonic() < deadline, "not flushed"
+        time.sleep(0.01)
+
+    registry.stop()
+    registry.flusher.join(5)
+    assert not registry.flusher.is_alive()
+
+
+def test_histograms_with_other_buckets_restart(metrics, registry):
+    key: str = metrics._key("zui_event_duration_seconds", {"module": "tiles", "event": "west"})
+    state: dict = metrics.load_state()
+    state["histograms"][key] = [1, 2, 3.0, 3]
+    metrics._write(metrics.runtime_file(metrics.STATE_NAME), metrics.json.dumps(state))
+
+    registry.record_event("tiles", "west", 0.001)
+    registry.flush()
+    assert metrics.load_state()["histograms"][key][-2:] == [0.001, 1]
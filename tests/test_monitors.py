@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+MON_A: int = 0x00200002
+MON_B: int = 0x00400002
+DESK_1: int = 0x00200003
+DESK_2: int = 0x00200004
+DESK_3: int = 0x00400003
+WINDOW: int = 0x03000003
+
+
+def leaf(node_id: int) -> dict:
+    return {"id": node_id, "firstChild": None, "secondChild": None}
+
+
+# bspc wm -d, trimmed to the fields Topology reads
+WM_STATE: dict = {
+    "monitors": [
+        {
+            "id": MON_A,
+            "name": "DP-1",
+            "desktops": [
+                {"id": DESK_1, "name": "1", "root": {"id": 1, "firstChild": leaf(WINDOW), "secondChild": leaf(0x03000004)}},
+                {"id": DESK_2, "name": "2", "root": None},
+            ],
+        },
+        {"id": MON_B, "name": "eDP-1", "desktops": [{"id": DESK_3, "name": "6", "root": None}]},
+    ]
+}
+
+
+@pytest.fixture
+def topology(load_module, monkeypatch):
+    monitors = load_module("monitors/core.py")
+    monkeypatch.setattr(monitors.bspwm, "send", lambda *args: json.dumps(WM_STATE))
+    topology = monitors.Topology()
+    topology.load()
+    return topology
+
+
+def test_load(topology):
+    assert topology.monitors == {MON_A: "DP-1", MON_B: "eDP-1"}
+    assert topology.desktops == {MON_A: [DESK_1, DESK_2], MON_B: [DESK_3]}
+    assert topology.occupied(DESK_1) and not topology.occupied(DESK_2)
+    assert topology.monitor_of(DESK_3) == MON_B
+    assert topology.monitor_of(0x1) is None
+
+
+def test_desktop_transfer_and_remove(topology):
+    assert topology.apply_event(f"desktop_transfer 0x{MON_A:08X} 0x{DESK_2:08X} 0x{MON_B:08X}") is False
+    assert topology.desktops == {MON_A: [DESK_1], MON_B: [DESK_3, DESK_2]}
+    assert topology.monitor_of(DESK_2) == MON_B
+
+    topology.apply_event(f"desktop_remove 0x{MON_B:08X} 0x{DESK_3:08X}")
+    assert topology.desktops == {MON_A: [DESK_1], MON_B: [DESK_2]}
+    assert DESK_3 not in topology.names
+    assert DESK_3 not in topology.nodes
+
+
+def test_windows_follow_node_events(topology):
+    topology.apply_event(f"node_transfer 0x{MON_A:08X} 0x{DESK_1:08X} 0x{WINDOW:08X} 0x{MON_B:08X} 0x{DESK_3:08X} 0x00000000")
+    assert topology.occupied(DESK_3)
+    topology.apply_event(f"node_remove 0x{MON_B:08X} 0x{DESK_3:08X} 0x{WINDOW:08X}")
+    assert not topology.occupied(DESK_3)
+    topology.apply_event(f"node_add 0x{MON_A:08X} 0x{DESK_2:08X} 0x00000000 0x{WINDOW:08X}")
+    assert topology.occupied(DESK_2)
+
+
+def test_monitor_remove_forgets_its_desktops(topology):
+    assert topology.apply_event(f"monitor_remove 0x{MON_A:08X}") is True
+    assert topology.desktops == {MON_B: [DESK_3]}
+    assert set(topology.names) == set(topology.nodes) == {DESK_3}
@@ -0,0 +1,145 @@
+import pytest
+
+from conftest import connect, require, wait_for
+
+PRIMARY: str = "/org/freedesktop/NetworkManager/ActiveConnection/3"
+WLAN: str = "/org/freedesktop/NetworkManager/Devices/2"
+ETH: str = "/org/freedesktop/NetworkManager/Devices/1"
+BRIDGE: str = "/org/freedesktop/NetworkManager/Devices/5"
+
+
+@pytest.fixture
+def network(load_module):
+    require("gi")
+    return load_module("network/core.py")
+
+
+def serve(network, monkeypatch, active: dict) -> None:
+    """NetworkManager connected through active, answering GetAll from a table"""
+    objects: dict = {
+        (network.NM_PATH, network.NM_IFACE): {"State": 70, "PrimaryConnection": PRIMARY},
+        (PRIMARY, network.NM_ACTIVE_IFACE): active,
+        (WLAN, network.NM_DEVICE_IFACE): {"DeviceType": network.NM_DEVICE_TYPE_WIFI},
+        (ETH, network.NM_DEVICE_IFACE): {"DeviceType": network.NM_DEVICE_TYPE_ETHERNET},
+        (BRIDGE, network.NM_DEVICE_IFACE): {"DeviceType": 13},
+    }
+    monkeypatch.setattr(network, "get_properties", lambda bus, path, iface: objects.get((path, iface), {}))
+
+
+@pytest.mark.parametrize(
+    "devices, kind",
+    [([WLAN], "wifi"), ([ETH], "ethernet"), ([BRIDGE], "other"), ([], "other")],
+)
+def test_vpn_shows_the_device_under_it(network, monkeypatch, devices, kind):
+    serve(network, monkeypatch, {"Type": "vpn", "Id": "Office", "Devices": devices})
+    assert network.read_state(None) == (kind, "Office", PRIMARY)
+
+
+def test_icons(network):
+    assert network.state_icon("ethernet") == network.ETHERNET_ICON
+    assert network.state_icon("wifi") == network.WIFI_ICON
+    assert network.state_icon("other") == network.OTHER_ICON
+    assert network.state_icon(None) == network.DISCONNECTED_ICON
+
+
+def test_disconnected(network, monkeypatch):
+    monkeypatch.setattr(network, "get_properties", lambda bus, path, iface: {"State": 20})
+    assert network.read_state(None) == (None, None, None)
+
+
+PROPERTIES_XML: str = """
+<node>
+  <interface name="org.freedesktop.DBus.Properties">
+    <method name="GetAll">
+      <arg type="s" name="interface" direction="in"/>
+      <arg type="a{sv}" name="properties" direction="out"/>
+    </method>
+  </interface>
+</node>
+"""
+# D-Bus type of each property the module reads
+SIGNATURES: dict = {
+    "State": "u", "PrimaryConnection": "o", "Type": "s", "Id": "s",
+    "SpecificObject": "o", "Devices": "ao", "DeviceType": "u",
+}
+
+
+class FakeNetworkManager:
+    """org.freedesktop.NetworkManager answering GetAll from objects, path -> interface -> properties"""
+
+    def __init__(self, network, dbus_service) -> None:
+        from gi.repository import GLib
+
+        self.network = network
+        self.GLib = GLib
+        self.objects: dict = {
+            network.NM_PATH: {network.NM_IFACE: {"State": 20, "PrimaryConnection": "/"}},
+            PRIMARY: {network.NM_ACTIVE_IFACE: {}},
+            WLAN: {network.NM_DEVICE_IFACE: {"DeviceType": network.NM_DEVICE_TYPE_WIFI}},
+            ETH: {network.NM_DEVICE_IFACE: {"DeviceType": network.NM_DEVICE_TYPE_ETHERNET}},
+        }
+        self.service = dbus_service(network.NM_NAME, list(self.objects), PROPERTIES_XML, self.get_all)
+
+    def get_all(self, path: str, method: str, args: tuple):
+        properties: dict = self.objects[path].get(args[0], {})
+        return self.GLib.Variant(
+            "(a{sv})",
+            ({key: self.GLib.Variant(SIGNATURES[key], value) for key, value in properties.items()},),
+        )
+
+    def connect(self, active: dict) -> None:
+        """Switch to active as the primary connection, announced by StateChanged"""
+        self.objects[PRIMARY][self.network.NM_ACTIVE_IFACE] = active
+        self.objects[self.network.NM_PATH][self.network.NM_IFACE] = {"State": 70, "PrimaryConnection": PRIMARY}
+        self.service.emit(
+            self.network.NM_IFACE, "StateChanged", self.GLib.Variant("(u)", (70,)), path=self.network.NM_PATH
+        )
+
+    def properties_changed(self, path: str, interface: str, changed: dict) -> None:
+        self.service.emit(
+            self.network.PROPERTIES_IFACE,
+            "PropertiesChanged",
+            self.GLib.Variant(
+                "(sa{sv}as)",
+                (interface, {key: self.GLib.Variant(SIGNATURES.get(key, "b"), value) for key, value in changed.items()}, []),
+            ),
+            path=path,
+        )
+
+
+def test_listener_follows_networkmanager(network, dbus_service, session_bus, monkeypatch, capsys):
+    # NetworkManager lives on the system bus
+    monkeypatch.setenv("DBUS_SYSTEM_BUS_ADDRESS", session_bus)
+    manager = FakeNetworkManager(network, dbus_service)
+    notifications: list = []
+    monkeypatch.setattr(
+        network, "notifier", type("Notifier", (), {"notify": lambda self, summary, body, tag=None: notifications.append(body)})()
+    )
+    listener = network.NetworkListener(connect(session_bus))
+    refreshes: list = []
+    refresh = listener.refresh
+    monkeypatch.setattr(listener, "refresh", lambda: refreshes.append(refresh()))
+    listener.start()
+    # Once at start, once when the name watcher sees NetworkManager
+    wait_for(lambda: len(refreshes) == 2)
+    assert capsys.readouterr().out == f"{network.DISCONNECTED_ICON}\n"
+
+    manager.connect({"Type": network.WIFI_TYPE, "Id": "Home", "SpecificObject": "/", "Devices": [WLAN]})
+    wait_for(lambda: listener.kind == "wifi")
+    # Nothing that changes the state: the active connection is re-read, no new line or bubble
+    manager.properties_changed(network.NM_PATH, network.NM_IFACE, {"WirelessEnabled": True})
+    manager.properties_changed(PRIMARY, network.NM_ACTIVE_IFACE, {"State": 2})
+    wait_for(lambda: len(refreshes) == 4)
+
+    # A VPN over ethernet becoming the primary connection
+    manager.objects[PRIMARY][network.NM_ACTIVE_IFACE] = {"Type": "vpn", "Id": "Office", "Devices": [ETH]}
+    manager.properties_changed(network.NM_PATH, network.NM_IFACE, {"PrimaryConnection": PRIMARY})
+    wait_for(lambda: listener.kind == "ethernet")
+
+    manager.objects[network.NM_PATH][network.NM_IFACE] = {"State": 20, "PrimaryConnection": "/"}
+    manager.service.emit(network.NM_IFACE, "StateChanged", manager.GLib.Variant("(u)", (20,)), path=network.NM_PATH)
+    wait_for(lambda: listener.kind is None)
+
+    icons: list = [network.WIFI_ICON, network.ETHERNET_ICON, network.DISCONNECTED_ICON]
+    assert capsys.readouterr().out == "".join(f"{icon}\n" for icon in icons)
+    assert notifications == ["Connected to Home", "Connected to Office", "Disconnected from internet"]
@@ -0,0 +1,87 @@
+import pytest
+
+from conftest import connect, require
+
+NOTIFICATIONS_XML: str = """
+<node>
+  <interface name="org.freedesktop.Notifications">
+    <method name="Notify">
+      <arg type="s" name="app_name" direction="in"/>
+      <arg type="u" name="replaces_id" direction="in"/>
+      <arg type="s" name="app_icon" direction="in"/>
+      <arg type="s" name="summary" direction="in"/>
+      <arg type="s" name="body" direction="in"/>
+      <arg type="as" name="actions" direction="in"/>
+      <arg type="a{sv}" name="hints" direction="in"/>
+      <arg type="i" name="expire_timeout" direction="in"/>
+      <arg type="u" name="id" direction="out"/>
+    </method>
+  </interface>
+</node>
+"""
+
+
+@pytest.fixture
+def notifications(dbus_service):
+    """A notification server numbering bubbles like a real one, replaced ids are kept"""
+    from gi.repository import GLib
+
+    last_id: list = [0]
+
+    def handle(path: str, method: str, args: tuple):
+        replaces_id: int = args[1]
+        if not replaces_id:
+            last_id[0] += 1
+            replaces_id = last_id[0]
+        return GLib.Variant("(u)", (replaces_id,))
+
+    return dbus_service("org.freedesktop.Notifications", "/org/freedesktop/Notifications", NOTIFICATIONS_XML, handle)
+
+
+@pytest.fixture
+def notify(monkeypatch, tmp_path):
+    """zui.notify with its stored ids in tmp_path"""
+    require("gi")
+    import zui
+
+    monkeypatch.setattr(zui, "RUNTIME_PATH", str(tmp_path))
+    return require("zui.notify")
+
+
+def test_notify_sends_the_bubble(notify, notifications, session_bus):
+    notifier = notify.Notifier("zui-test", bus=connect(session_bus))
+    assert notifier.notify("Summary", "Body") == 1
+    app_name, replaces_id, _icon, summary, body, actions, hints, timeout = notifications.calls[0][1]
+    assert (app_name, replaces_id, summary, body, actions, hints, timeout) == ("zui-test", 0, "Summary", "Body", [], {}, -1)
+
+
+def test_same_tag_replaces_the_bubble(notify, notifications, session_bus):
+    bus = connect(session_bus)
+    first: int = notify.Notifier("zui-test", bus=bus).notify("Volume", "up", tag="volume", transient=True)
+    notify.Notifier("zui-test", bus=bus).notify("Other", "bubble")
+    # A new process (a new Notifier) finds the id on disk
+    second: int = notify.Notifier("zui-test", bus=bus).notify("Volume", "down", tag="volume", transient=True)
+
+    assert second == first
+    assert [args[1] for _method, args in notifications.calls] == [0, 0, first]
+    hints: dict = notifications.calls[2][1][6]
+    assert hints == {"x-canonical-private-synchronous": "volume", "transient": True}
+
+
+def test_missing_server_is_reported(notify, session_bus, capsys):
+    notifier = notify.Notifier("zui-test", bus=connect(session_bus))
+    assert notifier.notify("Nobody", "listening", tag="volume") == 0
+    assert "Error sending notification" in capsys.readouterr().err
+
+
+def test_audio_volume_bubbles_update_in_place(load_module, notify, notifications, session_bus):
+    require("pulsectl")
+    audio = load_module("audio/general/core.py")
+    audio.notifier._bus = connect(session_bus)
+    audio.send_notification(msg="up 55%")
+    audio.send_notification(msg="up 60%")
+
+    (_, first), (_, second) = notifications.calls
+    assert (first[0], first[3], first[4]) == ("Audio", "Audio", "Volume up 55%")
+    assert second[1] == 1
+    assert second[4] == "Volume up 60%"
@@ -0,0 +1,113 @@
+import types
+
+import pytest
+
+from conftest import connect, require, wait_for
+
+PLAYER_NAME: str = "org.mpris.MediaPlayer2.fake"
+PROPERTIES_XML: str = """
+<node>
+  <interface name="org.freedesktop.DBus.Properties">
+    <method name="GetAll">
+      <arg type="s" name="interface" direction="in"/>
+      <arg type="a{sv}" name="properties" direction="out"/>
+    </method>
+  </interface>
+</node>
+"""
+
+
+@pytest.fixture
+def spotify(load_module, monkeypatch):
+    require("gi")
+    module = load_module("audio/spotify/core.py")
+    hooks: list = []
+    # polybar-msg calls are recorded instead of run
+    monkeypatch.setattr(
+        module,
+        "subprocess",
+        types.SimpleNamespace(Popen=lambda args, **kwargs: hooks.append(args[-1]), DEVNULL=None),
+    )
+    module.hooks = hooks
+    return module
+
+
+def song(title: str, artists: list, album: str = ""):
+    from gi.repository import GLib
+
+    return GLib.Variant(
+        "a{sv}",
+        {
+            "xesam:title": GLib.Variant("s", title),
+            "xesam:artist": GLib.Variant("as", artists),
+            "xesam:album": GLib.Variant("s", album),
+        },
+    )
+
+
+METADATA: dict = {"xesam:title": "Song", "xesam:artist": ["One", "Two"], "xesam:album": "Album"}
+
+
+def test_format_attributes(spotify):
+    assert spotify.format_metadata(METADATA, "{title} - {artist} ({album})") == "Song - One, Two (Album)"
+    assert spotify.format_metadata({}, "{title}|{artist}|{album}") == "||"
+
+
+def test_unknown_placeholders_are_empty(spotify):
+    assert spotify.format_metadata(METADATA, "{title} [{year}]") == "Song []"
+
+
+@pytest.mark.parametrize("fmt", ["{0} - {1}", "{title", "{title!z}", "{title.missing}"])
+def test_broken_format_falls_back_to_the_default(spotify, fmt):
+    assert spotify.format_metadata(METADATA, fmt) == "Song - One, Two"
+
+
+def test_long_titles_scroll(spotify, monkeypatch):
+    listener = spotify.SpotifyListener(None, "fake", "{title}")
+    monkeypatch.setattr(spotify.GLib, "timeout_add", lambda delay, callback: 1)
+    monkeypatch.setattr(spotify.GLib, "source_remove", lambda timer: None)
+    title: str = "abcdefghijklmnopqrstuvwxyz0123456789"
+    listener.update({"PlaybackStatus": "Playing", "Metadata": {"xesam:title": title}})
+    assert listener.timer == 1
+    listener._on_tick()
+    assert listener.render() == (title + spotify.SCROLL_PADDING)[1 : 1 + spotify.WINDOW_LENGTH]
+    listener.update({"PlaybackStatus": "Paused"})
+    assert listener.timer is None
+
+
+def test_listener_follows_the_player(spotify, dbus_service, session_bus, capsys):
+    from gi.repository import GLib
+
+    properties: dict = {
+        "PlaybackStatus": GLib.Variant("s", "Playing"),
+        "Metadata": song("Song", ["One", "Two"]),
+    }
+    listener = spotify.SpotifyListener(connect(session_bus), "fake", "{title} - {artist}")
+    listener.start()
+    assert capsys.readouterr().out == " " * spotify.WINDOW_LENGTH + "\n"
+
+    player = dbus_service(
+        PLAYER_NAME,
+        spotify.MPRIS_PATH,
+        PROPERTIES_XML,
+        lambda path, method, args: GLib.Variant("(a{sv})", (properties,)),
+    )
+    wait_for(lambda: listener.text == "Song - One, Two")
+    assert player.calls == [("GetAll", (spotify.MPRIS_PLAYER_IFACE,))]
+    assert spotify.hooks == [spotify.PAUSE_HOOK]
+    assert capsys.readouterr().out == "Song - One, Two".ljust(spotify.WINDOW_LENGTH) + "\n"
+
+    player.emit(
+        spotify.PROPERTIES_IFACE,
+        "PropertiesChanged",
+        GLib.Variant(
+            "(sa{sv}as)",
+            (spotify.MPRIS_PLAYER_IFACE, {"PlaybackStatus": GLib.Variant("s", "Paused")}, []),
+        ),
+    )
+    wait_for(lambda: listener.status == "Paused")
+    assert spotify.hooks == [spotify.PAUSE_HOOK, spotify.PLAY_HOOK]
+
+    player.stop()
+    wait_for(lambda: listener.owner is None)
+    assert listener.render() == " " * spotify.WINDOW_LENGTH
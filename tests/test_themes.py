@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+WALLPAPER: bytes = b"\x89PNG" + b"\0" * 4096
+
+
+@pytest.fixture
+def themes(load_module, monkeypatch, tmp_path):
+    module = load_module("themes/core.py")
+    monkeypatch.setattr(module, "THEMES_PATH", str(tmp_path / "themes"))
+    monkeypatch.setattr(module, "OBJECTS_PATH", str(tmp_path / "store" / "objects"))
+    monkeypatch.setattr(module, "TREES_PATH", str(tmp_path / "store" / "trees"))
+    # What ext4 gets
+    monkeypatch.setattr(module, "link_method", lambda: "hardlink")
+    return module
+
+
+def make_theme(root, name: str, picom: str) -> str:
+    source = root / "src" / name
+    (source / "picom").mkdir(parents=True)
+    (source / "picom" / "picom.conf").write_text(picom)
+    (source / "wallpapers").mkdir()
+    (source / "wallpapers" / "bg0.png").write_bytes(WALLPAPER)
+    (source / "bin").mkdir()
+    (source / "bin" / "tool").write_bytes(b"\x7fELF" + b"\1" * (70 * 1024))
+    os.chmod(source / "bin" / "tool", 0o755)
+    return str(source)
+
+
+def test_large_files_are_shared_config_files_copied(themes, tmp_path):
+    assert themes.install("nord", make_theme(tmp_path, "nord", "vsync = true;\n"))
+    assert themes.install("galaxy", make_theme(tmp_path, "galaxy", "vsync = false;\n"))
+    nord, galaxy = tmp_path / "themes" / "nord", tmp_path / "themes" / "galaxy"
+
+    # One wallpaper and one binary for both themes (and the store)
+    assert os.stat(nord / "wallpapers" / "bg0.png").st_ino == os.stat(galaxy / "wallpapers" / "bg0.png").st_ino
+    assert os.stat(nord / "wallpapers" / "bg0.png").st_nlink == 3
+    assert os.stat(nord / "bin" / "tool").st_ino == os.stat(galaxy / "bin" / "tool").st_ino
+    assert os.access(nord / "bin" / "tool", os.X_OK)
+
+    config = nord / "picom" / "picom.conf"
+    assert os.stat(config).st_nlink == 1
+    assert os.stat(config).st_mode & 0o777 == 0o644
+    # Edited in place, like install_theme.sh's sed or an editor without atomic saves
+    with open(config, "a") as stream:
+        stream.write("shadow = false;\n")
+    assert themes.install("nord", str(tmp_path / "src" / "nord"))
+    assert (nord / "picom" / "picom.conf").read_text() == "vsync = true;\nshadow = false;\n"
+    name: str = themes.file_digest(tmp_path / "src" / "nord" / "picom" / "picom.conf")
+    with open(themes.object_path(name)) as stream:
+        assert stream.read() == "vsync = true;\n"
+
+
+def test_trees_hardlinking_config_files_are_rebuilt(themes, tmp_path):
+    source: str = make_theme(tmp_path, "nord", "vsync = true;\n")
+    themes.install("nord", source)
+    tree: str = os.path.realpath(tmp_path / "themes" / "nord")
+    manifest, _added = themes.scan(source)
+    config: str = f"{tree}/picom/picom.conf"
+    # As older installs left it
+    os.remove(config)
+    os.link(themes.object_path(manifest["picom/picom.conf"][1]), config)
+    assert themes.shares_editable(tree, manifest)
+
+    themes.install("nord", source)
+    assert not themes.shares_editable(tree, manifest)
+    assert os.stat(config).st_nlink == 1
@@ -1,24 +1,39 @@
 #!/usr/bin/env bash
 
-# Terminate already running bar instances
-killall -q polybar
+# --plan only prints the bars that would be started ("bar<TAB>config<TAB>monitor"),
+# the monitors module uses it to restart just the bars whose output changed
+if [[ $1 == "--plan" ]]; then
+	PLAN=true
+else
+	PLAN=false
+	# Terminate already running bar instances
+	killall -q polybar
+
+	## Wait until the processes have been shut down
+	while pgrep -u "${UID}" -x polybar >/dev/null; do sleep 1; done
+fi
 
-## Wait until the processes have been shut down
-while pgrep -u "${UID}" -x polybar >/dev/null; do sleep 1; done
+function launch_bar () {
+	if ${PLAN}; then
+		printf '%s\t%s\t%s\n' "$1" "$2" "${MAIN_MONITOR}"
+	else
+		polybar "$1" -c "$2" &
+	fi
+}
 
 TOP_BARS="${HOME}/.config/polybar/top_bars.ini"
 BOTTOM_BARS="${HOME}/.config/polybar/bottom_bars.ini"
 
 ## Top Right bars
-polybar cpu -c "${TOP_BARS}" &
-polybar memory -c "${TOP_BARS}" &
-polybar disk -c "${TOP_BARS}" &
+launch_bar cpu "${TOP_BARS}"
+launch_bar memory "${TOP_BARS}"
+launch_bar disk "${TOP_BARS}"
 
 ## Top Center bars
-polybar date -c "${TOP_BARS}" &
+launch_bar date "${TOP_BARS}"
 
 ## Bottom Left bars
-polybar spotify -c "${BOTTOM_BARS}" &
+launch_bar spotify "${BOTTOM_BARS}"
 
 ## Bottom Center bars
 
@@ -33,18 +48,18 @@ if [[ -z $(find /sys/class/backlight -type d -empty) ]]; then
 else
 	BACKLIGHT=''
 fi
-polybar notifications"${BATTERY}""${BACKLIGHT}" -c "${BOTTOM_BARS}" &
-polybar indicators"${BATTERY}""${BACKLIGHT}" -c "${BOTTOM_BARS}" &
-polybar network"${BATTERY}""${BACKLIGHT}" -c "${BOTTOM_BARS}" &
-polybar battery"${BACKLIGHT}" -c "${BOTTOM_BARS}" &
-polybar audio"${BACKLIGHT}" -c "${BOTTOM_BARS}" &
-polybar backlight -c "${BOTTOM_BARS}" &
+launch_bar notifications"${BATTERY}""${BACKLIGHT}" "${BOTTOM_BARS}"
+launch_bar indicators"${BATTERY}""${BACKLIGHT}" "${BOTTOM_BARS}"
+launch_bar network"${BATTERY}""${BACKLIGHT}" "${BOTTOM_BARS}"
+launch_bar battery"${BACKLIGHT}" "${BOTTOM_BARS}"
+launch_bar audio"${BACKLIGHT}" "${BOTTOM_BARS}"
+launch_bar backlight "${BOTTOM_BARS}"
 
 ## Top Left bars
 if [[ -z ${SECONDARY_MONITOR} ]]; then
-	polybar workspaces-single-monitor -c "${TOP_BARS}" &
+	launch_bar workspaces-single-monitor "${TOP_BARS}"
 else
-	polybar workspaces -c "${TOP_BARS}" &
+	launch_bar workspaces "${TOP_BARS}"
 	export MAIN_MONITOR=${SECONDARY_MONITOR}
-	polybar workspaces -c "${TOP_BARS}" &
+	launch_bar workspaces "${TOP_BARS}"
 fi
\ No newline at end of file
@@ -38,6 +38,7 @@ COMMANDS:
     install-core         Install only UI core components
     install-shell        Install shell configuration (optional)
     install-theme        Install theme
+    switch-theme         Switch the running session to an installed theme (-t THEME)
     set-wallpaper        Set wallpaper (requires path to image file)
     post-install         Run post-installation setup
     uninstall            Remove ZUI installation
@@ -46,6 +47,7 @@ COMMANDS:
     backup               Backup existing configurations
     restore              Restore configurations from backup
     list-themes          List available themes
+    stats                Show module metrics of the session (summary, events [N], prom, reset)
     help                 Show this help message
 
 OPTIONS:
@@ -158,6 +160,23 @@ install_theme_command() {
     run_script "install_theme.sh" "${THEME}"
 }
 
+switch_theme_command() {
+    local themes_module="${INSTALL_DIR}/core/system/modules/themes/interface.sh"
+
+    if [[ ! -f "${themes_module}" ]]; then
+        log_error "ZUI is not installed. Please run '$0 install' first."
+        exit 1
+    fi
+
+    # Only themes set up by install_theme.sh (hardware settings, theme install script)
+    if [[ ! -d "${INSTALL_DIR}/themes/${THEME}" ]]; then
+        log_error "Theme '${THEME}' is not installed. Install it first with: $0 install-theme -t ${THEME}"
+        exit 1
+    fi
+
+    bash "${themes_module}" switch "${THEME}"
+}
+
 post_install_command() {
     authenticate_sudo
     run_script "post_install.sh"
@@ -240,9 +259,13 @@ wallpaper_command() {
     log_info "Setting wallpaper to: ${wallpaper_path}"
     ln -sfn "$(realpath "${wallpaper_path}")" "${INSTALL_DIR}/current_theme/wallpapers/current_wallpaper"
 
-    # Apply the wallpaper using feh
+    # Apply the wallpaper using feh (scaled per output and cached by the wallpaper module)
     if command -v feh >/dev/null 2>&1; then
-        feh --bg-fill "${INSTALL_DIR}/current_theme/wallpapers/current_wallpaper"
+        if [[ -f "${INSTALL_DIR}/core/system/modules/wallpaper/interface.sh" ]]; then
+            bash "${INSTALL_DIR}/core/system/modules/wallpaper/interface.sh" apply
+        else
+            feh --bg-fill "${INSTALL_DIR}/current_theme/wallpapers/current_wallpaper"
+        fi
         log_success "Wallpaper changed successfully!"
     else
         log_warning "feh not found. Please install feh to apply wallpapers automatically."
@@ -250,6 +273,17 @@ wallpaper_command() {
     fi
 }
 
+# Module metrics
+stats_command() {
+    local stats_interface="${INSTALL_DIR}/core/system/modules/stats/interface.sh"
+
+    if [[ ! -f "${stats_interface}" ]]; then
+        log_error "ZUI is not installed. Please run '$0 install' first."
+        exit 1
+    fi
+    bash "${stats_interface}" "$@"
+}
+
 # Main function
 main() {
     local COMMAND=""
@@ -291,9 +325,15 @@ main() {
             install_theme_command
             reload_command
             ;;
+        switch-theme)
+            switch_theme_command
+            ;;
         list-themes)
             list_themes_command
             ;;
+        stats)
+            stats_command "${COMMAND_ARGS[@]}"
+            ;;
         post-install)
             post_install_command
             ;;